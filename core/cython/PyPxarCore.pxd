@@ -88,6 +88,7 @@ cdef extern from "api.h" namespace "pxar":
         void setTrim(uint8_t trim)
         pixelConfig()
         pixelConfig(uint8_t column, uint8_t row, uint8_t trim)
+        pixelConfig(uint8_t roc, uint8_t column, uint8_t row, uint8_t trim, bool mask, bool enable)
 
 cdef extern from "api.h" namespace "pxar":
     cdef cppclass rocConfig:
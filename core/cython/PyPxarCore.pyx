@@ -309,6 +309,18 @@ cdef class PxEvent:
     property eventid_mismatch:
         def __get__(self): return self.thisptr.eventid_mismatch
 
+cdef vector[pixelConfig] pixel_vector(trim, mask, uint8_t roc = 0):
+    """ converts the (column, row) arrays of the trim bits [trim] and the [mask] of a ROC to pixelConfigs, pixels with negative trim values are skipped """
+    cdef vector[pixelConfig] v
+    cdef short[:, :] t = numpy.asarray(trim, dtype=numpy.int16)
+    cdef unsigned char[:, :] m = numpy.asarray(mask, dtype=numpy.uint8)
+    cdef int col, row
+    for col in range(t.shape[0]):
+        for row in range(t.shape[1]):
+            if t[col, row] >= 0:
+                v.push_back(pixelConfig(roc, col, row, t[col, row], m[col, row], False))
+    return v
+
 cdef class PyPxarCore:
     cdef pxarCore *thisptr # hold the C++ instance
     def __cinit__(self, usbId = "*", logLevel = "INFO"):
@@ -393,7 +405,7 @@ cdef class PyPxarCore:
         tbmDACs (list of dictionaries (string,int), one for each TBM)
         roctype (string)
         rocDACs (list of dictionaries (string,int), one for each ROC)
-        rocPixels (list of list of pixelConfigs, one list for each ROC)
+        rocPixels (list of list of pixelConfigs or tuples of (column, row) arrays of the trim bits and the mask, one for each ROC)
         rocI2C (list of I2C addresses of the ROCs)
         """
         cdef vector[uint8_t] hubs
@@ -418,6 +430,9 @@ cdef class PyPxarCore:
             for key, value in rocDAC.items():
                 rd.at(idx).push_back(pair[string,uint8_t](key,int(value,0) if isinstance(value,str) else int(value)))
         for idx, rocPixel in enumerate(rocPixels):
+            if isinstance(rocPixel, tuple):  # trim and mask arrays
+                rpcs.push_back(pixel_vector(rocPixel[0], rocPixel[1], rocI2C[idx] if rocI2C is not None else idx))
+                continue
             rpcs.push_back(vector[pixelConfig]())
             for pc in rocPixel:
                 rpcs.at(idx).push_back(<pixelConfig> pc.thisptr[0])
@@ -450,6 +465,9 @@ cdef class PyPxarCore:
     def updateTrimBits(self, trimming, int rocid):
         cdef vector[pixelConfig] v
         cdef pixelConfig pc
+        if isinstance(trimming, numpy.ndarray):  # (column, row) array of the trim bits, negative values are skipped
+            self.thisptr._dut.updateTrimBits(pixel_vector(trimming, numpy.zeros(trimming.shape, numpy.uint8)), rocid)
+            return
         #for idx, col, row, trim in enumerate(trimming):
         for line in xrange(len(trimming)):
             pc = pixelConfig(trimming[line][0][0], trimming[line][1][0], trimming[line][2][0])
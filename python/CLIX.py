@@ -8,13 +8,14 @@ from sys import argv, path, stdout, exit
 from helpers.utils import *
 from numpy import zeros, array, mean, arange
 from helpers.pxar import *  # arity decorator, PxarStartup, PxarConfigFile, PxarParametersFile and others
+from helpers.scan import AdaptiveScan, WindowSearch
+from src.event_recorder import EventRecorder, HITS, RAW
+from helpers.profiling import CallCounter, CommandProfiler
+from helpers.scan_cache import ScanCache
 
 gui_available = has_root()
-if gui_available:
-    from ROOT import PyConfig, gStyle, TCanvas, gROOT, TGraph, TMultiGraph, TH1I, gRandom, TCutG, TF1, gClient
-    PyConfig.IgnoreCommandLineOptions = True
-    from pxar_gui import PxarGui
-    from pxar_plotter import Plotter
+pxar_gui = LazyModule('pxar_gui')
+pxar_plotter = LazyModule('pxar_plotter')
 
 import cmd  # for command interface and parsing
 import os  # for file system cmds
@@ -26,7 +27,14 @@ from progressbar import Bar, ETA, FileTransferSpeed, Percentage, ProgressBar
 dacdict = PyRegisterDictionary()
 probedict = PyProbeDictionary()
 palette = array([632, 810, 807, 797, 800, 400, 830, 827, 817, 417], 'i')
-gStyle.SetPalette(len(palette), palette)
+
+
+def setup_clix_root(root):
+    setup_root(root)
+    root.gStyle.SetPalette(len(palette), palette)
+
+
+ROOT = LazyModule('ROOT', setup_clix_root)  # ROOT and the pxar plotting are only loaded when they are used
 green = '\033[92m'
 endc = '\033[0m'
 
@@ -50,8 +58,11 @@ class PxarCoreCmd(cmd.Cmd):
         self.ProgressBar = None
         self.NRows = 80
         self.NCols = 52
+        self.Profiler = None
+        self.ScanCache = ScanCache(join(choose(conf_dir, '.'), '.scan_cache'))
+        self.UseCache = True
         if gui and gui_available:
-            self.window = PxarGui(gClient.GetRoot(), 800, 800)
+            self.window = pxar_gui.PxarGui(ROOT.gClient.GetRoot(), 800, 800)
         elif gui and not gui_available:
             print("No GUI available (missing ROOT library)")
 
@@ -59,6 +70,23 @@ class PxarCoreCmd(cmd.Cmd):
         self.ProgressBar = ProgressBar(widgets=['Progress: ', Percentage(), ' ', Bar(marker='>'), ' ', ETA(), ' ', FileTransferSpeed()], maxval=n)
         self.ProgressBar.start()
 
+    def scan(self, method, *args):
+        """ runs the scan [method] of the API or loads its result from the scan cache if it was already done with the same arguments and DUT state """
+        return self.ScanCache.scan(self.api, method, *args, cache=self.UseCache)
+
+    def enable_profiling(self, cprofile=False, memory=False, filename=None):
+        """ records the timing, the API calls and the read events of every command in the session log (default: [conf_dir]/logs) """
+        if not isinstance(self.api, CallCounter):
+            self.api = CallCounter(self.api)
+        self.Profiler = CommandProfiler(choose(filename, join(choose(self.dir, '.'), 'logs', 'session_{}.jsonl'.format(strftime('%Y%m%d_%H%M%S')))), self.api, cprofile, memory)
+
+    def onecmd(self, line):
+        """ runs the command inside the profiler, which is also stopped if the command raises """
+        if self.Profiler is None or not line.strip():
+            return cmd.Cmd.onecmd(self, line)
+        with self.Profiler.profile(line):
+            return cmd.Cmd.onecmd(self, line)
+
     def plot_eventdisplay(self, data):
         pixels = list()
         # Multiple events:
@@ -79,7 +107,7 @@ class PxarCoreCmd(cmd.Cmd):
         self.plot_map(pixels, 'Event Display', True)
 
     def plot_graph(self, gr, lm=.12, rm=.1, draw_opt='alp'):
-        c = TCanvas('c', 'c', 1000, 1000)
+        c = ROOT.TCanvas('c', 'c', 1000, 1000)
         c.SetMargin(lm, rm, .1, .1)
         gr.Draw(draw_opt)
         self.window = c
@@ -91,8 +119,8 @@ class PxarCoreCmd(cmd.Cmd):
         #     print data
         #     return
 
-        # c = gROOT.GetListOfCanvases()[-1]
-        c = TCanvas('c', 'c', 1000, 1000)
+        # c = ROOT.gROOT.GetListOfCanvases()[-1]
+        c = ROOT.TCanvas('c', 'c', 1000, 1000)
         c.SetRightMargin(.12)
 
         # Find number of ROCs present:
@@ -112,7 +140,7 @@ class PxarCoreCmd(cmd.Cmd):
             x = (px.column + xoffset) if (px.roc < 8) else (415 - xoffset - px.column)
             d[x][y] += 1 if count else px.value
 
-        plot = Plotter.create_th2(d, 0, 417 if module else 52, 0, 161 if module else 80, name, 'pixels x', 'pixels y', name)
+        plot = pxar_plotter.Plotter.create_th2(d, 0, 417 if module else 52, 0, 161 if module else 80, name, 'pixels x', 'pixels y', name)
         if no_stats:
             plot.SetStats(0)
         plot.Draw('COLZ')
@@ -123,7 +151,7 @@ class PxarCoreCmd(cmd.Cmd):
                     rows, cols = self.NRows, self.NCols
                     x = array([cols * j, cols * (j + 1), cols * (j + 1), cols * j, cols * j], 'd')
                     y = array([rows * i, rows * i, rows * (i + 1), rows * (i + 1), rows * i], 'd')
-                    cut = TCutG('r{n}'.format(n=j + (j * i)), 5, x, y)
+                    cut = ROOT.TCutG('r{n}'.format(n=j + (j * i)), 5, x, y)
                     cut.SetLineColor(1)
                     cut.SetLineWidth(1)
                     self.Plots.append(cut)
@@ -144,7 +172,7 @@ class PxarCoreCmd(cmd.Cmd):
             if dac:
                 d[idac] = dac[0].value
 
-        plot = Plotter.create_th1(d, min_val, max_val, name, dacname, name)
+        plot = pxar_plotter.Plotter.create_th1(d, min_val, max_val, name, dacname, name)
         self.window.histos.append(plot)
         self.window.update()
 
@@ -158,7 +186,7 @@ class PxarCoreCmd(cmd.Cmd):
         #             s += str(px)
         #         print s
         #     return
-        c = TCanvas('c', 'c', 1000, 1000)
+        c = ROOT.TCanvas('c', 'c', 1000, 1000)
         c.SetRightMargin(.12)
 
         # Prepare new numpy matrix:
@@ -172,7 +200,7 @@ class PxarCoreCmd(cmd.Cmd):
                 bin2 = (idac % ((max2 - min2) / step2 + 1))
                 d[bin1][bin2] = dac[0].value
 
-        plot = Plotter.create_th2(d, min1, max1, min2, max2, name, dac1, dac2, 'Efficiency')
+        plot = pxar_plotter.Plotter.create_th2(d, min1, max1, min2, max2, name, dac1, dac2, 'Efficiency')
         plot.Draw('COLZ')
         plot.SetStats(0)
         self.window = c
@@ -186,7 +214,7 @@ class PxarCoreCmd(cmd.Cmd):
             return
         if self.window:
             return
-        self.window = PxarGui(gClient.GetRoot(), 800, 800)
+        self.window = pxar_gui.PxarGui(ROOT.gClient.GetRoot(), 800, 800)
 
     def daq_converted_raw(self, verbose=False):
         self.api.daqStart()
@@ -281,12 +309,10 @@ class PxarCoreCmd(cmd.Cmd):
         self.api.daqStop()
         return plotdata
 
-    def set_clock(self, value):
-        # sets all the delays to the right value if you want to change clk
-        self.api.setTestboardDelays({"clk": value})
-        self.api.setTestboardDelays({"ctr": value})
-        self.api.setTestboardDelays({"sda": value + 11})
-        self.api.setTestboardDelays({"tin": value + 2})
+    def set_clock(self, value, **delays):
+        # sets all the delays to the right value if you want to change clk, together with the other [delays] in a single call
+        delays.update({"clk": value, "ctr": value, "sda": value + 11, "tin": value + 2})
+        self.api.setTestboardDelays(delays)
 
     def get_address_levels(self):
         event = self.daq_converted_raw(verbose=False)
@@ -390,12 +416,12 @@ class PxarCoreCmd(cmd.Cmd):
 
     @staticmethod
     def find_factor(low_vals, high_vals):
-        gr = TGraph()
+        gr = ROOT.TGraph()
         vals = {}
         for i, scale in enumerate(range(600, 800)):
             vcals = list(low_vals.keys()) + [scale / 100. * key for key in list(high_vals.keys())]
             values = list(low_vals.values()) + list(high_vals.values())
-            g = Plotter.create_graph(vcals, values)
+            g = pxar_plotter.Plotter.create_graph(vcals, values)
             fit = g.Fit('pol1', 'qs', '', vcals[0], list(low_vals.keys())[-1])
             gr.SetPoint(i, scale / 100., fit.Chi2())
             vals[fit.Chi2()] = scale / 100.
@@ -604,7 +630,7 @@ class PxarCoreCmd(cmd.Cmd):
         for roc in range(self.api.getNEnabledRocs()):
             self.api.testAllPixels(0)
             self.api.testPixel(14, 14, 1, roc)
-            data = self.api.getEfficiencyVsDACDAC(dac1name, dac1step, dac1min, dac1max, dac2name, dac2step, dac2min, dac2max, flags, n_triggers)
+            data = self.scan('getEfficiencyVsDACDAC', dac1name, dac1step, dac1min, dac1max, dac2name, dac2step, dac2min, dac2max, flags, n_triggers)
             name = '{dac1} vs {dac2} Scan for ROC {roc}'.format(dac1=dac1name.title(), dac2=dac2name.title(), roc=roc)
             self.plot_2d(data, name, dac1name, dac1step, dac1min, dac1max, dac2name, dac2step, dac2min, dac2max)
             self.enable_all(roc)
@@ -659,7 +685,7 @@ class PxarCoreCmd(cmd.Cmd):
         return counts
 
     def make_canvas(self):
-        c = TCanvas('c', 'c', 1000, 1000)
+        c = ROOT.TCanvas('c', 'c', 1000, 1000)
         self.window = c
         return c
 
@@ -909,7 +935,7 @@ class PxarCoreCmd(cmd.Cmd):
             for line in f:
                 if not line.startswith("#") and not line.isspace():
                     print(line.replace('\n', ' ').replace('\r', ''))
-                    self.onecmd(line)
+                    self.postcmd(self.onecmd(self.precmd(line)), line)
         finally:
             f.close()
 
@@ -927,6 +953,29 @@ class PxarCoreCmd(cmd.Cmd):
             pass
         return get_possible_filename_completions(extract_full_argument(line, end_index))
 
+    @arity(0, 3, [int, int, int])
+    def do_profile(self, on=1, cprofile=0, memory=0):
+        """profile [on] [cprofile] [memory]: record the timing of every command in the session log, optionally with cProfile and tracemalloc"""
+        if on:
+            self.enable_profiling(bool(cprofile), bool(memory))
+        else:
+            self.Profiler = None
+
+    def complete_profile(self, text, line, start_index, end_index):
+        # return help for the cmd
+        return [self.do_profile.__doc__, '']
+
+    @arity(0, 2, [int, int])
+    def do_scanCache(self, on=1, clear=0):
+        """scanCache [on] [clear]: load the results of repeated scans with the same DUT configuration from the cache; [on] = 0 always scans, [clear] removes all results"""
+        self.UseCache = bool(on)
+        self.ScanCache.clear() if clear else do_nothing()
+        print(self.ScanCache)
+
+    def complete_scanCache(self, text, line, start_index, end_index):
+        # return help for the cmd
+        return [self.do_scanCache.__doc__, '']
+
     @arity(0, 0, [])
     def do_daqStart(self):
         """daqStart: starts a new DAQ session"""
@@ -1002,8 +1051,8 @@ class PxarCoreCmd(cmd.Cmd):
     @arity(0, 2, [int, int])
     def do_getEfficiencyMap(self, flags=0, nTriggers=10):
         """getEfficiencyMap [flags = 0] [nTriggers = 10]: returns the efficiency map"""
-        # self.window = PxarGui(gClient.GetRoot(), 1000, 800)
-        data = self.api.getEfficiencyMap(flags, nTriggers)
+        # self.window = pxar_gui.PxarGui(ROOT.gClient.GetRoot(), 1000, 800)
+        data = self.scan('getEfficiencyMap', flags, nTriggers)
         self.print_eff(data, nTriggers)
         self.plot_map(data, "Efficiency", no_stats=True)
 
@@ -1014,8 +1063,8 @@ class PxarCoreCmd(cmd.Cmd):
     @arity(0, 2, [int, int])
     def do_getPulseheightMap(self, flags=0, nTriggers=10):
         """getPulseheightMap [flags = 0] [nTriggers = 10]: returns the Pulseheight map"""
-        # self.window = PxarGui(gClient.GetRoot(), 1000, 800)
-        gStyle.SetPalette(55)
+        # self.window = pxar_gui.PxarGui(ROOT.gClient.GetRoot(), 1000, 800)
+        ROOT.gStyle.SetPalette(55)
         data = self.api.getPulseheightMap(flags, nTriggers)
         self.print_eff(data, nTriggers)
         self.plot_map(data, "Pulseheight", no_stats=True)
@@ -1038,7 +1087,7 @@ class PxarCoreCmd(cmd.Cmd):
     @arity(0, 6, [str, int, int, int, int, int])
     def do_getPulseheightVsDAC(self, dacname="vcal", dacstep=1, dacmin=0, dacmax=255, flags=0, nTriggers=10):
         """getPulseheightVsDAC [DAC name] [step size] [min] [max] [flags = 0] [nTriggers = 10]: returns the pulseheight over a 1D DAC scan"""
-        data = self.api.getPulseheightVsDAC(dacname, dacstep, dacmin, dacmax, flags, nTriggers)
+        data = self.scan('getPulseheightVsDAC', dacname, dacstep, dacmin, dacmax, flags, nTriggers)
         self.plot_1d(data, "Pulseheight", dacname, dacmin, dacmax)
 
     def complete_getPulseheightVsDAC(self, text, line, start_index, end_index):
@@ -1315,45 +1364,27 @@ class PxarCoreCmd(cmd.Cmd):
 
     @arity(0, 0, [])
     def do_clkScan(self):
-        """ scanning digital clk and deser phases """
-        n = 10
+        """ scanning digital clk and deser phases: searches the centre of the window of good timings and prints the margins to its edges """
         n_rocs = self.api.getNRocs()
+
+        def check(clk, phase, n):
+            self.set_clock(int(clk), deser160phase=int(phase))
+            self.api.daqTrigger(n, 300)
+            evts = [self.converted_raw_event() for i in range(n)]
+            return sum(ev is not None and len(ev) == n_rocs and all(header in range(2040, 2044) for header in ev) for ev in evts)
+
         self.set_pg(cal=False, res=True)
         self.api.daqStart()
-        print('\nCLK', end=' ')
-        for i in range(8):
-            print('{:2d} '.format(i), end=' ')
-        print()
-        good = []
-        for clk in range(20):
-            if clk in []:
-                continue
-            self.set_clock(clk)
-            print('{:2d}:'.format(clk), end=' ')
-            for phase in range(8):
-                self.api.setTestboardDelays({'deser160phase': phase})
-                # self.api.setTestboardDelays({'clk': clk})
-                self.api.daqTrigger(n, 300)
-                evts = [self.converted_raw_event() for i in range(n)]
-                eff = mean([1 if ev is not None and len(ev) == n_rocs and all(header in range(2040, 2044) for header in ev) else 0 for ev in evts])
-                if eff == 1:
-                    good.append((clk, phase))
-                    print('{c}{eff:1.1f}{e}'.format(eff=eff, c=GREEN, e=ENDC), end=' ')
-                elif eff > .5:
-                    print('{c}{eff:1.1f}{e}'.format(eff=eff, c=YELLOW, e=ENDC), end=' ')
-                elif eff > 0:
-                    print('{c}{eff:1.1f}{e}'.format(eff=eff, c=RED, e=ENDC), end=' ')
-                else:
-                    print(' - ', end=' ')
-            print()
-        if not good:
-            'Did not find any good timing...'
-            return
-        clk, phase = good[(len(good) / 2)]
+        search = WindowSearch(check, 20, 8, n=10)
+        centre, margins = search.run()
+        search.print_map()
+        self.api.daqStop()
         self.set_pg(cal=True, res=True)
-        print('Set CLK/DESER160PHASE to: {}/{}'.format(clk, phase))
-        self.set_clock(clk)
-        self.api.setTestboardDelays({'deser160phase': phase})
+        if centre is None:
+            print('Did not find any good timing...')
+            return
+        print('Set CLK/DESER160PHASE to: {}/{} (margins: clk -{}/+{}, phase -{}/+{})'.format(*centre, *margins['x'], *margins['y']))
+        self.set_clock(centre[0], deser160phase=centre[1])
 
     def complete_clkScan(self):
         # return help for the cmd
@@ -1363,8 +1394,7 @@ class PxarCoreCmd(cmd.Cmd):
     def do_setClkDeser(self, clk, phase):
         """SetClockDelays [value of clk and ctr]: sets the two TB delays clk and ctr """
         print("TB delays clk and ctr set to: ", clk)
-        self.set_clock(clk)
-        self.api.setTestboardDelays({'deser160phase': phase})
+        self.set_clock(clk, deser160phase=phase)
 
     def complete_setClockDelays(self):
         # return help for the cmd
@@ -1509,9 +1539,9 @@ class PxarCoreCmd(cmd.Cmd):
 
         # plot address levels
         self.enable_pix(5, 12)
-        self.window = PxarGui(gClient.GetRoot(), 800, 800)
+        self.window = pxar_gui.PxarGui(ROOT.gClient.GetRoot(), 800, 800)
         plotdata = self.address_level_scan()
-        plot = Plotter.create_th1(plotdata[0], -512, +512, "Address Levels", "ADC", "#")
+        plot = pxar_plotter.Plotter.create_th1(plotdata[0], -512, +512, "Address Levels", "ADC", "#")
         self.window.histos.append(plot)
         self.window.update()
 
@@ -1626,9 +1656,9 @@ class PxarCoreCmd(cmd.Cmd):
     def do_analogLevelScan(self, roc=0, col=5, row=12, offset=0):
         """analogLevelScan: scan the ADC levels of an analog ROC\nTo see all six address levels it is sufficient to activate Pixel 5 12"""
         self.enable_single_pixel(col, row)
-        self.window = PxarGui(gClient.GetRoot(), 800, 800)
+        self.window = pxar_gui.PxarGui(ROOT.gClient.GetRoot(), 800, 800)
         plotdata = self.address_level_scan(10000, offset)
-        plot = Plotter.create_th1(plotdata[roc], -512, +512, "Address Levels", "ADC", "#")
+        plot = pxar_plotter.Plotter.create_th1(plotdata[roc], -512, +512, "Address Levels", "ADC", "#")
         self.window.histos.append(plot)
         self.window.update()
 
@@ -1805,9 +1835,9 @@ class PxarCoreCmd(cmd.Cmd):
         for value in range(start, end + 1):
             print("prints the histo for clk = " + str(value) + "...")
             self.set_clock(value)
-            self.window = PxarGui(gClient.GetRoot(), 800, 800)
+            self.window = pxar_gui.PxarGui(ROOT.gClient.GetRoot(), 800, 800)
             plotdata = self.address_level_scan()
-            plot = Plotter.create_th1(plotdata, -512, +512, "Address Levels for clk = " + str(value), "ADC", "#")
+            plot = pxar_plotter.Plotter.create_th1(plotdata, -512, +512, "Address Levels for clk = " + str(value), "ADC", "#")
             self.window.histos.append(plot)
             self.window.update()
 
@@ -1872,7 +1902,7 @@ class PxarCoreCmd(cmd.Cmd):
                         data.append(px)
             for i in data:
                 print(i)
-            self.window = PxarGui(gClient.GetRoot(), 1000, 800)
+            self.window = pxar_gui.PxarGui(ROOT.gClient.GetRoot(), 1000, 800)
             self.plot_map(data, "maddressDecoding")
 
     def complete_maddressDecoder(self, text, line, start_index, end_index):
@@ -2009,7 +2039,7 @@ class PxarCoreCmd(cmd.Cmd):
                         data.append(px)
                         #            for i in data:
                         #                print i
-            self.window = PxarGui(gClient.GetRoot(), 1000, 800)
+            self.window = pxar_gui.PxarGui(ROOT.gClient.GetRoot(), 1000, 800)
             self.plot_map(data, "maddressDecoding")
 
             # time.sleep(0.1)
@@ -2029,8 +2059,8 @@ class PxarCoreCmd(cmd.Cmd):
     @arity(0, 3, [int, int, int])
     def do_wbcScan(self, min_wbc=90, max_triggers=50, max_wbc=130):
         """do_wbcScan [minimal WBC] [number of events] [maximal WBC]: \n
-        sets wbc from minWBC until it finds the wbc which has more than 90% filled events or it reaches maxWBC \n
-        (default [90] [100] [130])"""
+        scans wbc from minWBC until all ROCs passed their yield peak, refines the wbc of every ROC around its peak with at most [number of events] per wbc \n
+        and sets the wbc with the highest yield (default [90] [50] [130])"""
 
         # prepararations
         print('Turning on HV!')
@@ -2040,47 +2070,32 @@ class PxarCoreCmd(cmd.Cmd):
         self.api.daqStart()
 
         trigger_phases = zeros(10)
-        yields = OrderedDict([(roc, {wbc: 0 for wbc in range(min_wbc, max_wbc)}) for roc in range(self.api.getNEnabledRocs())])
-        set_dacs = {roc: False for roc in yields}
-        print('\nROC EVENT YIELDS:\n  wbc\t{r}'.format(r='\t'.join(('roc' + str(yld)).rjust(6) for yld in list(yields.keys()))))
+        n_rocs = self.api.getNEnabledRocs()
 
-        # loop over wbc
-        for wbc in range(min_wbc, max_wbc):
+        def set_wbcs(values):
+            for roc, value in enumerate(values):
+                self.api.setDAC('wbc', int(value), roc)
             self.clear_buffer()
-            self.api.setDAC('wbc', wbc)
 
-            # loop until you find nTriggers
-            n_triggers = 0
-            while n_triggers < max_triggers:
+        def read_hits(n):
+            k, n_triggers = zeros(n_rocs, 'i'), 0
+            while n_triggers < n:
                 try:
                     data = self.api.daqGetEvent()
                     trigger_phases[data.triggerPhases[0]] += 1
-                    for roc in set([pix.roc for pix in data.pixels]):
-                        yields[roc][wbc] += 1. * 100. / max_triggers
+                    k[list(set([pix.roc for pix in data.pixels]))] += 1
                     n_triggers += 1
                 except RuntimeError:
                     pass
-            y_strings = ['{y:5.1f}%'.format(y=yld) for yld in [yields[roc][wbc] for roc in yields.keys()]]
-            print('  {w:03d}\t{y}'.format(w=wbc, y='\t'.join(y_strings)))
-
-            # stopping criterion
-            best_wbc = max_wbc
-            if wbc > min_wbc + 3:
-                for roc, ylds in yields.items():
-                    if any(yld > 10 for yld in list(ylds.values())[:wbc - min_wbc - 2]):
-                        best_wbc = list(ylds.keys())[list(ylds.values()).index(max(ylds.values()))]
-                        print('set wbc of roc {i} to {v}'.format(i=roc, v=best_wbc))
-                        self.api.setDAC('wbc', best_wbc, roc)
-                        set_dacs[roc] = True
-                if all(set_dacs.values()):
-                    print('found all wbcs')
-
-                    for roc, dic in yields.items():
-                        keys = list(dic.keys())
-                        for key in keys:
-                            if key >= best_wbc + 4:
-                                yields[roc].pop(key)
-                    break
+            return k
+
+        scan = AdaptiveScan(set_wbcs, read_hits, n_rocs, min_wbc, max_wbc, batch=min(10, max_triggers), n_max=max_triggers)
+        best = scan.run()
+        set_wbcs(best)
+        for roc, wbc in enumerate(best):
+            print('set wbc of roc {i} to {v}'.format(i=roc, v=wbc))
+        scan_yields = scan.yields()
+        yields = OrderedDict([(roc, OrderedDict([(wbc, y[roc]) for wbc, y in scan_yields.items() if wbc < max(best) + 4])) for roc in range(n_rocs)])
         self.api.daqStop()
 
         # triggerphase
@@ -2092,11 +2107,11 @@ class PxarCoreCmd(cmd.Cmd):
                 print('{i}\t{d} {v:2.1f}%'.format(i=i, d=int(round(percentage)) * '|', v=percentage))
 
         # plot wbc_scan
-        mg = TMultiGraph('mg_wbc', 'WBC Scans for all ROCs')
+        mg = ROOT.TMultiGraph('mg_wbc', 'WBC Scans for all ROCs')
         colors = list(range(1, len(yields) + 1))
-        l = Plotter.create_legend(nentries=len(yields), x1=.7)
+        l = pxar_plotter.Plotter.create_legend(nentries=len(yields), x1=.7)
         for i, (roc, dic) in enumerate(yields.items()):
-            gr = Plotter.create_graph(x=list(dic.keys()), y=list(dic.values()), tit='wbcs for roc {r}'.format(r=roc), xtit='wbc', ytit='yield [%]', color=colors[i])
+            gr = pxar_plotter.Plotter.create_graph(x=list(dic.keys()), y=list(dic.values()), tit='wbcs for roc {r}'.format(r=roc), xtit='wbc', ytit='yield [%]', color=colors[i])
             l.AddEntry(gr, 'roc{r}'.format(r=roc), 'lp')
             mg.Add(gr, 'lp')
         self.Plotter.plot_histo(mg, draw_opt='a', l=l)
@@ -2109,46 +2124,41 @@ class PxarCoreCmd(cmd.Cmd):
 
     @arity(0, 4, [int, int, int, str])
     def do_latencyScan(self, minlatency=75, maxlatency=85, triggers=50, triggersignal="extern"):
-        """ do_latencyScan [min] [max] [triggers] [signal]: scan the trigger latency from min to max with set number of triggers)"""
+        """ do_latencyScan [min] [max] [triggers] [signal]: scan the trigger latency from min to max until the coincidence yield passed its peak, refine around the peak
+        with at most [triggers] per latency and set the best latency)"""
 
         self.api.testAllPixels(0, None)
         self.api.HVon()
 
-        latencyScan = []
-        print("latency \tyield")
-
-        # loop over latency
-        for latency in range(minlatency, maxlatency):
-            delay = {}
-            delay["triggerlatency"] = latency
-            self.api.setTestboardDelays(delay)
+        def set_latency(values):
+            self.api.daqStop()
+            self.api.setTestboardDelays({'triggerlatency': int(values[0])})
             self.api.daqTriggerSource(triggersignal)
             self.api.daqStart()
-            nHits = 0
-            nTriggers = 0
 
-            # loop until you find maxTriggers
-            while nTriggers < triggers:
+        def read_hits(n):
+            """ :returns: number of events with hits in ROC 1 and 2 """
+            n_hits, n_triggers = 0, 0
+            while n_triggers < n:
                 try:
                     data = self.api.daqGetEvent()
-                    if len(data.pixels) > 0:
-                        rocs = []
-                        for i in range(len(data.pixels)):
-                            rocs.append(data.pixels[i].roc)
-                        if 1 in rocs and 2 in rocs:
-                            nHits += 1
-                    nTriggers += 1
+                    rocs = [pix.roc for pix in data.pixels]
+                    n_hits += 1 in rocs and 2 in rocs
+                    n_triggers += 1
                 except RuntimeError:
                     pass
+            return array([n_hits])
 
-            hitYield = 100 * nHits / triggers
-            latencyScan.append(hitYield)
-            print('{0:03d}'.format(latency), "\t", '{0:3.0f}%'.format(hitYield))
-            self.api.daqStop()
+        scan = AdaptiveScan(set_latency, read_hits, 1, minlatency, maxlatency, batch=min(10, triggers), n_max=triggers, shared=True)
+        best = scan.run()[0]
+        set_latency([best])
+        self.api.daqStop()
+        print('set trigger latency to {}'.format(best))
+        latencyScan = [y[0] for y in scan.yields().values()]
 
         if (self.window):
-            self.window = PxarGui(gClient.GetRoot(), 1000, 800)
-            plot = Plotter.create_tgraph(latencyScan, "latency scan", "trigger latency", "evt/trig [%]", minlatency)
+            self.window = pxar_gui.PxarGui(ROOT.gClient.GetRoot(), 1000, 800)
+            plot = pxar_plotter.Plotter.create_tgraph(latencyScan, "latency scan", "trigger latency", "evt/trig [%]", minlatency)
             self.window.histos.append(plot)
             self.window.update()
 
@@ -2355,7 +2365,7 @@ class PxarCoreCmd(cmd.Cmd):
         self.api.daqStop()
 
         print("\ntest took: ", round(time() - t, 2), "s")
-        plot = Plotter.create_th2(d, 0, 417 if module else 53, 0, 161 if module else 81, "hitmap", 'pixels x', 'pixels y', "hitmap")
+        plot = pxar_plotter.Plotter.create_th2(d, 0, 417 if module else 53, 0, 161 if module else 81, "hitmap", 'pixels x', 'pixels y', "hitmap")
         self.plot_graph(plot, draw_opt='hist')
 
     def complete_hit_map(self):
@@ -2413,8 +2423,8 @@ class PxarCoreCmd(cmd.Cmd):
                 sys.stdout.flush()
             self.api.daqStop()
 
-        self.window = PxarGui(gClient.GetRoot(), 1000, 800)
-        plot = Plotter.create_th2(vcal_thresh, 0, 52, 0, 80, 'trim verfication', 'col', 'row', 'thresh')
+        self.window = pxar_gui.PxarGui(ROOT.gClient.GetRoot(), 1000, 800)
+        plot = pxar_plotter.Plotter.create_th2(vcal_thresh, 0, 52, 0, 80, 'trim verfication', 'col', 'row', 'thresh')
         self.window.histos.append(plot)
         self.window.update()
         self.elapsed_time(start_time)
@@ -2481,15 +2491,15 @@ class PxarCoreCmd(cmd.Cmd):
 
         if do_plot:
             # plot ph vs vcal
-            # self.window = PxarGui(gClient.GetRoot(), 1000, 800)
-            plot = Plotter.create_tgraph(ph_y[0][20], "ph scan", "vcal", "ph", 0, vcal_high_x)
+            # self.window = pxar_gui.PxarGui(ROOT.gClient.GetRoot(), 1000, 800)
+            plot = pxar_plotter.Plotter.create_tgraph(ph_y[0][20], "ph scan", "vcal", "ph", 0, vcal_high_x)
             plot.SetMarkerSize(0.5)
             plot.SetMarkerStyle(20)
-            plot2 = Plotter.create_tgraph(ph_y[0][40], "ph scan", "vcal", "ph", 0, vcal_high_x)
+            plot2 = pxar_plotter.Plotter.create_tgraph(ph_y[0][40], "ph scan", "vcal", "ph", 0, vcal_high_x)
             plot2.SetMarkerSize(0.5)
             plot2.SetMarkerStyle(20)
             plot2.SetMarkerColor(3)
-            c1 = TCanvas('c1', 'c1', 800, 800)
+            c1 = ROOT.TCanvas('c1', 'c1', 800, 800)
             c1.DrawFrame(0, 0, 1900, 200)
             plot.Draw('P')
             plot2.Draw('P')
@@ -2802,34 +2812,36 @@ class PxarCoreCmd(cmd.Cmd):
         # return help for the cmd
         return [self.do_adjust_black.__doc__, '']
 
-    @arity(0, 2, [int, str])
-    def do_marie_can_save(self, events=1000, filename=None):
+    @arity(0, 3, [int, str, int])
+    def do_marie_can_save(self, events=1000, filename=None, raw=False):
         """
-        Saves <n> events to file
+        Saves <n> events to a binary file, which can be read with src.event_recorder.EventReader
         :param events:\t number of saved events
         :param filename:
+        :param raw:\t save the raw DTB words instead of the decoded hits
         """
         if filename is None:
-            filename = 'saved_events_' + strftime('%H:%M:%S_%d.%m.')
-        conf_triggers = 0
+            filename = 'saved_events_' + strftime('%H:%M:%S_%d.%m.') + '.bin'
         hits = 0
-        f = open(filename, 'w')
+        recorder = EventRecorder(filename, RAW if raw else HITS)
 
         self.api.daqStart()
-        while conf_triggers < events:
+        while recorder.NEvents + recorder.NPending < events:
             try:
-                data = self.api.daqGetEvent()
-                f.write(str(data) + '\n')
-                if len(data.pixels) > 0:
-                    hits += 1
-                print('\rprocess:', '{0:6d}'.format(conf_triggers) + '/' + str(events), end=' ')
+                if raw:
+                    data = [self.api.daqGetRawEvent()]
+                else:
+                    data = self.api.daqGetEventBuffer()[:events - recorder.NEvents - recorder.NPending]
+                    hits += sum(1 for ev in data if len(ev.pixels) > 0)
+                recorder.write(data)
+                print('\rprocess:', '{0:6d}'.format(recorder.NEvents + recorder.NPending) + '/' + str(events), end=' ')
                 sys.stdout.flush()
-                conf_triggers += 1
             except RuntimeError:
                 pass
         self.api.daqStop()
-        print('\rhit yield:', "{0:5.2f}%".format(hits / float(events) * 100), '({hits}/{events})'.format(hits=hits, events=events))
-        f.close()
+        recorder.close()
+        if not raw:
+            print('\rhit yield:', "{0:5.2f}%".format(hits / float(events) * 100), '({hits}/{events})'.format(hits=hits, events=events))
 
     def complete_marie_can_save(self):
         # return help for the cmd
@@ -2878,7 +2890,7 @@ class PxarCoreCmd(cmd.Cmd):
     @arity(2, 2, [int, int])
     def do_setZaxis(self, low, high, cont=None):
         """ checkADCTimeConstant [vcal=200] [ntrig=10]: sends an amount of triggers for a fixed vcal in high/low region and prints adc values"""
-        c = gROOT.GetListOfCanvases()[-1]
+        c = ROOT.gROOT.GetListOfCanvases()[-1]
         for item in c.GetListOfPrimitives():
             if item.GetName() not in ['TFrame', 'title']:
                 item.GetZaxis().SetRangeUser(low, high)
@@ -2897,7 +2909,7 @@ class PxarCoreCmd(cmd.Cmd):
             self.api.setDAC(dac_str, dac)
             efficiencies.append(self.eff_check(ntrig, col, row, vcal if dac_str != 'vcal' else dac))
         print()
-        gr = Plotter.create_graph(list(range(start, stop)), efficiencies, 'Efficiency Vs {0}'.format(dac_str.title()), '{d} [dac]'.format(d=dac_str), 'Efficiency [%]')
+        gr = pxar_plotter.Plotter.create_graph(list(range(start, stop)), efficiencies, 'Efficiency Vs {0}'.format(dac_str.title()), '{d} [dac]'.format(d=dac_str), 'Efficiency [%]')
         self.plot_graph(gr)
         self.api.daqStop()
 
@@ -2931,7 +2943,7 @@ class PxarCoreCmd(cmd.Cmd):
                 if vcal == 255 and eff < .99:
                     thresholds.append(0)
         print()
-        gr = Plotter.create_graph(vanas, thresholds, 'Vana vs. Threshold (trimmed to 40 vcal)', 'vana [dac]', 'measured threshold [vcal]')
+        gr = pxar_plotter.Plotter.create_graph(vanas, thresholds, 'Vana vs. Threshold (trimmed to 40 vcal)', 'vana [dac]', 'measured threshold [vcal]')
         self.plot_graph(gr)
         self.api.daqStop()
 
@@ -2951,7 +2963,7 @@ class PxarCoreCmd(cmd.Cmd):
         for ev in d:
             for px in ev.pixels:
                 data[px.column][px.row] += 1
-        th2d = Plotter.create_th2(data, 0, 52, 0, 80, 'Noise Map for Pix {c} {r}'.format(r=row, c=col), 'col', 'row', 'hits')
+        th2d = pxar_plotter.Plotter.create_th2(data, 0, 52, 0, 80, 'Noise Map for Pix {c} {r}'.format(r=row, c=col), 'col', 'row', 'hits')
         th2d.SetStats(0)
         self.plot_graph(th2d, .1, .14, 'colz')
         self.api.daqStop()
@@ -2971,7 +2983,7 @@ class PxarCoreCmd(cmd.Cmd):
             sleep(.01)
             iana = mean([self.api.getTBia() for _ in range(10)]) * 1000
             ianas.append(iana)
-        gr = Plotter.create_graph(vanas, ianas, 'Analogue Current', 'vana [dac]', 'iana [mA]')
+        gr = pxar_plotter.Plotter.create_graph(vanas, ianas, 'Analogue Current', 'vana [dac]', 'iana [mA]')
         self.plot_graph(gr)
         self.api.setDAC('vana', old_vana)
 
@@ -3032,12 +3044,12 @@ class PxarCoreCmd(cmd.Cmd):
         data_low = self.scan_vcal(0, ntrig)
         data_high = self.scan_vcal(4, ntrig)
         fac = self.find_factor(data_low, data_high)
-        gr1 = Plotter.create_graph(list(data_low.keys()), list(data_low.values()), 'gr1', xtit='vcal', ytit='adc')
-        gr2 = Plotter.create_graph([key * fac for key in data_high.keys()], list(data_high.values()), 'gr2', xtit='vcal', ytit='adc')
+        gr1 = pxar_plotter.Plotter.create_graph(list(data_low.keys()), list(data_low.values()), 'gr1', xtit='vcal', ytit='adc')
+        gr2 = pxar_plotter.Plotter.create_graph([key * fac for key in data_high.keys()], list(data_high.values()), 'gr2', xtit='vcal', ytit='adc')
         gr1.SetLineColor(3)
         gr1.SetMarkerColor(3)
-        mg = TMultiGraph('mg_sv', 'ADC Calibration')
-        fit = TF1('fit', '[3]*(TMath::Erf((x-[0])/[1])+[2])', 0, 2000)
+        mg = ROOT.TMultiGraph('mg_sv', 'ADC Calibration')
+        fit = ROOT.TF1('fit', '[3]*(TMath::Erf((x-[0])/[1])+[2])', 0, 2000)
         fit.SetNpx(1000)
         fit.SetParameters(500, 600, 1, 80)
         gr2.Fit('fit')
@@ -3054,7 +3066,7 @@ class PxarCoreCmd(cmd.Cmd):
 
     @arity(2, 4, [int, int, int, int])
     def do_threshVsCounts(self, start, stop, duration=10, wbc=110):
-        gr = TGraph()
+        gr = ROOT.TGraph()
         for i, vthr in enumerate(range(start, stop)):
             self.api.setDAC('vthrcomp', vthr)
             counts = self.count_hits(duration, wbc)
@@ -3069,7 +3081,7 @@ class PxarCoreCmd(cmd.Cmd):
 
     @arity(0, 2, [int, int])
     def do_effVsMaskedPix(self, n=5, n_trig=100):
-        gr = TGraph()
+        gr = ROOT.TGraph()
         for i in range(n):
             self.mask_frame(i)
             data = self.api.getEfficiencyMap(896, n_trig)
@@ -3137,10 +3149,10 @@ class PxarCoreCmd(cmd.Cmd):
         self.api.HVon()
         t_start = time()
         self.api.testAllPixels(0)
-        gRandom.SetSeed(int(time()))
+        ROOT.gRandom.SetSeed(int(time()))
         for roc in range(self.api.getNRocs()):
             for _ in range(1):
-                col, row = [int(gRandom.Rndm() * i) for i in [52, 80]]
+                col, row = [int(ROOT.gRandom.Rndm() * i) for i in [52, 80]]
                 print(col, row)
                 self.api.testPixel(col, row, 1, roc)
         self.api.daqStart()
@@ -3164,8 +3176,8 @@ class PxarCoreCmd(cmd.Cmd):
     @arity(0, 1, [int])
     def do_getTriggerPhase(self, n_events=100):
         events = 0
-        gROOT.ProcessLine("gErrorIgnoreLevel = kError;")
-        h = TH1I('h_tp', 'Trigger Phases', 10, 0, 10)
+        ROOT.gROOT.ProcessLine("gErrorIgnoreLevel = kError;")
+        h = ROOT.TH1I('h_tp', 'Trigger Phases', 10, 0, 10)
         h.GetXaxis().SetTitle('Trigger Phase')
         self.api.daqTriggerSource('extern')
         self.api.daqStart()
@@ -3199,7 +3211,7 @@ class PxarCoreCmd(cmd.Cmd):
         data = self.api.daqGetEventBuffer()
         self.api.daqStop()
         adcs = [px.value for evt in data for px in evt.pixels]
-        h = TH1I('h_adc', 'ACD Distribution for vcal {v} in {h} Range'.format(v=vcal, h='high' if high else 'low'), 255, 0, 255)
+        h = ROOT.TH1I('h_adc', 'ACD Distribution for vcal {v} in {h} Range'.format(v=vcal, h='high' if high else 'low'), 255, 0, 255)
         for adc in adcs:
             h.Fill(adc)
         self.plot_graph(h, draw_opt='')
@@ -3232,7 +3244,7 @@ class PxarCoreCmd(cmd.Cmd):
         self.api.HVoff()
         self.setPG()
         data = [pix for ev in data for pix in ev.pixels]
-        h = TH1I('h', 'h', 512, -256, 256)
+        h = ROOT.TH1I('h', 'h', 512, -256, 256)
         for pix in data:
             h.Fill(pix.value)
         self.plot_graph(h, draw_opt='')
@@ -3291,6 +3303,7 @@ def main(sysargs=None):
     parser.add_argument('--run', '-r', metavar="FILE", help="Load a cmdline script to be executed before entering the prompt.")
     parser.add_argument('--verbosity', '-v', metavar="LEVEL", default="INFO", help="The output verbosity set in the pxar API.")
     parser.add_argument('--trim', '-T', nargs='?', default=None, help="The output verbosity set in the pxar API.")
+    parser.add_argument('--profile', '-p', nargs='?', default=None, const='time', choices=['time', 'cprofile', 'memory', 'all'], help="Log the timing of every command.")
     args = parser.parse_args(sysargs)
 
     print('\n=================================================')
@@ -3301,6 +3314,8 @@ def main(sysargs=None):
 
     # start command line
     prompt = PxarCoreCmd(api, args.gui, args.dir)
+    if args.profile is not None:
+        prompt.enable_profiling(args.profile in ['cprofile', 'all'], args.profile in ['memory', 'all'])
 
     # run the startup script if requested
     if args.run:
@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# --------------------------------------------------------
+#       Benchmarks of the stages of the python DAQ-to-disk chain (run from the python directory: python -m benchmarks.daq_chain)
+# created on October 19th 2026 by agent (agent@local)
+# --------------------------------------------------------
+
+from collections import OrderedDict
+from json import dump, load
+from multiprocessing import get_context
+from os import chdir, makedirs
+from os.path import join, dirname, realpath, isfile
+from platform import node, python_version
+from resource import getrusage, RUSAGE_SELF
+from tempfile import TemporaryDirectory
+from sys import exit
+from time import perf_counter, strftime
+from numpy import concatenate, full, __version__ as np_version
+from helpers.utils import info, warning, critical
+
+Dir = dirname(realpath(__file__))
+
+
+def max_rss():
+    """ :returns: peak resident set size of the process [MB] """
+    return getrusage(RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(f, n_events, n_hits):
+    """ times f() and calculates the rates with the number of events and hits (ints or functions which are called after f).
+        The peak RSS is a high-water mark, so the increase is the additional memory the stage needed on top of everything before it. """
+    rss = max_rss()
+    t = perf_counter()
+    f()
+    t = perf_counter() - t
+    n_events, n_hits = [n() if callable(n) else n for n in [n_events, n_hits]]
+    return {'time': t, 'n_events': n_events, 'n_hits': n_hits, 'events_per_s': n_events / t if n_events else None, 'hits_per_s': n_hits / t if n_hits else None,
+            'peak_rss_mb': max_rss(), 'rss_increase_mb': max_rss() - rss}
+
+
+# -----------------------------------------
+# region SOURCE
+def make_mock(opts):
+    from src.mock_pxar import MockPxarCore
+    api = MockPxarCore(hit_rate=opts['hit_rate'], events_per_read=opts['batch_size'], seed=opts['seed'])
+    api.initTestboard({}, {}, [])
+    api.initDUT([31], b'tbm08c', [{}] if opts['tbm'] else [], b'psi46dig' if opts['inverted'] else b'psi46digv21respin', [{}] * opts['rocs'], [[]] * opts['rocs'])
+    api.daqTriggerSource(b'extern')
+    api.daqStart()
+    return api
+
+
+def load_words(opts):
+    """ :returns: the raw DTB stream of the replay file or of [n_events] events of the mock API """
+    if opts['replay'] is not None:
+        from src.event_recorder import EventReader
+        return concatenate([words for _, words in EventReader(opts['replay']).batches()])
+    api = make_mock(opts)
+    return concatenate([api.generate(min(opts['batch_size'], opts['n_events'] - i)) for i in range(0, opts['n_events'], opts['batch_size'])])
+
+
+def load_arrays(opts):
+    from src.raw_stream import decode_stream
+    return decode_stream(load_words(opts), opts['rocs'], opts['tbm'], opts['inverted'])[0]
+
+
+def load_events(opts):
+    from src.raw_stream import make_events
+    return make_events(load_arrays(opts))
+
+
+def make_config_dir(path, n_rocs):
+    """ writes a minimal pxar configuration directory for the mock API """
+    makedirs(path, exist_ok=True)
+    pars = {'configParameters': [('testboardName', 'mock'), ('rocType', 'psi46digv21respin'), ('nRocs', n_rocs), ('nTbms', 0), ('tbParameters', 'tbParameters.dat'),
+                                 ('dacParameters', 'dacParameters'), ('trimParameters', 'trimParameters'), ('maskFile', 'defaultMaskFile.dat'), ('hubId', 31)]}
+    with open(join(path, 'configParameters.dat'), 'w') as f:
+        f.writelines(f'{key} {value}\n' for key, value in pars['configParameters'])
+    with open(join(path, 'tbParameters.dat'), 'w') as f:
+        f.writelines(f'{i} {key} {value}\n' for i, (key, value) in enumerate([('clk', 4), ('ctr', 4), ('sda', 19), ('tin', 9), ('deser160phase', 4)]))
+    dacs = [(2, 'vana', 80), (11, 'vthrcomp', 90), (17, 'phoffset', 150), (20, 'phscale', 100), (25, 'vcal', 200), (26, 'caldel', 120), (253, 'ctrlreg', 0), (254, 'wbc', 100)]
+    for roc in range(n_rocs):
+        with open(join(path, f'dacParameters_C{roc}.dat'), 'w') as f:
+            f.writelines(f'{i} {key} {value}\n' for i, key, value in dacs)
+        with open(join(path, f'trimParameters_C{roc}.dat'), 'w') as f:
+            f.writelines(f'15 Pix {col} {row}\n' for col in range(52) for row in range(80))
+    open(join(path, 'defaultMaskFile.dat'), 'w').close()
+    return path
+# endregion SOURCE
+# -----------------------------------------
+
+
+# -----------------------------------------
+# region STAGES
+def bench_fetch(opts):
+    """ daqGetEventBuffer of the mock API or of the replayed raw stream """
+    if opts['replay'] is not None:
+        from src.raw_stream import RawStreamReplay
+        api = RawStreamReplay(opts['replay'], opts['rocs'], opts['tbm'], opts['inverted'])
+    else:
+        api = make_mock(opts)
+    events = []
+
+    def f():
+        try:
+            while len(events) < opts['n_events'] or opts['replay'] is not None:
+                events.extend(api.daqGetEventBuffer())
+        except RuntimeError:  # end of the replayed stream
+            pass
+    return measure(f, lambda: len(events), lambda: sum(len(ev.pixels) for ev in events))
+
+
+def bench_decode(opts):
+    from src.raw_stream import decode_stream
+    words = load_words(opts)
+    out = []
+    return measure(lambda: out.append(decode_stream(words, opts['rocs'], opts['tbm'], opts['inverted'])[0]), lambda: len(out[0]), lambda: out[0].hits.size)
+
+
+def bench_make_events(opts):
+    """ creation of the python events from the decoded arrays """
+    from src.raw_stream import make_events
+    arrays = load_arrays(opts)
+    return measure(lambda: make_events(arrays), len(arrays), arrays.hits.size)
+
+
+def bench_from_events(opts):
+    """ conversion of python events to EventArrays as done by the writers """
+    from src.event_arrays import EventArrays
+    events = load_events(opts)
+    return measure(lambda: EventArrays.from_events(events), len(events), sum(len(ev.pixels) for ev in events))
+
+
+def make_hdf5_writer(opts):
+    """ the stages reset NHits after the measurement, such that __del__ does not save the file again """
+    from src.hdf5_writer import HDF5Writer
+    w = HDF5Writer('main')
+    w.NPlanes = opts['rocs']
+    w.Hits, w.Clusters, w.NClusters = w.init_list(), w.init_list(), w.init_list()
+    return w
+
+
+def bench_get_vcal(opts):
+    """ FileWriter.get_vcal with synthetic calibration parameters for the first [vcal_hits] hits """
+    w = make_hdf5_writer(opts)
+    w.Parameters = full((opts['rocs'], w.NCols, w.NRows, 4), [150., 300., 1., 100.])
+    hits = load_arrays(opts).hits[:opts['vcal_hits']]
+    res = measure(lambda: [w.get_vcal(*hit) for hit in hits[['roc', 'column', 'row', 'value']].tolist()], 0, hits.size)
+    w.NHits = []
+    return res
+
+
+def bench_hdf5_add_data(opts):
+    w = make_hdf5_writer(opts)
+    events = load_events(opts)
+    res = measure(lambda: w.add_data(events), len(events), sum(len(ev.pixels) for ev in events))
+    w.NHits = []
+    return res
+
+
+def bench_clusterise(opts):
+    w = make_hdf5_writer(opts)
+    w.add_data(load_events(opts))
+    w.make_arrays()
+    res = measure(w.clusterise, w.NEvents, sum(hits.size for hits in w.Hits))
+    w.NHits = []
+    return res
+
+
+def bench_save_file(opts):
+    w = make_hdf5_writer(opts)
+    w.add_data(load_events(opts))
+    w.convert()
+    res = measure(w.save_file, w.NEvents, sum(hits.size for hits in w.Hits))
+    w.NHits = []
+    return res
+
+
+def bench_tree_ljubljana(opts):
+    from src.TreeWriterLjubljana import TreeWriterLjubljana
+    arrays = load_arrays(opts)
+    makedirs('data')  # the run number file is read before the data directory gets created
+    open(join('data', 'run_0.root'), 'w').close()  # copy_file requires a previous run
+    w = TreeWriterLjubljana()
+    return measure(lambda: (w.write_batch(arrays), w.close()), len(arrays), arrays.hits.size)
+
+
+def bench_tree_short(opts):
+    from src.TreeWriterShort import TreeWriter
+    arrays = load_arrays(opts)
+    w = TreeWriter()
+    return measure(lambda: (w.open(), w.append(arrays), w.close()), len(arrays), arrays.hits.size)
+
+
+def bench_tree_errors(opts):
+    from src.TreeWriterErrors import TreeWriter
+    arrays = load_arrays(opts)
+    return measure(lambda: TreeWriter(None).write_arrays(arrays), len(arrays), arrays.hits.size)
+
+
+def bench_plot_map(opts):
+    """ iCLIX.plot_map of the efficiency map of all pixels (the rates are in pixels/s) """
+    from helpers.draw import set_root_output
+    from iCLIX import CLIX
+    set_root_output(False)
+    z = CLIX(make_config_dir(join(opts['tmp'], 'config'), opts['rocs']), 'WARNING', '', mock=True)
+    data = z.API.getEfficiencyMap(0, 10)
+    return measure(lambda: z.plot_map(data, 'Efficiency Map', stats=False), 0, len(data))
+
+
+Stages = OrderedDict([('fetch', bench_fetch), ('decode', bench_decode), ('make_events', bench_make_events), ('from_events', bench_from_events), ('get_vcal', bench_get_vcal),
+                      ('hdf5_add_data', bench_hdf5_add_data), ('clusterise', bench_clusterise), ('save_file', bench_save_file), ('tree_ljubljana', bench_tree_ljubljana),
+                      ('tree_short', bench_tree_short), ('tree_errors', bench_tree_errors), ('plot_map', bench_plot_map)])
+# endregion STAGES
+# -----------------------------------------
+
+
+def run_stage(name, opts):
+    """ runs a single stage inside the temporary directory [opts['tmp']], such that the writers do not touch the working directory. """
+    opts = dict(opts, tmp=join(opts['tmp'], name))
+    makedirs(opts['tmp'])
+    chdir(opts['tmp'])
+    try:
+        return Stages[name](opts)
+    except ImportError as err:
+        return {'skipped': f'missing module {err.name}'}
+    except Exception as err:  # report the broken stage and carry on with the others
+        return {'failed': f'{err.__class__.__name__}: {err}'}
+
+
+def run(stages, opts):
+    """ runs every stage in a fresh process to separate the peak RSS of the stages. """
+    results = OrderedDict()
+    with TemporaryDirectory() as tmp:
+        for name in stages:
+            with get_context('spawn').Pool(1) as pool:
+                results[name] = pool.apply(run_stage, (name, dict(opts, tmp=tmp)))
+            res = results[name]
+            info(f'{name}: ' + (res['skipped'] if 'skipped' in res else f'failed ({res["failed"]})' if 'failed' in res else f'{res["time"]:.3f} s'))
+    return {'meta': {'time': strftime('%Y-%m-%d %H:%M:%S'), 'host': node(), 'python': python_version(), 'numpy': np_version, 'options': opts}, 'results': results}
+
+
+def compare(data, baseline, tolerance=.2):
+    """ prints the results with the ratio to the baseline. :returns: list of regressions (rate lower or peak RSS higher than the [tolerance]) """
+    regressions = []
+    print(f'{"stage":<16}{"events/s":>12}{"hits/s":>12}{"peak RSS":>10}{"vs. baseline":>14}')
+    for name, res in data['results'].items():
+        if 'skipped' in res:
+            print(f'{name:<16}  skipped ({res["skipped"]})')
+            continue
+        if 'failed' in res:
+            print(f'{name:<16}  failed ({res["failed"]})')
+            regressions.append(f'{name}: failed')
+            continue
+        old = baseline.get('results', {}).get(name, {}) if baseline else {}
+        key = 'events_per_s' if res['events_per_s'] else 'hits_per_s'
+        ratio = res[key] / old[key] if old.get(key) else None
+        if ratio is not None and ratio < 1 - tolerance:
+            regressions.append(f'{name}: {key} dropped to {ratio:.0%} of the baseline')
+        if old.get('peak_rss_mb') and res['peak_rss_mb'] > (1 + tolerance) * old['peak_rss_mb']:
+            regressions.append(f'{name}: peak RSS {res["peak_rss_mb"]:.0f} MB > {old["peak_rss_mb"]:.0f} MB in the baseline')
+        rates = [f'{res[k]:>12.4g}' if res[k] else f'{"-":>12}' for k in ['events_per_s', 'hits_per_s']]
+        print(f'{name:<16}{"".join(rates)}{res["peak_rss_mb"]:>8.0f}MB{f"{ratio:.2f}" if ratio else "-":>14}')
+    return regressions
+
+
+if __name__ == '__main__':
+
+    from argparse import ArgumentParser
+    aparser = ArgumentParser(description='benchmarks the stages of the DAQ-to-disk chain with the mock API or a recorded raw stream')
+    aparser.add_argument('stages', nargs='*', default=list(Stages), help=f'stages to run [default = all: {", ".join(Stages)}]')
+    aparser.add_argument('-n', '--n_events', type=int, default=100000, help='number of emulated events [default = 100000]')
+    aparser.add_argument('-b', '--batch_size', type=int, default=10000, help='number of events per daqGetEventBuffer call [default = 10000]')
+    aparser.add_argument('-r', '--rocs', type=int, default=1, help='number of ROCs [default = 1]')
+    aparser.add_argument('--hit_rate', type=float, default=.5, help='mean number of clusters per event and ROC [default = .5]')
+    aparser.add_argument('--tbm', action='store_true', help='emulate/decode a TBM data stream')
+    aparser.add_argument('--inverted', action='store_true', help='inverted row address (psi46dig)')
+    aparser.add_argument('--replay', default=None, help='raw stream of the EventRecorder to use instead of the mock API')
+    aparser.add_argument('--vcal_hits', type=int, default=20000, help='number of hits for the get_vcal stage [default = 20000]')
+    aparser.add_argument('--seed', type=int, default=1)
+    aparser.add_argument('-o', '--out', default=join(Dir, 'results.json'), help='output json file [default = benchmarks/results.json]')
+    aparser.add_argument('--baseline', default=join(Dir, 'baseline.json'), help='json file to compare with [default = benchmarks/baseline.json]')
+    aparser.add_argument('--save_baseline', action='store_true', help='store the results as new baseline')
+    aparser.add_argument('-t', '--tolerance', type=float, default=.2, help='allowed relative slow-down before reporting a regression [default = .2]')
+    pargs = aparser.parse_args()
+
+    if any(stage not in Stages for stage in pargs.stages):
+        critical(f'unknown stages: {[stage for stage in pargs.stages if stage not in Stages]}')
+    options = {key: getattr(pargs, key) for key in ['n_events', 'batch_size', 'rocs', 'hit_rate', 'tbm', 'inverted', 'replay', 'vcal_hits', 'seed']}
+    d = run(pargs.stages, options)
+    with open(pargs.out, 'w') as fout:
+        dump(d, fout, indent=2)
+    base = None
+    if isfile(pargs.baseline):
+        with open(pargs.baseline) as fin:
+            base = load(fin)
+    reg = compare(d, base, pargs.tolerance)
+    info(f'saved the results in {pargs.out}')
+    if pargs.save_baseline:
+        with open(pargs.baseline, 'w') as fout:
+            dump(d, fout, indent=2)
+        info(f'saved the results as baseline in {pargs.baseline}')
+    for r in reg:
+        warning(r)
+    exit(1 if reg else 0)
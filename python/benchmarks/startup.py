@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# --------------------------------------------------------
+#       Startup time of the command line tools (run from the python directory: python -m benchmarks.startup)
+# created on October 19th 2026 by agent (agent@local)
+# --------------------------------------------------------
+
+from collections import OrderedDict
+from json import dump, load, loads
+from os.path import join, dirname, realpath, isfile
+from platform import node, python_version
+from statistics import median
+from subprocess import run as run_cmd
+from sys import executable, exit
+from time import perf_counter, strftime
+from helpers.utils import info, warning, critical, do_nothing
+
+Dir = dirname(realpath(__file__))
+PyDir = dirname(Dir)
+
+# the scripts are started with --help, such that they exit right after the imports
+Scripts = OrderedDict([('iCLIX', 'iCLIX.py'), ('CLIX', 'CLIX.py'), ('clean_data', 'clean_data.py'), ('change_i2c', 'change_i2c.py'), ('find_i2c', 'find_i2c.py')])
+Heavy = ['ROOT', 'h5py', 'uncertainties', 'progressbar', 'screeninfo', 'pxar_gui', 'lib.PyPxarCore']
+
+Wrapper = '''
+import sys, runpy, json
+from importlib import import_module
+for name in {preload}:
+    try:
+        import_module(name)
+    except Exception:
+        pass
+sys.argv = [{script!r}, '--help']
+error = None
+try:
+    runpy.run_path({script!r}, run_name='__main__')
+except SystemExit:
+    pass
+except BaseException as err:
+    error = f'{{err.__class__.__name__}}: {{err}}'
+print(json.dumps({{'loaded': [m for m in {heavy} if m in sys.modules], 'error': error}}))
+'''
+
+
+def start(script, preload=()):
+    """ :returns: wall time [s] to start [script] in a new interpreter, the loaded heavy modules and the error """
+    t = perf_counter()
+    p = run_cmd([executable, '-c', Wrapper.format(script=script, preload=list(preload), heavy=Heavy)], cwd=PyDir, capture_output=True, text=True)
+    t = perf_counter() - t
+    lines = [line for line in p.stdout.splitlines() if line.startswith('{"loaded"')]  # the scripts may print at exit
+    res = loads(lines[-1]) if lines else {'loaded': [], 'error': p.stderr.strip().splitlines()[-1] if p.stderr.strip() else 'no output'}
+    return t, res['loaded'], res['error']
+
+
+def measure(script, n, preload=()):
+    times, loaded, error = [], [], None
+    for _ in range(n):
+        t, loaded, error = start(script, preload)
+        times.append(t)
+    return {'median': median(times), 'min': min(times), 'loaded': loaded, 'error': error}
+
+
+def run(scripts, n, preload):
+    """ starts every script [n] times as it is and with the [preload] modules imported before (as it was with eager imports) """
+    results = OrderedDict()
+    start(Scripts[scripts[0]])  # warm up the file system cache
+    for name in scripts:
+        info(f'starting {name} {n} times ...')
+        results[name] = {'lazy': measure(Scripts[name], n)}
+        results[name]['eager'] = measure(Scripts[name], n, preload) if preload else None
+    return {'host': node(), 'time': strftime('%Y-%m-%d %H:%M:%S'), 'python': python_version(), 'n': n, 'preload': preload, 'results': results}
+
+
+def compare(data, baseline, tolerance=.2):
+    """ prints the startup times with the preloaded times and the baseline. :returns: list of regressions (median slower than the [tolerance]) """
+    regressions = []
+    print(f'{"script":<12}{"median [s]":>12}{"min [s]":>10}{"eager [s]":>11}{"vs. baseline":>14}  loaded')
+    for name, res in data['results'].items():
+        lazy, eager = res['lazy'], res['eager']
+        old = baseline.get('results', {}).get(name, {}).get('lazy', {}) if baseline else {}
+        ratio = lazy['median'] / old['median'] if old.get('median') and not lazy['error'] else None
+        if ratio is not None and ratio > 1 + tolerance:
+            regressions.append(f'{name}: startup took {ratio:.0%} of the baseline')
+        eager_str = f'{eager["median"]:.3f}' if eager else '-'
+        print(f'{name:<12}{lazy["median"]:>12.3f}{lazy["min"]:>10.3f}{eager_str:>11}{f"{ratio:.2f}" if ratio else "-":>14}  {", ".join(lazy["loaded"])}')
+        warning(f'{name} failed: {lazy["error"]}') if lazy['error'] else do_nothing()
+    return regressions
+
+
+if __name__ == '__main__':
+
+    from argparse import ArgumentParser
+    aparser = ArgumentParser(description='measures the startup time of the command line tools')
+    aparser.add_argument('scripts', nargs='*', default=list(Scripts), help=f'scripts to start [default = all: {", ".join(Scripts)}]')
+    aparser.add_argument('-n', type=int, default=5, help='number of starts per script [default = 5]')
+    aparser.add_argument('-p', '--preload', nargs='*', default=['ROOT', 'h5py'], help='modules to import before for the eager comparison [default = ROOT h5py]')
+    aparser.add_argument('-o', '--out', default=join(Dir, 'startup.json'), help='output json file [default = benchmarks/startup.json]')
+    aparser.add_argument('--baseline', default=join(Dir, 'startup_baseline.json'), help='json file to compare with [default = benchmarks/startup_baseline.json]')
+    aparser.add_argument('--save_baseline', action='store_true', help='store the results as new baseline')
+    aparser.add_argument('-t', '--tolerance', type=float, default=.2, help='allowed relative slow-down before reporting a regression [default = .2]')
+    pargs = aparser.parse_args()
+
+    if any(script not in Scripts for script in pargs.scripts):
+        critical(f'unknown scripts: {[script for script in pargs.scripts if script not in Scripts]}')
+    d = run(pargs.scripts, pargs.n, pargs.preload)
+    with open(pargs.out, 'w') as fout:
+        dump(d, fout, indent=2)
+    base = None
+    if isfile(pargs.baseline):
+        with open(pargs.baseline) as fin:
+            base = load(fin)
+    reg = compare(d, base, pargs.tolerance)
+    info(f'saved the results in {pargs.out}')
+    if pargs.save_baseline:
+        with open(pargs.baseline, 'w') as fout:
+            dump(d, fout, indent=2)
+        info(f'saved the results as baseline in {pargs.baseline}')
+    for r in reg:
+        warning(r)
+    exit(1 if reg else 0)
@@ -4,8 +4,6 @@
 # created on February 15th 2018 by M. Reichmann (remichae@phys.ethz.ch)
 # --------------------------------------------------------
 
-from ROOT import TGraphErrors, TGaxis, TLatex, TGraphAsymmErrors, TCanvas, gStyle, TLegend, TArrow, TPad, TCutG, TLine, TPaveText, TPaveStats, TH1F, TEllipse, TColor, TProfile
-from ROOT import TProfile2D, TH2F, TH3F, THStack, TMultiGraph, TPie, gROOT, TF1
 from numpy import sign, linspace, ones, ceil, append, tile, absolute, rot90, flip, argsort, ndarray, diff, mean, arange, frombuffer, where, concatenate, pi
 from helpers.utils import *
 from os.path import join
@@ -77,7 +75,7 @@ def get_color_gradient():
     green = array([0. / 255., 200. / 255., 80. / 255.], 'd')
     blue = array([0. / 255., 0. / 255., 0. / 255.], 'd')
     red = array([180. / 255., 200. / 255., 0. / 255.], 'd')
-    color_gradient = TColor.CreateGradientColorTable(len(stops), stops, red, green, blue, 255)
+    color_gradient = ROOT.TColor.CreateGradientColorTable(len(stops), stops, red, green, blue, 255)
     return array([color_gradient + ij for ij in range(255)])
 
 
@@ -94,8 +92,8 @@ class Draw(object):
     Verbose = False
     Config = None
     Count = {}
-    Res = load_resolution()
-    Colors = get_color_gradient()
+    Res = None  # loaded at the first use
+    Colors = None
     Objects = []
     Dir = get_base_dir()
     Show = True
@@ -137,6 +135,18 @@ class Draw(object):
             return self.Dic[th.ClassName()](th, *args, **kwargs)
         return Draw.histo(th, *args, **kwargs)
 
+    @staticmethod
+    def get_res():
+        if Draw.Res is None:
+            Draw.Res = load_resolution()
+        return Draw.Res
+
+    @staticmethod
+    def get_gradient():
+        if Draw.Colors is None:
+            Draw.Colors = get_color_gradient()
+        return Draw.Colors
+
     @staticmethod
     def add(*args):
         for obj in args:
@@ -155,10 +165,10 @@ class Draw(object):
     # region SET
     @staticmethod
     def setup():
-        gStyle.SetLegendFont(Draw.Font)
-        gStyle.SetOptTitle(Draw.Title)
-        gStyle.SetPalette(Draw.Config.get_value('PLOTS', 'palette', default=1))
-        gStyle.SetNumberContours(Draw.Config.get_value('PLOTS', 'contours', default=20))
+        ROOT.gStyle.SetLegendFont(Draw.Font)
+        ROOT.gStyle.SetOptTitle(Draw.Title)
+        ROOT.gStyle.SetPalette(Draw.Config.get_value('PLOTS', 'palette', default=1))
+        ROOT.gStyle.SetNumberContours(Draw.Config.get_value('PLOTS', 'contours', default=20))
 
     @staticmethod
     def set_margin(c, side, value=None, default=.1, off=0):
@@ -192,7 +202,7 @@ class Draw(object):
 
     @staticmethod
     def get_colors(n):
-        return Draw.Colors[linspace(0, Draw.Colors.size - 1, n).round().astype(int)].tolist()
+        return Draw.get_gradient()[linspace(0, Draw.get_gradient().size - 1, n).round().astype(int)].tolist()
 
     @staticmethod
     def get_count(name='a'):
@@ -224,7 +234,7 @@ class Draw(object):
         c0 = get_last_canvas(warn=False)
         x = x if x is not None else 0 if c0 is None else c0.GetWindowTopX() + 50
         y = y if y is not None else 0 if c0 is None else c0.GetWindowTopY() + 20
-        c = TCanvas(Draw.get_name('c'), title, int(x), int(y), int(w * Draw.Res), int(h * Draw.Res))
+        c = ROOT.TCanvas(Draw.get_name('c'), title, int(x), int(y), int(w * Draw.get_res()), int(h * Draw.get_res()))
         do([c.SetLogx, c.SetLogy, c.SetLogz], [logx, logy, logz])
         do([c.SetGridx, c.SetGridy], [gridx, gridy])
         do(make_transparent, c, transp)
@@ -235,7 +245,7 @@ class Draw(object):
     @staticmethod
     def axis(x1, x2, y1, y2, title, limits=None, name='ax', col=1, width=1, off=.15, tit_size=.035, lab_size=0.035, tick_size=0.03, line=False, opt='+SU', l_off=.01, log=False, center=None):
         limits = ([y1, y2] if x1 == x2 else [x1, x2]) if limits is None else limits
-        a = TGaxis(x1, y1, x2, y2, limits[0], limits[1], 510, opt + ('G' if log else ''))
+        a = ROOT.TGaxis(x1, y1, x2, y2, limits[0], limits[1], 510, opt + ('G' if log else ''))
         a.SetName(name)
         a.SetLineColor(col)
         a.SetLineWidth(width)
@@ -265,7 +275,7 @@ class Draw(object):
 
     @staticmethod
     def line(x1, x2, y1, y2, color=1, width=1, style=1):
-        line = TCutG(Draw.get_name('l'), 2, array([x1, x2], 'd'), array([y1, y2], 'd'))
+        line = ROOT.TCutG(Draw.get_name('l'), 2, array([x1, x2], 'd'), array([y1, y2], 'd'))
         line.SetLineColor(color)
         line.SetLineWidth(width)
         line.SetLineStyle(style)
@@ -274,7 +284,7 @@ class Draw(object):
 
     @staticmethod
     def tline(x1, x2, y1, y2, color=1, width=1, style=1, ndc=None):
-        line = TLine(x1, y1, x2, y2)
+        line = ROOT.TLine(x1, y1, x2, y2)
         line.SetLineColor(color)
         line.SetLineWidth(width)
         line.SetLineStyle(style)
@@ -294,7 +304,7 @@ class Draw(object):
     def polygon(x, y, line_color=1, width=1, style=1, name=None, fillstyle=None, fill_color=None, opacity=None, show=True):
         if get_object(name) is not None:  # check if name already exists
             get_object(name).Clear()
-        line = TCutG(choose(name, Draw.get_name('poly')), len(x) + 1, append(x, x[0]).astype('d'), append(y, y[0]).astype('d'))
+        line = ROOT.TCutG(choose(name, Draw.get_name('poly')), len(x) + 1, append(x, x[0]).astype('d'), append(y, y[0]).astype('d'))
         format_histo(line, line_color=line_color, lw=width, line_style=style, fill_color=fill_color, fill_style=fillstyle, opacity=opacity)
         if show:
             line.Draw('l')
@@ -312,7 +322,7 @@ class Draw(object):
 
     @staticmethod
     def tlatex(x, y, text, name=None, align=20, color=1, size=.05, angle=None, ndc=None, font=None, show=True):
-        tlatex = TLatex(x, y, text)
+        tlatex = ROOT.TLatex(x, y, text)
         format_text(tlatex, choose(name, Draw.get_name('t')), align, color, size, angle, ndc, font)
         tlatex.Draw() if show else do_nothing()
         return Draw.add(tlatex)
@@ -323,7 +333,7 @@ class Draw(object):
 
     @staticmethod
     def arrow(x1, x2, y1, y2, col=1, width=1, opt='<|', size=.005):
-        ar = TArrow(x1, y1, x2, y2, size, opt)
+        ar = ROOT.TArrow(x1, y1, x2, y2, size, opt)
         ar.SetLineWidth(width)
         ar.SetLineColor(col)
         ar.SetFillColor(col)
@@ -334,7 +344,7 @@ class Draw(object):
     def tpad(tit='', pos=None, fill_col=0, gridx=None, gridy=None, margins=None, transparent=False, logy=None, logx=None, logz=None, lm=None, rm=None, bm=None, tm=None, c=None):
         c.cd() if c is not None else do_nothing()
         pos = [0, 0, 1, 1] if pos is None else pos
-        p = TPad(Draw.get_name('pd'), tit, *pos)
+        p = ROOT.TPad(Draw.get_name('pd'), tit, *pos)
         p.SetFillColor(fill_col)
         margins = margins if all(m is None for m in [lm, rm, bm, tm]) else [lm, rm, bm, tm]
         Draw.set_pad_margins(p, *margins if margins is not None else full(4, .1) if c is None else Draw.get_margins(c))
@@ -347,7 +357,7 @@ class Draw(object):
 
     @staticmethod
     def tpavetext(text, x1, x2, y1, y2, font=42, align=0, size=0, angle=0, margin=.05, color=1):
-        p = TPaveText(x1, y1, x2, y2, 'ndc')
+        p = ROOT.TPaveText(x1, y1, x2, y2, 'ndc')
         p.SetFillColor(0)
         p.SetFillStyle(0)
         p.SetBorderSize(0)
@@ -363,7 +373,7 @@ class Draw(object):
         c = get_last_canvas()
         tm = .98 - .05 - c.GetTopMargin() if y2 is None else y2
         rm = .98 - c.GetRightMargin()
-        p = TPaveStats(rm - width, tm - .06 * (fit.NPar + 1), rm, tm, 'ndc')
+        p = ROOT.TPaveStats(rm - width, tm - .06 * (fit.NPar + 1), rm, tm, 'ndc')
         p.SetBorderSize(1)
         p.SetFillColor(0)
         p.SetFillStyle(0)
@@ -408,7 +418,7 @@ class Draw(object):
 
     @staticmethod
     def ellipse(a=1, b=1, x_off=0, y_off=0, color=2, w=2):
-        e = TEllipse(x_off, y_off, a, b)
+        e = ROOT.TEllipse(x_off, y_off, a, b)
         do(e.SetLineColor, color)
         do(e.SetLineWidth, w)
         e.SetFillStyle(4000)
@@ -474,7 +484,7 @@ class Draw(object):
         if hasattr(x, 'GetName'):
             th = x
         else:
-            th = TH1F(Draw.get_name('h'), title, *choose(binning, find_bins, values=x))
+            th = ROOT.TH1F(Draw.get_name('h'), title, *choose(binning, find_bins, values=x))
             fill_hist(th, x)
         format_histo(th, **prep_kw(kwargs, **Draw.mode(), fill_color=Draw.FillColor, y_tit='Number of Entries'))
         self.histo(th, **prep_kw(kwargs, stats=None))
@@ -498,7 +508,7 @@ class Draw(object):
             p = x
         else:
             x, y = array(x, dtype='d'), array(y, dtype='d')
-            p = TProfile(Draw.get_name('p'), title, *choose(binning, find_bins, values=x, q=thresh))
+            p = ROOT.TProfile(Draw.get_name('p'), title, *choose(binning, find_bins, values=x, q=thresh))
             fill_hist(p, x, y)
         p = self.make_graph_from_profile(p) if graph else p
         set_statbox(entries=True, w=.25)
@@ -512,7 +522,7 @@ class Draw(object):
             p = x
         else:
             dflt_bins = find_bins(x) + find_bins(y) if binning is None else None
-            p = TProfile2D(Draw.get_name('p2'), title, *choose(binning, dflt_bins))
+            p = ROOT.TProfile2D(Draw.get_name('p2'), title, *choose(binning, dflt_bins))
             fill_hist(p, x, y, uarr2n(zz))
         p = self.rotate_2d(p, rot)
         p = self.flip_2d(p, mirror)
@@ -529,7 +539,7 @@ class Draw(object):
         else:
             x, y = array(x, dtype='d'), array(y, dtype='d')
             dflt_bins = make_bins(min(x), max(x), sqrt(x.size)) + make_bins(min(y), max(y), sqrt(x.size)) if binning is None else None
-            th = TH2F(Draw.get_name('h2'), title, *choose(binning, dflt_bins))
+            th = ROOT.TH2F(Draw.get_name('h2'), title, *choose(binning, dflt_bins))
             fill_hist(th, x, y)
         th = self.rotate_2d(th, rot)
         th = self.flip_2d(th, mirror)
@@ -540,7 +550,7 @@ class Draw(object):
         return th
 
     def histo_3d(self, x, y, zz, binning, title='', **kwargs):
-        th = TH3F(Draw.get_name('h3'), title, *binning)
+        th = ROOT.TH3F(Draw.get_name('h3'), title, *binning)
         fill_hist(th, x, y, zz)
         format_histo(th, **prep_kw(kwargs))
         self.histo(th, **prep_kw(kwargs, draw_opt='colz', show=False))
@@ -558,7 +568,7 @@ class Draw(object):
         return th if ret_h else mean_sigma(x[x != 0])
 
     def stack(self, histos, title, leg_titles, scale=False, draw_opt='nostack', show=True, fill=None, w=.2, *args, **kwargs):
-        s = THStack(Draw.get_name('s'), title)
+        s = ROOT.THStack(Draw.get_name('s'), title)
         leg = Draw.make_legend(nentries=len(histos), w=w)
         for h, tit in zip(histos, leg_titles):
             s.Add(h, 'hist')
@@ -577,7 +587,7 @@ class Draw(object):
             m, g = graphs, graphs.GetListOfGraphs()[0]
         else:
             g = graphs[0]
-            m = TMultiGraph(Draw.get_name('mg'), ';'.join([title, g.GetXaxis().GetTitle(), g.GetYaxis().GetTitle()]))
+            m = ROOT.TMultiGraph(Draw.get_name('mg'), ';'.join([title, g.GetXaxis().GetTitle(), g.GetYaxis().GetTitle()]))
             for i, g in enumerate(graphs):
                 m.Add(g, draw_opt)
                 format_histo(g, **prep_kw(kwargs, color=self.get_color(len(graphs)), stats=False))
@@ -590,7 +600,7 @@ class Draw(object):
 
     def pie(self, labels, values=None, colors=None, title='', offset=0, show=True, flat=False, draw_opt=None, **kwargs):
         labels, (values, colors) = (labels.keys(), array(list(labels.values())).T) if values is None else (labels, (values, choose(colors, Draw.get_colors(len(labels)))))
-        pie = TPie(self.get_name('pie'), title, len(labels), array(values, 'f'), array(colors, 'i'))
+        pie = ROOT.TPie(self.get_name('pie'), title, len(labels), array(values, 'f'), array(colors, 'i'))
         for i, label in enumerate(labels):
             pie.SetEntryRadiusOffset(i, offset)
             pie.SetEntryLabel(i, label)
@@ -646,12 +656,12 @@ class Draw(object):
     # region CREATE
     @staticmethod
     def make_histo(title, bins):
-        h = TH1F(Draw.get_name('h'), title, *bins)
+        h = ROOT.TH1F(Draw.get_name('h'), title, *bins)
         return Draw.add(h)
 
     @staticmethod
     def make_f(name, function, xmin=0, xmax=1, pars=None, limits=None, fix=None, npx=None, **kwargs):
-        f = TF1(choose(name, Draw.get_name('f')), function, xmin, xmax)
+        f = ROOT.TF1(choose(name, Draw.get_name('f')), function, xmin, xmax)
         f.SetParameters(*pars) if pars is not None else do_nothing()
         [f.SetParLimits(i, *lim) for i, lim in enumerate(limits)] if limits else do_nothing()
         [f.FixParameter(i, value) for i, value in enumerate(make_list(fix))] if fix is not None else do_nothing()
@@ -666,7 +676,7 @@ class Draw(object):
             return f(x[0], pars, *args, **kwargs) if 'pars' in signature(f).parameters else f(x[0], *args, **kwargs)
 
         Draw.add(tmp)
-        f0 = TF1(choose(name, Draw.get_name('f')), tmp, xmin, xmax)
+        f0 = ROOT.TF1(choose(name, Draw.get_name('f')), tmp, xmin, xmax)
         do(f0.SetNpx, npx)
         format_histo(f0, title, line_color=color, line_style=style, lw=w)
         return Draw.add(f0)
@@ -680,7 +690,7 @@ class Draw(object):
         s, utypes, has_ers = len(x), [type(v[0]) in [Variable, AffineScalarFunc] for v in [x, y]], [len(v.shape) > 1 for v in [x, y]]
         ex, ey = [array([[v.s for v in vals]] if is_u and not asym else vals[:, 1:3].T if has_e else zeros((2, s)) if asym else [zeros(s)], 'd') for vals, is_u, has_e in zip([x, y], utypes, has_ers)]
         x, y = [array([v.n for v in vals] if utype else vals[:, 0] if has_e else vals, 'd') for vals, utype, has_e in zip([x, y], utypes, has_ers)]
-        g = (TGraphAsymmErrors if asym else TGraphErrors)(s, x, y, *array(ex.tolist()), *array(ey.tolist()))  # doesn't work without double conversion...
+        g = (ROOT.TGraphAsymmErrors if asym else ROOT.TGraphErrors)(s, x, y, *array(ex.tolist()), *array(ey.tolist()))  # doesn't work without double conversion...
         format_histo(g, Draw.get_name('g'), **prep_kw(kwargs, marker=20, markersize=1))
         return Draw.add(g)
 
@@ -699,7 +709,7 @@ class Draw(object):
         if not use_margins:
             y1 += .07 if not Draw.Title and y1 + h > .8 and not fix else 0
             y1 -= .07 if not Draw.Legend and y1 < .3 and not fix else 0
-        leg = TLegend(x1, max(y1, 0), x1 + w, min(y1 + h, 1))
+        leg = ROOT.TLegend(x1, max(y1, 0), x1 + w, min(y1 + h, 1))
         leg.SetName(Draw.get_name('l'))
         leg.SetTextFont(Draw.Font)
         leg.SetMargin(margin)
@@ -801,7 +811,7 @@ def format_statbox(th, x2=None, y2=None, d=.01, h=None, w=.3, entries=False, m=F
     update_canvas(c)
     f = None if 'TF1' in th.ClassName() else next((o for o in th.GetListOfFunctions() if 'TF1' in o.ClassName()), None)
     if 'TGraph' in th.ClassName() and fit and f:
-        gStyle.SetOptFit(True)
+        ROOT.gStyle.SetOptFit(True)
     p = None if 'TF1' in th.ClassName() else next((o for o in th.GetListOfFunctions() if 'Pave' in o.ClassName()), None)
     if p is not None:
         r = c.GetWindowHeight() / c.GetWindowWidth()
@@ -951,7 +961,7 @@ def make_star(cx=0, cy=0, r=1, n=5):
 
 
 def set_titles(status=True):
-    gStyle.SetOptTitle(status)
+    ROOT.gStyle.SetOptTitle(status)
 
 
 def get_graph_vecs(g, err=True):
@@ -1085,11 +1095,11 @@ def markers(i):
 
 def set_palette(pal=1, custom=False):
     if custom:
-        gStyle.SetNumberContours(20)
+        ROOT.gStyle.SetNumberContours(20)
         color_table = get_color_gradient()
-        gStyle.SetPalette(len(color_table), color_table)
+        ROOT.gStyle.SetPalette(len(color_table), color_table)
     else:
-        gStyle.SetPalette(pal)
+        ROOT.gStyle.SetPalette(pal)
 
 
 def is_graph(h):
@@ -1208,7 +1218,7 @@ def set_y_range(ymin, ymax, c=None):
 
 def get_last_canvas(warn=True):
     try:
-        return gROOT.GetListOfCanvases()[-1]
+        return ROOT.gROOT.GetListOfCanvases()[-1]
     except IndexError:
         warning('There is no canvas is in the list...', prnt=warn)
 
@@ -1219,7 +1229,7 @@ def close_last_canvas():
 
 def get_object(name):
     if name is not None:
-        o = gROOT.FindObject(name)
+        o = ROOT.gROOT.FindObject(name)
         return None if o.__class__.Class_Name() == 'TObject' else o
 
 
@@ -1231,7 +1241,7 @@ def set_time_axis(histo, form='%H:%M', off=0):
 
 def find_mpv_fwhm(histo, bins=15):
     max_bin = histo.GetMaximumBin()
-    fit = TF1('fit', 'gaus', 0, 500)
+    fit = ROOT.TF1('fit', 'gaus', 0, 500)
     histo.Fit('fit', 'qs0', '', histo.GetBinCenter(max_bin - bins), histo.GetBinCenter(max_bin + bins))
     mpv = ufloat(fit.GetParameter(1), fit.GetParError(1))
     fwhm = histo.FindLastBinAbove(fit(mpv.n) / 2) - histo.FindFirstBinAbove(fit(mpv.n) / 2)
@@ -1265,7 +1275,7 @@ def fit_fwhm(h, fitfunc='gaus', show=False, fit_range=.8):
     return FitRes(h.Fit(fitfunc, 'qs{}'.format('' if show else 0), '', low.n, high.n))
 
 
-def get_f_fwhm(f: TF1):
+def get_f_fwhm(f: 'ROOT.TF1'):
     half_max = f.GetMaximum() / 2
     return f.GetX(half_max, f.GetMaximumX(), 1e9) - f.GetX(half_max)
 
@@ -1314,11 +1324,11 @@ def hide_axis(axis):
 
 
 def set_root_warnings(status):
-    gROOT.ProcessLine('gErrorIgnoreLevel = {e};'.format(e='0' if status else 'kError'))
+    ROOT.gROOT.ProcessLine('gErrorIgnoreLevel = {e};'.format(e='0' if status else 'kError'))
 
 
 def set_root_output(status=True):
-    gROOT.SetBatch(not status)
+    ROOT.gROOT.SetBatch(not status)
     set_root_warnings(status)
 
 
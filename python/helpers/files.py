@@ -1,5 +1,5 @@
 from helpers.utils import make_byte_string
-from time import sleep
+from time import sleep, time
 from glob import glob
 from os import rename, remove
 from os.path import getsize
@@ -53,15 +53,25 @@ def change_config(new, old):
         f.writelines(lines)
 
 
+def wait_for_current(api, threshold=5, t_max=2, dt=.1):
+    """ :returns: the analogue current [mA] as soon as it exceeds [threshold] or after [t_max] seconds """
+    t = time()
+    api.getTBia()  # first reading is always wrong
+    while True:
+        ia = api.getTBia() * 1000
+        if ia > threshold or time() - t > t_max:
+            return ia
+        sleep(dt)
+
+
 def find_i2c(max_i2c=16):
     from helpers.pxar import PxarStartUp
     for i2c in range(max_i2c):
-        rename_files(i2c, get_old_i2c())
+        rename_files(str(i2c), get_old_i2c())
         pxar = PxarStartUp('.')
-        api = pxar.API
-        sleep(2)
-        if api.getTBia() * 1000 > 5:
+        ia = wait_for_current(pxar.API)
+        if ia > 5:
             print('found i2c', i2c)
             return True
-        print(i2c, api.getTBia() * 1000)
-        del api
+        print(i2c, ia)
+        del pxar
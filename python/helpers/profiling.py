@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# --------------------------------------------------------
+#       Opt-in timing and profiling of the command line tools with a json lines session log
+# created on October 19th 2026 by agent (agent@local)
+# --------------------------------------------------------
+
+import tracemalloc
+from cProfile import Profile
+from pstats import Stats
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from glob import glob
+from json import dumps, loads
+from os.path import dirname
+from platform import node
+from time import perf_counter, perf_counter_ns, strftime
+from helpers.utils import ensure_dir, info, warning, do_nothing
+
+# methods returning events: number of events in the return value
+EventMethods = {'daqGetEvent': lambda res: 1, 'daqGetRawEvent': lambda res: 1, 'daqGetEventBuffer': len}
+
+
+class CallCounter:
+    """ Wraps the pxar API and counts the calls of every method (testboard round trips) and the number of read events. """
+
+    def __init__(self, api):
+        self.API = api
+        self.Calls = Counter()
+        self.NEvents = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self.API, name)
+        if not callable(attr):
+            return attr
+        wrapper = self.wrap(name)
+        setattr(self, name, wrapper)  # the next access does not go through __getattr__
+        return wrapper
+
+    def wrap(self, name):
+        def wrapper(*args, **kwargs):
+            self.Calls[name] += 1
+            res = getattr(self.API, name)(*args, **kwargs)  # look up the method at every call, such that the API can be replaced
+            if name in EventMethods:
+                self.NEvents += EventMethods[name](res)
+            return res
+        return wrapper
+
+
+class LatencyHistogram:
+    """ HDR-style histogram of latencies [ns] with logarithmic buckets: every power of two is split into 2^[sub_bits] buckets, which limits the relative error of the
+        percentiles to 2^-[sub_bits] at constant memory. """
+
+    def __init__(self, sub_bits=4):
+        self.SubBits = sub_bits
+        self.NSub = 2 ** sub_bits
+        self.Counts = [0] * (64 * self.NSub)
+        self.N, self.Total, self.Min, self.Max = 0, 0, None, 0
+
+    def bucket(self, ns):
+        shift = max(ns.bit_length() - self.SubBits - 1, 0)
+        return shift * self.NSub + (ns >> shift)
+
+    def value(self, i):
+        """ :returns: the centre of bucket [i] [ns] """
+        shift = max(i // self.NSub - 1, 0)
+        return ((i - shift * self.NSub) << shift) + ((1 << shift) - 1) / 2
+
+    def add(self, ns):
+        self.Counts[self.bucket(ns)] += 1
+        self.N += 1
+        self.Total += ns
+        self.Min = ns if self.Min is None else min(self.Min, ns)
+        self.Max = max(self.Max, ns)
+
+    def percentile(self, q):
+        """ :returns: the [q]th percentile [ns] """
+        n, target = 0, q / 100 * self.N
+        for i, c in enumerate(self.Counts):
+            n += c
+            if c and n >= target:
+                return min(max(self.value(i), self.Min), self.Max)
+        return self.Max
+
+    @property
+    def mean(self):
+        return self.Total / self.N if self.N else 0
+
+
+class LatencyMonitor(CallCounter):
+    """ CallCounter, which also records a latency histogram of every method. """
+
+    def __init__(self, api, sub_bits=4):
+        super().__init__(api)
+        self.Histograms = {}
+        self.SubBits = sub_bits
+
+    def wrap(self, name):
+        h = self.Histograms.setdefault(name, LatencyHistogram(self.SubBits))
+
+        def wrapper(*args, **kwargs):
+            self.Calls[name] += 1
+            t = perf_counter_ns()
+            try:
+                res = getattr(self.API, name)(*args, **kwargs)
+            finally:
+                h.add(perf_counter_ns() - t)
+            if name in EventMethods:
+                self.NEvents += EventMethods[name](res)
+            return res
+        return wrapper
+
+    def reset(self):
+        self.Calls.clear()
+        self.NEvents = 0
+        for h in self.Histograms.values():
+            h.__init__(self.SubBits)
+
+    def summary(self, percentiles=(50, 90, 99, 99.9)):
+        """ :returns: number of calls, total, mean, max and the [percentiles] of the latency [us] of every method, sorted by the total time """
+        data = OrderedDict((name, OrderedDict([('n', h.N), ('total', h.Total / 1e3), ('mean', h.mean / 1e3)] + [(f'p{q}', h.percentile(q) / 1e3) for q in percentiles] +
+                                              [('max', h.Max / 1e3)])) for name, h in self.Histograms.items() if h.N)
+        return OrderedDict(sorted(data.items(), key=lambda x: -x[1]['total']))
+
+    def print_summary(self, percentiles=(50, 90, 99, 99.9)):
+        data = self.summary(percentiles)
+        keys = ['n', 'total', 'mean'] + [f'p{q}' for q in percentiles] + ['max']
+        print(f'{"method":<24}' + ''.join(f'{key + (" [us]" if key != "n" else ""):>14}' for key in keys))
+        for name, d in data.items():
+            print(f'{name:<24}{d["n"]:>14}' + ''.join(f'{d[key]:>14.1f}' for key in keys[1:]))
+
+
+class CommandProfiler:
+    """ Records the wall time, the API calls, the read events and optionally the cProfile statistics and the tracemalloc peak of every command and appends them to the
+        session log [filename] (one json record per line). Commands started inside other commands (scripts) are recorded with their depth, cProfile and tracemalloc
+        only cover the outermost command. """
+
+    def __init__(self, filename, counter=None, cprofile=False, memory=False, n_top=20):
+
+        self.FileName = filename
+        self.Counter = counter
+        self.CProfile = cprofile
+        self.Memory = memory
+        self.NTop = n_top
+        self.Session = strftime('%Y-%m-%d_%H:%M:%S')
+        self.Stack = []
+        ensure_dir(dirname(filename)) if dirname(filename) else do_nothing()
+        info(f'logging the commands of this session in {filename}')
+
+    def start(self, command):
+        rec = OrderedDict([('session', self.Session), ('host', node()), ('time', strftime('%Y-%m-%d %H:%M:%S')), ('command', command.split()[0] if command.split() else ''),
+                           ('line', command.strip()), ('depth', len(self.Stack))])
+        state = {'t': perf_counter(), 'calls': Counter(self.Counter.Calls) if self.Counter is not None else None,
+                 'events': self.Counter.NEvents if self.Counter is not None else 0, 'profile': None}
+        if not self.Stack and self.CProfile:
+            state['profile'] = Profile()
+            state['profile'].enable()
+        if not self.Stack and self.Memory:
+            tracemalloc.start() if not tracemalloc.is_tracing() else tracemalloc.reset_peak()
+        self.Stack.append((rec, state))
+
+    def stop(self, error=None):
+        """ finishes the last started command and appends it to the log. :returns: the record """
+        if not self.Stack:
+            return warning('no command to stop')
+        rec, state = self.Stack.pop()
+        rec['wall'] = perf_counter() - state['t']
+        if state['profile'] is not None:
+            state['profile'].disable()
+            stats = Stats(state['profile'])
+            top = sorted(stats.stats.items(), key=lambda x: -x[1][3])[:self.NTop]  # by cumulative time
+            rec['profile'] = [[f'{f}:{line}({func})', n, round(tt, 6), round(ct, 6)] for (f, line, func), (_, n, tt, ct, _) in top]
+        if not self.Stack and self.Memory:
+            snapshot, (_, peak) = tracemalloc.take_snapshot(), tracemalloc.get_traced_memory()
+            rec['memory'] = {'peak_mb': peak / 2 ** 20, 'top': [[str(s.traceback), s.size] for s in snapshot.statistics('lineno')[:self.NTop]]}
+            tracemalloc.stop()
+        if self.Counter is not None:
+            calls = self.Counter.Calls - state['calls']
+            rec['n_calls'], rec['calls'], rec['events'] = sum(calls.values()), dict(calls), self.Counter.NEvents - state['events']
+        rec['error'] = error
+        with open(self.FileName, 'a') as f:
+            f.write(dumps(rec) + '\n')
+        return rec
+
+    @contextmanager
+    def profile(self, command):
+        self.start(command)
+        try:
+            yield
+        except BaseException as err:
+            self.stop(err.__class__.__name__)
+            raise
+        self.stop()
+
+
+def load_records(filenames):
+    return [loads(line) for name in filenames for line in open(name) if line.strip()]
+
+
+def aggregate(records, top_level=True):
+    """ :returns: the number of calls, wall time statistics, API calls and events per command """
+    data = OrderedDict()
+    for rec in records:
+        if top_level and rec['depth']:
+            continue
+        d = data.setdefault(rec['command'], {'n': 0, 'wall': [], 'n_calls': 0, 'events': 0, 'errors': 0, 'sessions': set()})
+        d['n'] += 1
+        d['wall'].append(rec['wall'])
+        d['n_calls'] += rec.get('n_calls', 0)
+        d['events'] += rec.get('events', 0)
+        d['errors'] += rec['error'] is not None
+        d['sessions'].add(rec['session'])
+    return OrderedDict((cmd, {'n': d['n'], 'total': sum(d['wall']), 'mean': sum(d['wall']) / d['n'], 'max': max(d['wall']), 'n_calls': d['n_calls'], 'events': d['events'],
+                              'errors': d['errors'], 'sessions': len(d['sessions'])}) for cmd, d in data.items())
+
+
+def print_summary(data, sort_by='total'):
+    print(f'{"command":<24}{"n":>6}{"total [s]":>12}{"mean [s]":>11}{"max [s]":>10}{"API calls":>11}{"events":>10}{"errors":>8}{"sessions":>10}')
+    for cmd, d in sorted(data.items(), key=lambda x: -x[1][sort_by]):
+        print(f'{cmd:<24}{d["n"]:>6}{d["total"]:>12.2f}{d["mean"]:>11.3f}{d["max"]:>10.3f}{d["n_calls"]:>11}{d["events"]:>10}{d["errors"]:>8}{d["sessions"]:>10}')
+
+
+if __name__ == '__main__':
+
+    from argparse import ArgumentParser
+    aparser = ArgumentParser(description='aggregates the command timing of the session logs')
+    aparser.add_argument('files', nargs='+', help='session logs (glob patterns are allowed)')
+    aparser.add_argument('-s', '--sort', default='total', choices=['n', 'total', 'mean', 'max', 'n_calls', 'events'], help='sort key [default = total]')
+    aparser.add_argument('-a', '--all', action='store_true', help='include the commands run inside scripts')
+    pargs = aparser.parse_args()
+
+    print_summary(aggregate(load_records(sorted(set(f for pattern in pargs.files for f in glob(pattern)))), not pargs.all), pargs.sort)
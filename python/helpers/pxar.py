@@ -1,24 +1,41 @@
 #!/usr/bin/env python
 """ Helper classes and functions useful when interfacing the pxar API with Python. """
 
-from lib.PyPxarCore import PixelConfig, PyPxarCore, Statistics, PyRegisterDictionary
+try:
+    from lib.PyPxarCore import PixelConfig, PyPxarCore, Statistics, PyRegisterDictionary, PyProbeDictionary
+    PxarImportError = None
+except ImportError as err:  # no (working) compiled pxar core, only the mock API can be used
+    from src.mock_pxar import PixelConfig, Statistics, PyRegisterDictionary, PyProbeDictionary
+    PyPxarCore, PxarImportError = None, err
+from src.mock_pxar import MockPxarCore
+from helpers.profiling import CallCounter, LatencyMonitor
+from helpers.snapshot import Snapshot
+from helpers.scan_cache import ScanCache
 from os.path import join, isfile, isdir, basename, realpath
 from datetime import datetime
+from time import time
 from configparser import ConfigParser
 from json import loads
-from helpers.utils import info, critical, choose, warning
-from numpy import full, array, arange, genfromtxt
+from contextlib import contextmanager, ExitStack
+from helpers.utils import info, critical, choose, warning, do_nothing, write_atomic
+from numpy import full, array, arange, genfromtxt, zeros, where, argwhere
 
 
 NCols = 52
 NRows = 80
 Frequency = 40e6
+ConfigAttributes = ['Config', 'TestBoardName', 'ROCType', 'NROCs', 'I2Cs', 'Mask', 'IsAnalogue', 'TBParameters', 'TBMDacs', 'ROCDACs', 'TrimDACs', 'Masks', 'PowerSettings',
+                    'PGSetup', 'HubIDs']
 
 
 # -----------------------------------------
 # region CONFIG FILES
 class Config(dict):
     """Parent class for the pxar configurations"""
+    Dirty = frozenset()  # keys changed since the last write
+    Pending = False  # save requested inside deferred()
+    Depth = 0
+
     def __init__(self, filename):
         super().__init__()
         self.FileName = filename
@@ -65,15 +82,57 @@ class Config(dict):
             if key.lower() in self and self[key.lower()] != value:
                 info(f'{basename(self.FileName)}: overwriting "{key}" from {self[key.lower()]} -> {value}')
                 self.change_line(key, value)
+                self.mark_dirty(key)
             elif key.lower() not in self:
                 info(f'{basename(self.FileName)}: adding "{key}" key with value {value}')
                 self.add_line(key, value)
+                self.mark_dirty(key)
             self[key.lower()] = value
 
     @property
     def b(self):
         return {key.encode(): value for key, value in self.items()}
 
+    # -----------------------------------------
+    # region PERSISTENCE
+    def mark_dirty(self, key):
+        self.Dirty = self.Dirty | {key.lower()}
+
+    @property
+    def is_dirty(self):
+        return bool(self.Dirty)
+
+    def make_lines(self):
+        return self.Lines
+
+    def save(self):
+        """ writes the changed values to the file, or at the end of deferred() if it is active. :returns: whether the file was written """
+        if self.Depth:
+            self.Pending = True
+            return False
+        return self.flush()
+
+    def flush(self):
+        self.Pending = False
+        if not self.is_dirty:
+            return False
+        write_atomic(self.FileName, self.make_lines())
+        info(f'saved {", ".join(sorted(self.Dirty))} in {basename(self.FileName)}')
+        self.Dirty = frozenset()
+        return True
+
+    @contextmanager
+    def deferred(self):
+        """ collects all saves and writes the file at most once at the end (also if there is an exception) """
+        self.Depth += 1
+        try:
+            yield self
+        finally:
+            self.Depth -= 1
+            self.flush() if not self.Depth and self.Pending else do_nothing()
+    # endregion PERSISTENCE
+    # -----------------------------------------
+
 
 class PxarConfig(Config):
     """ class that loads the old-style config files of psi46expert """
@@ -86,42 +145,51 @@ class PxarConfig(Config):
 
     def save(self, key=None, value=None):
         self.set(key, value)
-        with open(join(self.FileName), 'r+') as f:
-            f.writelines(self.Lines)
-            f.truncate()
+        return super().save()
 
 
 class PxarParameters(Config):
     """ class that loads the old-style parameters files of psi46expert """
-    AllDACs = PyRegisterDictionary().getAllROCNames()
+    AllDACs = None  # loaded at the first use
+
+    @classmethod
+    def all_dacs(cls):
+        if cls.AllDACs is None:
+            cls.AllDACs = cls.load_dac_names()
+        return cls.AllDACs
+
+    @staticmethod
+    def load_dac_names():
+        return PyRegisterDictionary().getAllROCNames()
 
     def read(self, start_at=1, dtype=int):
-        super().read(start_at, dtype)
+        return super().read(start_at, dtype)
 
     def set(self, dac, value, prnt=True, name='ROC'):
         """sets the value of the DAC [dac] to [value]. :returns: old value"""
-        if dac.encode() not in self.AllDACs:
+        if dac.encode() not in self.all_dacs():
             return warning(f'The {name} DAC "{dac}" does not exist!')
         info((f'setting "{dac}" to {value}' if int(value) != self[dac.lower()] else f'{dac} already has a value of {value}'), prnt=prnt)
         old = self[dac]
         self[dac] = int(value)
+        self.mark_dirty(dac) if old != self[dac] else do_nothing()
         return old
 
-    def save(self):
-        old_data = genfromtxt(self.FileName, dtype=['i', 'U30', 'i'])
-        for i, (_, key, value) in enumerate(old_data):
-            if key in self and self[key] != value:
-                info(f'{basename(self.FileName)}: overwriting "{key}" from {value} -> {self[key]}')
-                old_data[i][-1] = self[key]
-        s = [max(len(str(i)) for i in old_data[a]) for a in ['f0', 'f1', 'f2']]
-        with open(self.FileName, 'r+') as f:
-            f.writelines(['{0:>{3}}  {1:>{4}}  {2:>{5}}\n'.format(*list(tup) + s) for tup in old_data])
-            f.truncate()
+    def make_lines(self):
+        """ :returns: the lines of the file with the current values, aligned in columns """
+        rows = [line.split() for line in self.Lines if not line.startswith('#')]
+        rows = [[i, key, str(self.get(key, value))] for i, key, value in [row for row in rows if len(row) == 3]]
+        s = [max(len(row[i]) for row in rows) for i in range(3)] if rows else [0] * 3
+        return ['{0:>{3}}  {1:>{4}}  {2:>{5}}\n'.format(*row + s) for row in rows]
 
 
 class TBParameters(PxarParameters):
     """ class that loads the old-style parameters files of psi46expert """
-    AllDACs = PyRegisterDictionary().getAllDTBNames()
+    AllDACs = None
+
+    @staticmethod
+    def load_dac_names():
+        return PyRegisterDictionary().getAllDTBNames()
 
     def set(self, dac, value, prnt=True, **kwargs):
         return super(TBParameters, self).set(dac, value, prnt, 'testboard parameter')
@@ -130,39 +198,42 @@ class TBParameters(PxarParameters):
 def create_pixel(col, row, trim=15, roc=0, mask=True):
     p = PixelConfig(col, row, trim)
     p.roc = roc
-    p.mask = p in mask if isinstance(mask, PxarMaskFile) else mask
+    p.mask = bool(mask[roc][col, row]) if isinstance(mask, PxarMaskFile) else mask
     return p
 
 
-class PxarMaskFile(list):
-    """ class that loads the mask files of pxarGUI """
+class PxarMaskFile(dict):
+    """ class that loads the mask files of pxarGUI into a boolean (column, row) array per ROC """
     def __init__(self, filename):
         super().__init__()
         self.FileName = filename
         self.read()
 
+    def __missing__(self, roc):
+        return zeros((NCols, NRows), '?')
+
     def read(self):
         with open(self.FileName) as f:
             lines = [line.strip(' \n').split() for line in f.readlines() if not line.startswith("--") and not line.startswith("#")]
             for words in lines:
-                id_, roc, values = words[0], int(words[1]), [int(word) for word in words[2:]]
-                words[1:] = [int(word) for word in words[1:]]
+                roc, values = int(words[1]), [int(word) for word in words[2:]]
+                mask = self.setdefault(roc, zeros((NCols, NRows), '?'))
                 if len(words) == 4:  # single pixel to be masked:
-                    self.append(create_pixel(*values, roc=roc))
+                    mask[values[0], values[1]] = True
                 elif words[0] == 'col':  # full column to be masked:
-                    self.extend([create_pixel(values[0], row, roc=roc) for row in range(NRows)])
+                    mask[values[0]] = True
                 elif words[0] == 'row':  # full row to be masked:
-                    self.extend([create_pixel(col, values[0], roc=roc) for col in range(NCols)])
+                    mask[:, values[0]] = True
                 elif len(words) == 2:  # full roc to be masked
-                    self.extend([create_pixel(col, row, roc=roc) for col in range(NCols) for row in range(NRows)])
+                    mask[:] = True
 
 
-class PxarTrimConfig(list):
-    """ class that loads the old-style trim parameters files of psi46expert """
-    def __init__(self, filename, roc, mask):
-        super().__init__()
-        for vals in genfromtxt(filename, usecols=[2, 3, 0], dtype='i2'):
-            self.append(create_pixel(*vals, roc=roc, mask=mask))
+def read_trim_file(filename):
+    """ :returns: (column, row) array of the trim bits in the old-style trim parameters file of psi46expert, -1 for pixels which are not in the file """
+    trim = full((NCols, NRows), -1, 'i1')
+    data = genfromtxt(filename, usecols=[2, 3, 0], dtype='i2').reshape(-1, 3)
+    trim[data[:, 0], data[:, 1]] = data[:, 2]
+    return trim
 # endregion CONFIG FILES
 # -----------------------------------------
 
@@ -220,19 +291,179 @@ class PxarStatistics(dict):
         return self.valid_pixels * Frequency / (self.total_events / float(self.NChannels))
 
 
+class ShadowState:
+    """ Write-through cache of the ROC DACs, TBM registers and testboard delays of the DUT. The values are read once from the API and then served from the cache, writes
+        of unchanged values are skipped. Everything which changes the registers without going through this class has to call invalidate() afterwards.
+        Inside a transaction() the DAC and delay changes are only collected and sent together when the outermost transaction exits. """
+
+    def __init__(self, startup):
+        self.StartUp = startup  # the API is looked up at every call, such that it can be restarted or wrapped
+        self.DACs = {}
+        self.TBM = {}
+        self.Delays = None
+        self.NWrites = self.NSkipped = 0
+        self.Depth = 0
+        self.PendingDACs = {}
+        self.PendingDelays = {}
+
+    def __repr__(self):
+        return f'ShadowState: {len(self.DACs)} ROCs, {len(self.TBM)} TBM cores, delays {"" if self.Delays is None else "not "}stale, {self.NWrites} writes, {self.NSkipped} skipped'
+
+    @property
+    def api(self):
+        return self.StartUp.API
+
+    def invalidate(self, what=None):
+        """ drops the cached values of [what] in ['dacs', 'tbm', 'delays'] (all for None), such that they are read again from the API """
+        self.DACs.clear() if what in [None, 'dacs'] else do_nothing()
+        self.TBM.clear() if what in [None, 'tbm'] else do_nothing()
+        self.Delays = None if what in [None, 'delays'] else self.Delays
+
+    def skip(self):
+        self.NSkipped += 1
+        return False
+
+    @contextmanager
+    def transaction(self):
+        """ collects the DAC and delay changes and sends them on exit: all delays with a single call and the DACs with one call per changed DAC (per ROC if the values
+            differ). The changes are also sent if an exception occurred, since the configuration in memory is already updated. """
+        self.Depth += 1
+        try:
+            yield self
+        finally:
+            self.Depth -= 1
+            self.flush() if not self.Depth else do_nothing()
+
+    def flush(self):
+        delays, dacs, self.PendingDelays, self.PendingDACs = self.PendingDelays, self.PendingDACs, {}, {}
+        self.set_delays(delays) if delays else do_nothing()
+        changed = {}
+        for (name, roc), value in dacs.items():
+            if self.get_dac(name, roc) != value:
+                changed.setdefault(name, {})[roc] = value
+        for name, values in changed.items():
+            if len(values) == self.StartUp.NROCs and len(set(values.values())) == 1:
+                self.set_dac(name, values[0])
+            else:
+                [self.set_dac(name, value, roc) for roc, value in values.items()]
+
+    # -----------------------------------------
+    # region ROC DACS
+    def roc_dacs(self, roc):
+        if roc not in self.DACs:
+            self.DACs[roc] = dict(self.api.getRocDACs(roc))
+        return self.DACs[roc]
+
+    def get_dac(self, name, roc):
+        return self.PendingDACs[(name, roc)] if (name, roc) in self.PendingDACs else self.roc_dacs(roc).get(name)
+
+    def set_dac(self, name, value, roc=None, force=False):
+        """ sets the DAC [name] (bytes) of the ROC [roc] (all for None) to [value]. [force] always writes immediately, since some writes have side effects (pxar resets
+            the ROCs on every wbc write). :returns: whether the API was called """
+        rocs, value = range(self.StartUp.NROCs) if roc is None else [roc], int(value)
+        if self.Depth and not force:
+            self.PendingDACs.update({(name, i): value for i in rocs})
+            return False
+        if not force and all(self.get_dac(name, i) == value for i in rocs):
+            return self.skip()
+        self.NWrites += 1
+        [self.PendingDACs.pop((name, i), None) for i in rocs]
+        if self.api.setDAC(name, value, roc) is False:  # rejected by the API, the state is unknown
+            [self.DACs.pop(i, None) for i in rocs]
+            return True
+        for i in rocs:
+            self.roc_dacs(i)[name] = value
+        return True
+    # endregion ROC DACS
+    # -----------------------------------------
+
+    # -----------------------------------------
+    # region TBM
+    def tbm_dacs(self, core):
+        if core not in self.TBM:
+            self.TBM[core] = dict(self.api.getTbmDACs(core))
+        return self.TBM[core]
+
+    def get_tbm(self, name, core):
+        return self.tbm_dacs(core).get(name)
+
+    def set_tbm(self, name, value, core=None):
+        """ sets the register [name] (bytes) of the TBM core [core] (all for None) to [value]. :returns: whether the API was called """
+        cores, value = range(len(self.StartUp.TBMDacs)) if core is None else [core], int(value)
+        if all(self.get_tbm(name, i) == value for i in cores):
+            return self.skip()
+        self.NWrites += 1
+        if self.api.setTbmReg(name, value, core) is False:
+            [self.TBM.pop(i, None) for i in cores]
+            return True
+        for i in cores:
+            self.TBM[i][name] = value
+        return True
+    # endregion TBM
+    # -----------------------------------------
+
+    # -----------------------------------------
+    # region DELAYS
+    def delays(self):
+        if self.Delays is None:
+            self.Delays = dict(self.api.getTestboardDelays())
+        return self.Delays
+
+    def get_delay(self, name):
+        return self.PendingDelays[name] if name in self.PendingDelays else self.delays().get(name)
+
+    def set_delays(self, dic):
+        """ merges the testboard delays [dic] (bytes keys) into the cached ones. :returns: whether the API was called """
+        if self.Depth:
+            self.PendingDelays.update({key: int(value) for key, value in dic.items()})
+            return False
+        changed = {key: int(value) for key, value in dic.items() if self.get_delay(key) != int(value)}
+        if not changed:
+            return self.skip()
+        self.NWrites += 1
+        self.Delays.update(changed)
+        self.api.setTestboardDelays(dict(self.Delays))  # pxar replaces all delays, so always send the full set
+        return True
+    # endregion DELAYS
+    # -----------------------------------------
+
+
 class PxarStartUp:
     """ Initialises the pxar API """
-    def __init__(self, directory='.', verbosity='INFO', trim=''):
+    def __init__(self, directory='.', verbosity='INFO', trim='', mock=False):
 
         # INFO
         self.Dir = realpath(directory) if isdir(directory) else critical('Error: no or invalid configuration directory specified!')
         self.Verbosity = verbosity
         self.Trim = trim
-        self.Config = PxarConfig(join(directory, 'configParameters.dat'))
+        self.Mock = mock
+        self.load_config()
+
+        self.API = self.init_api()
+        self.Shadow = ShadowState(self)
+        self.State = self.dut_state()  # last programmed state of the DUT
+        self.ScanCache = ScanCache(join(self.Dir, '.scan_cache'), self.Config.get_int('scanCacheSize', 1024) * 2 ** 20)  # [MB]
+        self.set_probes()
+        self.set_decoding_offsets()
+        info('pxar API is now started and configured.')
+
+    def load_config(self):
+        """ loads the configuration from the snapshot of the config directory or reads all the configuration files if they changed """
+        t, snapshot, section = time(), Snapshot(self.Dir), f'pxar{self.Trim}'
+        data = snapshot.get(section)
+        if data is None:
+            snapshot.save(section, *self.read_config())
+        else:
+            self.__dict__.update(data)
+            info(f'loaded the configuration of {self.NROCs} ROCs (I2Cs: {self.I2Cs}) from the snapshot in {(time() - t) * 1000:.1f} ms')
+
+    def read_config(self):
+        """ reads all the configuration files. :returns: the configuration attributes and the read files """
+        self.Config = PxarConfig(join(self.Dir, 'configParameters.dat'))
         self.TestBoardName = self.Config.get('testboardName')
         self.ROCType = self.Config.get('rocType')
         self.NROCs, self.I2Cs = self.find_i2cs()
-        self.Mask = PxarMaskFile(join(directory, self.Config.get('maskfile')))
+        self.Mask = PxarMaskFile(join(self.Dir, self.Config.get('maskfile')))
         self.IsAnalogue = self.ROCType == 'psi46v2'
 
         # DACs
@@ -240,21 +471,125 @@ class PxarStartUp:
         self.TBMDacs = self.init_tbm()
         self.ROCDACs = self.init_dacs()
         self.TrimDACs = self.init_trim_dacs()
+        self.Masks = self.init_masks()
 
         # SETTINGS
         self.PowerSettings = self.init_power()
         self.PGSetup = self.init_pattern_generator()
         self.HubIDs = [int(i) for i in self.Config.get('hubId', 31).split(',')]
-
-        self.API = self.init_api()
+        files = [self.Config.FileName, self.Mask.FileName, self.TBParameters.FileName] + [dacs.FileName for dacs in self.TBMDacs + self.ROCDACs] + self.trim_files()
+        return {key: self.__dict__[key] for key in ConfigAttributes}, files
+
+    def restart_api(self, warm=False, reload=False):
+        """ restarts the API. With [warm] only the differences to the last programmed state are sent to the running DUT, which falls back to a full initialisation
+            if the testboard does not respond or the DUT layout changed. [reload] re-reads the configuration files before.
+            :returns: the reprogrammed parts with the number of changes (None for a full initialisation) """
+        t = time()
+        self.load_config() if reload else do_nothing()
+        changes = self.warm_init() if warm else None
+        if changes is None:
+            if isinstance(self.API, CallCounter):  # keep the statistics of the wrapper
+                self.API.API = self.init_api()
+            else:
+                self.API = self.init_api()
+            self.Shadow.invalidate()
+            self.State = self.dut_state()
         self.set_probes()
         self.set_decoding_offsets()
-        info('pxar API is now started and configured.')
+        info(f'{"full" if changes is None else "warm"} restart of the API in {time() - t:.2f} s' + ('' if changes is None else f', reprogrammed: {changes if changes else "nothing"}'))
+        return changes
 
-    def restart_api(self):
-        self.API = self.init_api()
-        self.set_probes()
-        self.set_decoding_offsets()
+    # -----------------------------------------
+    # region WARM INIT
+    def dut_state(self):
+        """ :returns: snapshot of the configuration as it is programmed to the DUT """
+        return {'layout': (self.I2Cs.tolist(), self.HubIDs, self.ROCType, self.Config.get('tbmType', 'tbm08'), len(self.TBMDacs)), 'delays': self.TBParameters.b,
+                'power': dict(self.PowerSettings), 'pg': tuple(self.PGSetup), 'tbm': byte_dic(self.TBMDacs), 'dacs': byte_dic(self.ROCDACs), 'trim': self.TrimDACs.copy(),
+                'mask': self.Masks.copy()}
+
+    def is_alive(self, threshold=1):
+        """ :returns: whether the testboard responds and the DUT is powered, read back from the hardware, since status() only tells if the API is set up.
+            A DUT with an analogue current below [threshold] mA lost its programming. """
+        try:
+            if not self.API.status():
+                return False
+            self.API.getTBia()  # first reading is always wrong
+            return self.API.getTBia() * 1000 > threshold
+        except RuntimeError:  # the USB connection to the testboard is lost
+            return False
+
+    def warm_init(self):
+        """ sends the differences between the configuration and the last programmed state to the DUT. :returns: the changes or None if a full init is required """
+        if self.API is None or not self.is_alive():
+            info('testboard does not respond, doing a full initialisation')
+            return
+        old, new = self.State, self.dut_state()
+        if old['layout'] != new['layout']:
+            info(f'the DUT layout changed from {old["layout"]} to {new["layout"]}, doing a full initialisation')
+            return
+        changes = {}
+        delays = {key: value for key, value in new['delays'].items() if self.Shadow.get_delay(key) != value}
+        self.Shadow.set_delays(delays) if delays else do_nothing()
+        changes['delays'] = len(delays)
+        if new['power'] != old['power']:
+            self.API.setTestboardPower(new['power'])
+            changes['power'] = 1
+        if new['pg'] != old['pg']:
+            self.API.setPatternGenerator(new['pg'])
+            changes['pg'] = 1
+        for key, values, get, set_ in [('tbm', new['tbm'], self.Shadow.get_tbm, self.Shadow.set_tbm), ('dacs', new['dacs'], self.Shadow.get_dac, self.Shadow.set_dac)]:
+            diff = [(name, value, i) for i, dacs in enumerate(values) for name, value in dacs.items() if get(name, i) != value]
+            [set_(*args) for args in diff]
+            changes[key] = len(diff)
+        trim, mask = old['trim'] != new['trim'], old['mask'] != new['mask']
+        [self.API.updateTrimBits(where(trim[roc], new['trim'][roc], -1), roc) for roc in range(self.NROCs) if trim[roc].any()]
+        [self.API.maskPixel(int(col), int(row), bool(new['mask'][roc, col, row]), int(roc)) for roc, col, row in argwhere(mask)]
+        changes['trim'], changes['mask'] = int(trim.sum()), int(mask.sum())
+        self.API.testAllPixels(True)
+        self.State = new
+        return {key: n for key, n in changes.items() if n}
+    # endregion WARM INIT
+    # -----------------------------------------
+
+    def monitor_api(self):
+        """ records the number of calls and a latency histogram of every API method """
+        if not isinstance(self.API, LatencyMonitor):
+            old, self.API = self.API, LatencyMonitor(self.API.API if isinstance(self.API, CallCounter) else self.API)
+            if isinstance(old, CallCounter):  # keep the call counts
+                self.API.Calls, self.API.NEvents = old.Calls, old.NEvents
+
+    def transaction(self):
+        """ context manager, which sends all DAC and testboard delay changes done inside at once on exit """
+        return self.Shadow.transaction()
+
+    def cached_scan(self, method, *args, cache=True, **kwargs):
+        """ runs the scan [method] of the API or loads its result if it was already done with the same arguments and DUT state. [cache]=False forces a new scan """
+        return self.ScanCache.scan(self.API, method, *args, cache=cache, hardware=self.hardware(), **kwargs)
+
+    def hardware(self):
+        """ :returns: the identity of the testboard and the DUT. The API can not read back the serial number of the DTB, so use the name instead of "*" in testboardName. """
+        return self.TestBoardName, self.ROCType, self.I2Cs.tolist()
+
+    def clear_scan_cache(self):
+        self.ScanCache.clear()
+
+    def configs(self):
+        return [self.Config, self.TBParameters] + self.TBMDacs + self.ROCDACs
+
+    @contextmanager
+    def persistence(self):
+        """ context manager, which defers all saves of the configuration files done inside and writes every changed file once on exit """
+        with ExitStack() as stack:
+            for cfg in self.configs():
+                stack.enter_context(cfg.deferred())
+            yield
+
+    def print_latency(self, reset=False):
+        """ prints the latency percentiles of the API methods, which took the most time in total """
+        if not isinstance(self.API, LatencyMonitor):
+            return warning('the API is not monitored, call monitor_api() first')
+        self.API.print_summary()
+        self.API.reset() if reset else do_nothing()
 
     # -----------------------------------------
     # region INIT
@@ -290,10 +625,22 @@ class PxarStartUp:
         return [PxarParameters(join(self.Dir, f'{self.Config.get("dacParameters")}{self.Trim}_C{i2c}.dat')) for i2c in self.I2Cs]
 
     def init_trim_dacs(self):
-        dacs = [PxarTrimConfig(join(self.Dir, f'{self.Config.get("trimParameters")}{self.Trim}_C{i2c}.dat'), i2c, self.Mask) for i2c in self.I2Cs]
-        s = array([len(i) for i in dacs])
+        """ :returns: (roc, column, row) array of the trim bits, -1 for unconfigured pixels """
+        trims = array([read_trim_file(filename) for filename in self.trim_files()])
+        s = (trims >= 0).sum(axis=(1, 2))
         info(f'There are {s[0]} pixels for all {self.NROCs} ROCs' if all(s == s[0]) else f'ROC pixels: {s}')
-        return dacs
+        return trims
+
+    def trim_files(self):
+        return [join(self.Dir, f'{self.Config.get("trimParameters")}{self.Trim}_C{i2c}.dat') for i2c in self.I2Cs]
+
+    def init_masks(self):
+        """ :returns: (roc, column, row) array of the masked pixels """
+        return array([self.Mask[i2c] for i2c in self.I2Cs])
+
+    def pixel_config(self):
+        """ :returns: trim bits and mask of every ROC, which are converted to pixelConfigs by the pxar core """
+        return list(zip(self.TrimDACs, self.Masks))
 
     def init_pattern_generator(self):
         pgcal = self.ROCDACs[0].get('wbc') + (6 if 'dig' in self.ROCType else 5)
@@ -304,12 +651,14 @@ class PxarStartUp:
 
     def init_api(self):
         try:
-            api = PyPxarCore(usbId=self.TestBoardName.encode(), logLevel=self.Verbosity.encode())
+            if not self.Mock and PyPxarCore is None:
+                critical(f'could not import the pxar core library (lib/PyPxarCore): {PxarImportError!r}. Use the mock API (--mock) to run without a DTB')
+            api = (MockPxarCore if self.Mock else PyPxarCore)(usbId=self.TestBoardName.encode(), logLevel=self.Verbosity.encode())
             info(f'Init API version: {api.getVersion()}')
             if not api.initTestboard(self.TBParameters.b, self.PowerSettings, self.PGSetup):
                 info('Please check if a new FW version is available')
                 critical('could not init DTB -- possible firmware mismatch.')
-            api.initDUT(self.HubIDs, self.Config.get_b('tbmType', 'tbm08'), byte_dic(self.TBMDacs), self.ROCType.encode(), byte_dic(self.ROCDACs), self.TrimDACs, self.I2Cs)
+            api.initDUT(self.HubIDs, self.Config.get_b('tbmType', 'tbm08'), byte_dic(self.TBMDacs), self.ROCType.encode(), byte_dic(self.ROCDACs), self.pixel_config(), self.I2Cs)
             api.testAllPixels(True)
             return api
         except RuntimeError as e:
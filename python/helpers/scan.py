@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# --------------------------------------------------------
+#       Adaptive scans of DACs and delays, which need fewer triggers than the exhaustive scans
+# created on October 19th 2026 by agent (agent@local)
+# --------------------------------------------------------
+
+from numpy import zeros, arange, array, full, argmax, unique, concatenate, log, ceil, median, where, clip, rint
+from helpers.utils import calc_eff, info, warning, do_nothing, GREEN, RED, ENDC
+
+
+class AdaptiveScan:
+    """ Scan of a parameter (e.g. wbc or the trigger latency) for the value with the highest yield (fraction of events with hits) of every channel (ROC).
+        The coarse pass reads [batch] events at every [step]th value and stops as soon as every channel passed its peak. The refinement reads events around the peak of
+        every channel in batches until the confidence interval of the yield (calc_eff) is smaller than [precision] or [n_max] events are read.
+        If the channels are [shared], all of them are set to the same value (testboard delays), otherwise every channel is refined independently at the same time.
+        :param set_values: function which sets the value of every channel: f(array of values)
+        :param read_hits: function which reads n events: f(n) -> number of events with hits for every channel """
+
+    def __init__(self, set_values, read_hits, n_channels, xmin, xmax, step=1, batch=10, precision=10, n_max=100, width=2, threshold=10, shared=False, prnt=True):
+
+        self.SetValues = set_values
+        self.ReadHits = read_hits
+        self.NChannels = n_channels
+        self.X = arange(xmin, xmax)
+        self.Step = step
+        self.Batch = batch
+        self.Precision = precision  # [%]
+        self.NMax = n_max
+        self.Width = width  # refine +- [width] around the coarse peak
+        self.Threshold = threshold  # minimal yield of a peak [%]
+        self.Shared = shared
+        self.Print = prnt
+
+        self.K = zeros((self.X.size, n_channels), 'i')  # events with hits
+        self.N = zeros((self.X.size, n_channels), 'i')  # read events
+        self.NEvents = 0
+
+    def __repr__(self):
+        return f'{self.__class__.__name__} of {self.X[0]}-{self.X[-1]} for {self.NChannels} channels with {self.NEvents} events'
+
+    def index(self, x):
+        return array(x) - self.X[0]
+
+    def read(self, x, n):
+        """ sets the [x] values (one per channel) and reads [n] events """
+        self.SetValues(x)
+        self.K[self.index(x), arange(self.NChannels)] += self.ReadHits(n)
+        self.N[self.index(x), arange(self.NChannels)] += n
+        self.NEvents += n
+
+    def eff(self, i, ch):
+        """ :returns: yield, upper and lower error [%] of channel [ch] at the value with index [i] """
+        return calc_eff(self.K[i, ch], self.N[i, ch])
+
+    def yields(self):
+        """ :returns: dictionary of the yield [%] of every channel for all values (0 if not measured) """
+        return {x: array([self.eff(i, ch)[0] for ch in range(self.NChannels)]) for i, x in enumerate(self.X)}
+
+    def converged(self, i, ch):
+        return self.N[i, ch] >= self.NMax or max(self.eff(i, ch)[1:]) <= self.Precision
+
+    def passed_peak(self, i, ch):
+        """ :returns: whether the yield of channel [ch] had a peak before index [i] and dropped below the half of it """
+        y = self.K[:i + 1, ch] / self.N[:i + 1, ch].clip(1)
+        i_max = argmax(y)
+        return y[i_max] * 100 > self.Threshold and i_max < i and y[i] < y[i_max] / 2
+
+    def coarse(self):
+        for i in arange(0, self.X.size, self.Step):
+            self.read(full(self.NChannels, self.X[i]), self.Batch)
+            self.print_row(i)
+            if all(self.passed_peak(i, ch) for ch in range(self.NChannels)):
+                info(f'all channels passed their peak at {self.X[i]}', prnt=self.Print)
+                return
+
+    def refine_points(self, ch):
+        """ :returns: the indices around the coarse peak of channel [ch] """
+        i_max = argmax(self.K[:, ch] / self.N[:, ch].clip(1))
+        return arange(max(i_max - self.Width - self.Step // 2, 0), min(i_max + self.Width + self.Step // 2 + 1, self.X.size))
+
+    def refine(self):
+        points = [self.refine_points(ch) for ch in range(self.NChannels)]
+        if self.Shared:
+            points = [unique(concatenate(points))] * self.NChannels
+        pos = zeros(self.NChannels, 'i')  # current point of every channel
+        while any(pos[ch] < points[ch].size for ch in range(self.NChannels)):
+            i = array([points[ch][min(pos[ch], points[ch].size - 1)] for ch in range(self.NChannels)])
+            self.read(self.X[i], self.Batch)
+            done = array([pos[ch] >= points[ch].size or self.converged(i[ch], ch) for ch in range(self.NChannels)])
+            if self.Shared:
+                pos += all(done)
+            else:
+                pos += done & (pos < array([p.size for p in points]))
+
+    def best(self):
+        """ :returns: the value with the highest yield of every channel """
+        return self.X[argmax(self.K / self.N.clip(1), axis=0)]
+
+    def run(self):
+        """ runs the coarse and the refined scan. :returns: the value with the highest yield of every channel """
+        self.print_header()
+        self.coarse()
+        self.refine()
+        best = self.best()
+        info(f'best values: {best.tolist()} ({self.NEvents} events)', prnt=self.Print)
+        return best
+
+    def print_header(self):
+        if self.Print:
+            print('\nEVENT YIELDS:\n  value\t{}'.format('\t'.join(f'ch{i}'.rjust(6) for i in range(self.NChannels))))
+
+    def print_row(self, i):
+        if self.Print:
+            print('  {:03d}\t{}'.format(self.X[i], '\t'.join(f'{self.eff(i, ch)[0]:5.1f}%' for ch in range(self.NChannels))))
+
+
+class WindowSearch:
+    """ Search of the centre of the contiguous window of good settings in a two dimensional grid (e.g. clk and deser160phase). Instead of testing every point, it looks
+        for a good seed close to [start], finds the edges of the window along x, then along y at the x centre and along x again at the y centre. A point is bad at the first
+        failing event and good after [n] good events. The centre is verified with as many events as needed to show an efficiency of at least [eff] with [cl] confidence.
+        :param check: function which tests a point with n events: f(x, y, n) -> number of good events """
+
+    def __init__(self, check, x, y, start=None, n=10, batch=2, eff=.9, cl=.95, exclude=None, prnt=True):
+
+        self.Check = check
+        self.X, self.Y = arange(x) if type(x) is int else array(x), arange(y) if type(y) is int else array(y)
+        self.Start = (self.X[self.X.size // 2], self.Y[self.Y.size // 2]) if start is None else start
+        self.N = n
+        self.Batch = batch
+        self.NVerify = int(ceil(log(1 - cl) / log(eff)))
+        self.Exclude = [] if exclude is None else exclude  # x values to skip
+        self.Print = prnt
+
+        self.Results = {}  # (x, y): good
+        self.NEvents = 0
+
+    def __repr__(self):
+        return f'{self.__class__.__name__} with {len(self.Results)}/{self.X.size * self.Y.size} tested points and {self.NEvents} events'
+
+    def test(self, x, y, n):
+        """ :returns: whether all [n] events of point ([x], [y]) are good, stops at the first bad batch """
+        if x in self.Exclude:
+            return False
+        n_read = 0
+        while n_read < n:
+            k = min(self.Batch, n - n_read)
+            good = self.Check(x, y, k)
+            self.NEvents += k
+            n_read += k
+            if good < k:
+                return False
+        return True
+
+    def is_good(self, x, y):
+        if (x, y) not in self.Results:
+            self.Results[(x, y)] = self.test(x, y, self.N)
+        return self.Results[(x, y)]
+
+    def seed(self):
+        """ :returns: the closest good point to the start, testing every second y value first """
+        points = sorted([(x, y) for x in self.X for y in self.Y], key=lambda p: (abs(p[0] - self.Start[0]) + abs(p[1] - self.Start[1]), p))
+        for p in sorted(points, key=lambda p: (p[1] - self.Y[0]) % 2):
+            if self.is_good(*p):
+                return p
+
+    @staticmethod
+    def edge(values, f):
+        """ :returns: the last good value of [values] (starting with a good value) with bisection """
+        if f(values[-1]):
+            return values[-1]
+        lo, hi = 0, len(values) - 1  # lo is good, hi is bad
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            lo, hi = (mid, hi) if f(values[mid]) else (lo, mid)
+        return values[lo]
+
+    def window(self, values, v0, f):
+        """ :returns: the edges of the good window of [values] around the good value [v0] """
+        i = list(values).index(v0)
+        return self.edge(values[i::-1], f), self.edge(values[i:], f)
+
+    def run(self):
+        """ :returns: the centre of the good window and the margins to its edges (in steps) or None if there is no good point """
+        p = self.seed()
+        if p is None:
+            warning('did not find any good point')
+            return None, None
+        xw = self.window(self.X, p[0], lambda x: self.is_good(x, p[1]))
+        xc = (xw[0] + xw[1]) // 2
+        yw = self.window(self.Y, p[1], lambda y: self.is_good(xc, y))
+        yc = (yw[0] + yw[1]) // 2
+        xw = self.window(self.X, xc, lambda x: self.is_good(x, yc))
+        xc = (xw[0] + xw[1]) // 2
+        margins = {'x': (int(xc - xw[0]), int(xw[1] - xc)), 'y': (int(yc - yw[0]), int(yw[1] - yc))}
+        verified = self.test(xc, yc, self.NVerify)
+        info(f'found the centre ({xc}, {yc}) with margins x: -{margins["x"][0]}/+{margins["x"][1]}, y: -{margins["y"][0]}/+{margins["y"][1]} '
+             f'in {len(self.Results)} points and {self.NEvents} events', prnt=self.Print)
+        warning(f'the centre failed the verification with {self.NVerify} events') if not verified else do_nothing()
+        return (int(xc), int(yc)), margins
+
+    def print_map(self):
+        """ prints the tested points: good (o), bad (x) and not tested (.) """
+        if self.Print:
+            print('\n    ' + ' '.join(f'{y:2d}' for y in self.Y))
+            for x in self.X:
+                res = [self.Results.get((x, y)) for y in self.Y]
+                print(f'{x:2d}: ' + ' '.join(' .' if r is None else f'{GREEN} o{ENDC}' if r else f'{RED} x{ENDC}' for r in res))
+
+
+class LinearTuner:
+    """ Tunes a DAC of every channel (e.g. vana of every ROC), such that the response of every channel (e.g. its analogue current) reaches [target], although only
+        the sum of all channels can be measured. Every channel is measured alone on top of a reference with all channels at [ref]: two points per channel give its
+        slope and its response above the reference, which is assumed to be shared equally by all channels (e.g. the idle current at vana 0). With 2n + 1
+        measurements the DACs are set to the predicted values at once. The prediction is verified with a single joint measurement and only the outliers (slope far
+        off the median or prediction out of [xmin, xmax]) are corrected with secant steps, the other channels only if the total is still off.
+        :param set_values: function which sets the DAC of every channel: f(array of values)
+        :param measure: function which measures the sum of all channels: f() -> value """
+
+    def __init__(self, set_values, measure, n_channels, target, start=120, dv=30, xmin=0, xmax=255, ref=0, tolerance=.2, max_iter=3, prnt=True):
+
+        self.SetValues = set_values
+        self.Measure = measure
+        self.NChannels = n_channels
+        self.Target = target  # per channel
+        self.Start = start
+        self.DV = dv
+        self.Range = xmin, xmax
+        self.Ref = ref
+        self.Tolerance = tolerance  # per channel
+        self.MaxIter = max_iter
+        self.Print = prnt
+
+        self.Values = full(n_channels, start)
+        self.Slopes = None
+        self.Outliers = zeros(n_channels, '?')
+        self.NMeasurements = 0
+
+    def __repr__(self):
+        return f'{self.__class__.__name__} of {self.NChannels} channels with {self.NMeasurements} measurements'
+
+    def clip(self, values):
+        return clip(values, *self.Range)
+
+    def measure(self, values):
+        self.Values = rint(values).astype('i')
+        self.SetValues(self.Values)
+        self.NMeasurements += 1
+        return self.Measure()
+
+    def fit(self):
+        """ measures the slope of every channel. :returns: the response of every channel at the start value """
+        m_ref = self.measure(full(self.NChannels, self.Ref))
+        m = array([[self.measure(where(arange(self.NChannels) == i, v, self.Ref)) for v in [self.Start, self.Start + self.DV]] for i in range(self.NChannels)])
+        self.Slopes = (m[:, 1] - m[:, 0]) / self.DV
+        med = median(self.Slopes)
+        self.Outliers = (self.Slopes <= 0) | (abs(self.Slopes - med) > .5 * abs(med))
+        self.Slopes = where(self.Outliers, med, self.Slopes)
+        return m[:, 0] - m_ref + m_ref / self.NChannels
+
+    def predict(self, m0):
+        """ :returns: the DAC of every channel for the target from its response [m0] at the start value """
+        values = self.Start + (self.Target - m0) / self.Slopes
+        self.Outliers |= (values < self.Range[0]) | (values > self.Range[1])
+        return self.clip(values)
+
+    def run(self):
+        """ :returns: the tuned DAC of every channel """
+        m = self.measure(self.predict(self.fit()))
+        for _ in range(self.MaxIter):
+            diff = self.NChannels * self.Target - m
+            if abs(diff) < self.Tolerance * self.NChannels:
+                break
+            sel = self.Outliers if self.Outliers.any() else full(self.NChannels, True)
+            m = self.measure(self.clip(self.Values + where(sel, diff / sel.sum() / self.Slopes, 0)))
+            self.Outliers[:] = False
+        info(f'tuned {self.NChannels} channels with {self.NMeasurements} measurements to {m / self.NChannels:.2f} per channel (target {self.Target}), '
+             f'values: {self.Values.tolist()}', prnt=self.Print)
+        return self.Values
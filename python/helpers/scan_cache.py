@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# --------------------------------------------------------
+#       Disk cache of pixel scan results keyed by the DUT configuration
+# created on October 19th 2026 by agent (agent@local)
+# --------------------------------------------------------
+
+from glob import glob
+from hashlib import sha1
+from os import stat, remove, replace, getpid, utime
+from os.path import join, isfile, realpath
+from numpy import array, cumsum, load, savez_compressed, ndarray, empty
+from helpers.utils import info, warning, ensure_dir
+from src.raw_stream import Pixel
+
+CachedMethods = ['getEfficiencyMap', 'getPulseheightMap', 'getEfficiencyVsDAC', 'getPulseheightVsDAC', 'getEfficiencyVsDACDAC', 'getPulseheightVsDACDAC']
+
+
+def dut_state(api):
+    """ :returns: the state of the DUT, which determines the result of a scan: ROC DACs, TBM registers, testboard delays, enabled pixels with trim bits and masked pixels.
+        The pattern generator, the power settings and the bias voltage can not be read back from the API and are not part of it. """
+    dacs = [sorted(api.getRocDACs(roc).items()) for roc in api.getEnabledRocIDs()]
+    tbm = [sorted(api.getTbmDACs(core).items()) for core in range(api.getNTbms())]
+    enabled = array([(px.roc, px.column, px.row, px.trim, px.mask) for px in api.getEnabledPixels()], 'i2')
+    masked = array([(px.roc, px.column, px.row) for px in api.getMaskedPixels()], 'i2')
+    return dacs, tbm, sorted(api.getTestboardDelays().items()), enabled, masked
+
+
+def digest(*parts):
+    h = sha1()
+    for part in parts:
+        h.update(part.tobytes() if isinstance(part, ndarray) else repr(part).encode())
+    return h.hexdigest()
+
+
+def to_arrays(data):
+    """ :returns: the pixels of a scan (list of pixels or list of pixel lists for every DAC value) as flat arrays with the number of pixels of every DAC value """
+    nested = len(data) > 0 and not hasattr(data[0], 'roc')  # the API returns the DAC scans as numpy arrays of the pixel lists
+    steps = data if nested else [data]
+    pixels = [px for step in steps for px in step]
+    return {'address': array([(px.roc, px.column, px.row) for px in pixels], 'u1').reshape(-1, 3), 'value': array([px.value for px in pixels]),
+            'counts': array([len(step) for step in steps]), 'nested': nested, 'is_array': isinstance(data, ndarray)}
+
+
+def object_array(steps):
+    """ :returns: the pixel lists [steps] as numpy.array(steps) of PyPxarCore does: 2D if all steps have the same number of pixels """
+    n = {len(step) for step in steps}
+    arr = empty((len(steps), n.pop()) if len(n) == 1 else len(steps), object)
+    for i, step in enumerate(steps):
+        arr[i] = step
+    return arr
+
+
+def from_arrays(f):
+    """ :returns: the scan result in the format of the API from the arrays of to_arrays() """
+    pixels = []
+    for (roc, col, row), value in zip(f['address'].tolist(), f['value'].tolist()):
+        pixels.append(Pixel(roc, col, row, 0))
+        pixels[-1].value = value  # keep the type of the API (averaged pulse heights are floats)
+    if not f['nested']:
+        return pixels
+    ends = cumsum(f['counts']).tolist()
+    steps = [pixels[start:end] for start, end in zip([0] + ends[:-1], ends)]
+    return object_array(steps) if f['is_array'] else steps
+
+
+class ScanCache:
+    """ Cache of the results of pixel scans (CachedMethods) on disk. The key is the hash of the method, its arguments and the state of the DUT read from the API, so a
+        scan is only repeated if something changed which affects its result. Every result is a compressed numpy file, the least recently used ones are removed if
+        the cache exceeds [max_size] bytes. Changes of the bias voltage or the temperature are not known to the API, scan with cache=False after them. """
+
+    def __init__(self, directory='.scan_cache', max_size=2 ** 30):
+        self.Dir = realpath(directory)
+        self.MaxSize = max_size
+        self.NHits = self.NMisses = 0
+
+    def __repr__(self):
+        return f'ScanCache: {len(self.files())} results ({self.size() / 2 ** 20:.1f}/{self.MaxSize / 2 ** 20:.0f} MB), {self.NHits} hits, {self.NMisses} misses'
+
+    def files(self):
+        return glob(join(self.Dir, '*.npz'))
+
+    def size(self):
+        return sum(stat(f).st_size for f in self.files())
+
+    def file_name(self, key):
+        return join(self.Dir, f'{key}.npz')
+
+    def scan(self, api, method, *args, cache=True, hardware=None, **kwargs):
+        """ :returns: the result of the API [method] with the given arguments, loaded from the cache if the same scan was already done with the same [hardware]
+            (identity of the testboard and the DUT) in the same DUT state. With [cache]=False the scan is always done and replaces the cached result. """
+        if method not in CachedMethods:
+            return warning(f'{method} can not be cached, use one of {CachedMethods}')
+        key = digest(method, args, sorted(kwargs.items()), hardware, *dut_state(api))
+        data = self.load(key) if cache else None
+        if data is not None:
+            self.NHits += 1
+            info(f'loaded the result of {method} from the scan cache ({key[:8]})')
+            return data
+        self.NMisses += 1
+        data = getattr(api, method)(*args, **kwargs)
+        self.save(key, data)
+        return data
+
+    def load(self, key):
+        filename = self.file_name(key)
+        if not isfile(filename):
+            return
+        try:
+            with load(filename) as f:
+                data = from_arrays(f)
+        except Exception as err:
+            warning(f'could not read the cached scan {filename} ({err})')
+            return self.remove(filename)
+        utime(filename)  # the mtime is the time of the last use
+        return data
+
+    def save(self, key, data):
+        """ writes [data] to a temporary file and renames it, such that a cached result is never half-written, and removes the least recently used ones """
+        filename = self.file_name(key)
+        tmp = f'{filename}.{getpid()}.tmp'
+        ensure_dir(self.Dir)
+        with open(tmp, 'wb') as f:
+            savez_compressed(f, **to_arrays(data))
+        replace(tmp, filename)
+        self.evict()
+
+    @staticmethod
+    def remove(filename):
+        try:
+            remove(filename)
+        except OSError:  # already removed by another session
+            pass
+
+    def evict(self):
+        """ removes the least recently used results until the size of the cache is below the maximum """
+        files = sorted((s.st_mtime_ns, s.st_size, f) for f, s in [(f, stat(f)) for f in self.files()])
+        total = sum(size for _, size, _ in files)
+        for _, size, filename in files:
+            if total <= self.MaxSize:
+                break
+            self.remove(filename)
+            total -= size
+
+    def clear(self):
+        [self.remove(f) for f in self.files()]
+        info(f'cleared the scan cache in {self.Dir}')
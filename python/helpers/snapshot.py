@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# --------------------------------------------------------
+#       Binary snapshots of parsed configuration files
+# created on October 19th 2026 by agent (agent@local)
+# --------------------------------------------------------
+
+from hashlib import sha1
+from os import stat, replace, getpid, sep
+from os.path import join, isfile, realpath, relpath, isabs
+from pickle import dump, load, HIGHEST_PROTOCOL
+from helpers.utils import warning
+
+
+def file_hash(filename):
+    with open(filename, 'rb') as f:
+        return sha1(f.read()).hexdigest()
+
+
+def file_id(filename):
+    s = stat(filename)
+    return s.st_mtime_ns, s.st_size, file_hash(filename)
+
+
+class Snapshot:
+    """ Binary snapshot of data parsed from text files. There is one file per directory with a section for every user (e.g. the pxar configuration or the
+        calibrations). A section is valid as long as its key is the same and none of its source files changed: the files are compared by mtime and size and only
+        hashed if the mtime differs. The sources are stored relative to the directory and the key contains the real path of the directory, such that a copied
+        directory never uses the data of the original one. The file is never changed in place, but replaced atomically. """
+
+    Name = '.pxar_snapshot.pickle'
+
+    def __init__(self, directory='.'):
+        self.Dir = realpath(directory)
+        self.FileName = join(self.Dir, Snapshot.Name)
+        self.Sections = self.read()
+
+    def read(self):
+        if not isfile(self.FileName):
+            return {}
+        try:
+            with open(self.FileName, 'rb') as f:
+                return load(f)
+        except Exception as err:
+            warning(f'could not read the snapshot {self.FileName} ({err})')
+            return {}
+
+    def is_valid(self, entry, key):
+        if entry['key'] != (self.Dir, key):
+            return False
+        for name, (mtime, size, digest) in entry['sources'].items():
+            if not self.is_inside(name):
+                return False
+            name = join(self.Dir, name)
+            if not isfile(name):
+                return False
+            s = stat(name)
+            if s.st_size != size or (s.st_mtime_ns != mtime and file_hash(name) != digest):
+                return False
+        return True
+
+    def get(self, section, key=None):
+        """ :returns: the data of [section] or None if it does not exist or is outdated """
+        entry = self.Sections.get(section)
+        return entry['data'] if entry is not None and self.is_valid(entry, key) else None
+
+    @staticmethod
+    def is_inside(name):
+        """ :returns: whether the relative path [name] points into the directory """
+        return not isabs(name) and name.split(sep)[0] != '..'
+
+    def save(self, section, data, sources, key=None):
+        sources = {relpath(realpath(name), self.Dir): name for name in sources}
+        outside = [name for rel, name in sources.items() if not self.is_inside(rel)]
+        if outside:
+            warning(f'not saving {section} in the snapshot {self.FileName}, the sources {outside} are outside of the directory')
+            return data
+        self.Sections = self.read()  # other sections may have been saved in the meantime
+        self.Sections[section] = {'key': (self.Dir, key), 'sources': {rel: file_id(name) for rel, name in sources.items()}, 'data': data}
+        tmp = f'{self.FileName}.{getpid()}'
+        try:
+            with open(tmp, 'wb') as f:
+                dump(self.Sections, f, HIGHEST_PROTOCOL)
+            replace(tmp, self.FileName)
+        except OSError as err:
+            warning(f'could not save the snapshot {self.FileName} ({err})')
+        return data
+
+    def load(self, section, build, key=None):
+        """ :returns: the data of [section] from the snapshot or builds it with [build]() -> (data, source files) and saves it. """
+        data = self.get(section, key)
+        if data is None:
+            data, sources = build()
+            self.save(section, data, sources, key)
+        return data
@@ -3,24 +3,33 @@
 # created on June 19th 2018 by M. Reichmann (remichae@phys.ethz.ch)
 # --------------------------------------------------------
 
-from ROOT import PyConfig
-PyConfig.IgnoreCommandLineOptions = True
 from os.path import isfile, exists, dirname, realpath
-from os import makedirs, _exit
+from os import makedirs, _exit, replace
 from pickle import loads
 from configparser import ConfigParser, NoSectionError, NoOptionError
 from datetime import datetime
-from time import time
-from numpy import average, sqrt, array, count_nonzero, zeros, full, log2, quantile, cos, sin, arctan2
+from time import time, perf_counter
+from os import getpid
+from threading import get_ident
+from json import dump
+from numpy import average, sqrt, array, count_nonzero, zeros, full, log2, quantile, cos, sin, arctan2, exp, where
 from progressbar import Bar, ETA, FileTransferSpeed, Percentage, ProgressBar, Widget, SimpleProgress
 from uncertainties import ufloat
 from uncertainties.core import Variable, AffineScalarFunc
 from functools import wraps
 from copy import deepcopy
+from importlib import import_module
+from importlib.util import find_spec
 
 
 type_dict = {'int32': 'I',
+             'uint32': 'i',
+             'int16': 'S',
              'uint16': 's',
+             'int8': 'B',
+             'uint8': 'b',
+             'bool': 'O',
+             'float32': 'F',
              'float64': 'D',
              'int64': 'L'}
 
@@ -89,6 +98,14 @@ def ensure_dir(path):
         makedirs(path)
 
 
+def write_atomic(filename, lines):
+    """ writes [lines] to a temporary file and renames it to [filename], such that the file is never left half-written """
+    tmp = f'{filename}.{getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        f.writelines(lines)
+    replace(tmp, filename)
+
+
 def is_num(string):
     try:
         float(string)
@@ -146,16 +163,12 @@ def load_config(name, ext='ini'):
 
 
 def has_root():
-    try:
-        import ROOT
-        return True
-    except ImportError:
-        return False
+    return find_spec('ROOT') is not None
 
 
 def read_root_file(filename):
     if isfile(filename):
-        return TFile(filename)
+        return ROOT.TFile(filename)
     critical('The file: "{}" does not exist...'.format(filename))
 
 
@@ -200,6 +213,13 @@ def mean_sigma(values, weights=None, err=True):
     return (m, s) if err else (m.n, s.n)
 
 
+def erf(x):
+    """ Abramowitz-Stegun approximation (7.1.26) of the error function, |error| < 1.5e-7 """
+    s, x = where(x < 0, -1, 1), abs(x)
+    t = 1 / (1 + .3275911 * x)
+    return s * (1 - (((((1.061405429 * t - 1.453152027) * t) + 1.421413741) * t - .284496736) * t + .254829592) * t * exp(-x * x))
+
+
 def remove_letters(string):
     return [x for x in string if x.isdigit()]
 
@@ -350,5 +370,124 @@ def cart2pol(x, y):
 
 def pol2cart(rho, phi):
     return array([rho * cos(phi), rho * sin(phi)])
+
+
+class Span:
+    """ complete event of the chrome trace format, use with Tracer.span """
+
+    __slots__ = ['Name', 'Cat', 'Args', 'T']
+
+    def __init__(self, name, cat, args):
+        self.Name, self.Cat, self.Args, self.T = name, cat, args, 0.
+
+    def __enter__(self):
+        self.T = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        Tracer.Events.append((self.Name, self.Cat, self.T, perf_counter() - self.T, get_ident(), self.Args))
+
+
+class NoSpan:
+    """ shared context manager of a disabled tracer """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class Tracer:
+    """ Records spans of the DAQ (trigger, readout, decoding, calibration, writing, plotting) in the chrome trace event format. The saved file can be opened with
+        chrome://tracing or ui.perfetto.dev. While tracing is disabled, span() only checks a flag and returns a shared dummy. """
+
+    Enabled = False
+    Events = []
+    Remote = []  # trace events of other processes
+    Names = {}  # thread names
+    NoSpan = NoSpan()
+
+    @staticmethod
+    def start():
+        Tracer.Events, Tracer.Remote = [], []
+        Tracer.Enabled = True
+
+    @staticmethod
+    def stop():
+        Tracer.Enabled = False
+
+    @staticmethod
+    def span(name, cat='daq', **args):
+        return Span(name, cat, args) if Tracer.Enabled else Tracer.NoSpan
+
+    @staticmethod
+    def counter(name, **values):
+        """ adds a counter event (e.g. buffer fill levels), which the viewer shows as graph """
+        if Tracer.Enabled:
+            Tracer.Events.append((name, 'C', perf_counter(), None, get_ident(), values))
+
+    @staticmethod
+    def name_thread(name):
+        Tracer.Names[get_ident()] = name
+
+    @staticmethod
+    def get_events(pid=None):
+        """ :returns: the recorded spans as trace event dictionaries (time in us since the system boot, such that events of several processes fit together) """
+        pid = choose(pid, getpid())
+        events = [{'name': name, 'cat': cat, 'ph': 'C', 'ts': t * 1e6, 'pid': pid, 'tid': tid, 'args': args} if dur is None else
+                  {'name': name, 'cat': cat, 'ph': 'X', 'ts': t * 1e6, 'dur': dur * 1e6, 'pid': pid, 'tid': tid, 'args': args} for name, cat, t, dur, tid, args in Tracer.Events]
+        return events + [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}} for tid, name in Tracer.Names.items()]
+
+    @staticmethod
+    def add(events):
+        """ adds the trace event dictionaries of another process """
+        Tracer.Remote.extend(events)
+
+    @staticmethod
+    def save(filename):
+        events = Tracer.get_events() + Tracer.Remote
+        with open(filename, 'w') as f:
+            dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        info(f'saved {len(events)} trace events in {filename}')
+
+
+def traced(name=None, cat='daq'):
+    """ decorator recording every call of the function as span [name] (default: function name) """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not Tracer.Enabled:
+                return func(*args, **kwargs)
+            with Span(choose(name, func.__name__), cat, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class LazyModule:
+    """ stand-in for the module [name], which is only imported at the first attribute access. [setup] is called with the module after the import. """
+
+    def __init__(self, name, setup=None):
+        self.__dict__.update(Name=name, Setup=setup, Module=None)
+
+    def __repr__(self):
+        return f'<lazy module {self.Name} ({"not " if self.Module is None else ""}loaded)>'
+
+    def __getattr__(self, item):
+        return getattr(self.load(), item)
+
+    def load(self):
+        if self.Module is None:
+            self.__dict__['Module'] = import_module(self.Name)
+            self.Setup(self.Module) if self.Setup is not None else do_nothing()
+        return self.Module
+
+
+def setup_root(root):
+    root.PyConfig.IgnoreCommandLineOptions = True
+
+
+ROOT = LazyModule('ROOT', setup_root)
 # endregion CLASSES
 # ----------------------------------------
@@ -8,16 +8,23 @@ import signal
 from subprocess import call
 from sys import argv, stdout
 from threading import Thread
-
-from lib.PyPxarCore import PyProbeDictionary
-from numpy import delete, argmax
+from numpy import delete, argmax, nanmean, nanstd, isfinite, argwhere, nan, concatenate
 from numpy.random import randint
 
 from helpers.draw import *
 from helpers.pxar import *
+from helpers.scan import AdaptiveScan, WindowSearch, LinearTuner
 from src.TreeWriterLjubljana import TreeWriterLjubljana
+from src.writer_service import WriterService
 from src.hdf5_writer import HDF5Writer
-from time import sleep
+from src.event_recorder import EventRecorder, RAW
+from src.raw_stream import Pixel
+from src.scurves import scan_tensor, fit_scurves
+from src.ph_calibration import fit_rocs, write_fitpars
+from helpers.profiling import CallCounter, CommandProfiler
+from contextlib import nullcontext
+from functools import cached_property
+from time import sleep, strftime
 
 BREAK = False
 z = None
@@ -32,7 +39,7 @@ def signal_handler(signal, frame):  # noqa
 signal.signal(signal.SIGINT, signal_handler)
 dacdict = PyRegisterDictionary()
 probedict = PyProbeDictionary()
-prog_name = basename(argv.pop(0))
+prog_name = basename(argv[0])
 
 
 def ex():
@@ -49,16 +56,20 @@ atexit.register(ex)
 class CLIX(PxarStartUp):
     """Simple command processor for the pxar core API."""
 
-    def __init__(self, conf_dir, verbosity, trim):
-        super().__init__(conf_dir, verbosity, trim)
+    def __init__(self, conf_dir, verbosity, trim, mock=False):
+        super().__init__(conf_dir, verbosity, trim, mock)
         self.ProbeDict = PyProbeDictionary()
 
-        self.Draw = Draw()
         self.PBar = PBar()
         self.IsRunning = False
+        self.Profiler = None
 
         self.get_ia()
 
+    @cached_property
+    def Draw(self):  # noqa  ROOT is only loaded at the first plot
+        return Draw()
+
     # -----------------------------------------
     # region HELPERS
     def run(self, filename):
@@ -70,10 +81,39 @@ class CLIX(PxarStartUp):
                 words = line.split()
                 info(f'running: {self.__class__.__name__}.{words[0]}({", ".join(words[1:])})')
                 if words[0] in dir(self):
-                    getattr(self, words[0])(*[float(word) if word.replace('.', '').isdigit() else word for word in words[1:]])
+                    with nullcontext() if self.Profiler is None else self.Profiler.profile(line):
+                        getattr(self, words[0])(*[float(word) if word.replace('.', '').isdigit() else word for word in words[1:]])
                 else:
                     warning(f'unknown method "{words[0]}"')
 
+    def enable_profiling(self, cprofile=False, memory=False, filename=None):
+        """ records the timing, the API calls and the read events of every command run from a script in the session log (default: [conf_dir]/logs) """
+        if not isinstance(self.API, CallCounter):
+            self.API = CallCounter(self.API)
+        self.Profiler = CommandProfiler(choose(filename, join(self.Dir, 'logs', f'session_{strftime("%Y%m%d_%H%M%S")}.jsonl')), self.API, cprofile, memory)
+
+    def disable_profiling(self):
+        self.Profiler = None
+
+    def monitor_api(self):
+        super().monitor_api()
+        if self.Profiler is not None:
+            self.Profiler.Counter = self.API
+
+    @staticmethod
+    def start_trace():
+        """ records the DAQ spans (trigger, readout, decoding, writing, plotting) until save_trace is called """
+        Tracer.start()
+        Tracer.name_thread('main')
+
+    @staticmethod
+    def save_trace(filename=None):
+        """ saves the recorded spans in the chrome trace format (chrome://tracing or ui.perfetto.dev) """
+        filename = choose(filename, join(get_base_dir(), 'data', f'trace_{strftime("%Y%m%d_%H%M%S")}.json'))
+        ensure_dir(dirname(filename))
+        Tracer.save(filename)
+        Tracer.stop()
+
     @staticmethod
     def remove_tbm_info(event):
         """Removes the TBM information (first 4bit) from the 16bit words."""
@@ -173,23 +213,23 @@ class CLIX(PxarStartUp):
         """:returns: the current value of the DAC [dac] of the ROC with id [roc_id]. """
         if roc_id is None:
             return [self.get_dac(dac, roc) for roc in range(self.NROCs)]
-        dacs = self.API.getRocDACs(roc_id)
-        return dacs[dac.encode()] if dac.encode() in dacs else warning(f'Unknown DAC name: {dac}!')
+        value = self.Shadow.get_dac(dac.encode(), roc_id)
+        return value if value is not None else warning(f'Unknown DAC name: {dac}!')
 
-    def set_dac(self, name, value, roc_id=None):
-        """sets the value of the DAC [dac] with ROC ID [roc_id] to [value]. """
+    def set_dac(self, name, value, roc_id=None, force=False):
+        """sets the value of the DAC [dac] with ROC ID [roc_id] to [value]. [force] also writes unchanged values. """
         [self.ROCDACs[i].set(name, value) for i in range(self.NROCs)] if roc_id is None else self.ROCDACs[roc_id].set(name, value)
-        self.API.setDAC(name.encode(), value, roc_id)
+        self.Shadow.set_dac(name.encode(), value, roc_id, force)
 
     def get_tb_delay(self, name):
         """:returns: the current value of the testboard delay [name]. """
-        delays = self.API.getTestboardDelays()
-        return delays[name.encode()] if name.encode() in delays else warning(f'{name} not a valid delay')
+        value = self.Shadow.get_delay(name.encode())
+        return value if value is not None else warning(f'{name} not a valid delay')
 
     def set_tb_delay(self, delay, value, prnt=False):
         """sets the value of the DAC [dac] to [value]. :returns: old value"""
         old = self.TBParameters.set(delay, value, prnt, name='testboard parameters')
-        self.API.setTestboardDelays(self.TBParameters.b)
+        self.Shadow.set_delays({delay.encode(): self.TBParameters[delay]}) if delay in self.TBParameters else do_nothing()
         return delay, old
 
     def set_tb_delays(self, dic, prnt=False):
@@ -229,11 +269,13 @@ class CLIX(PxarStartUp):
         self.daq_stop()
 
     def daq_trigger(self, n_trig=1, period=500):
-        self.API.daqTrigger(n_trig, period)
+        with Tracer.span('trigger', n=n_trig):
+            self.API.daqTrigger(n_trig, period)
 
     def get_event(self):
         try:
-            return self.API.daqGetEvent()
+            with Tracer.span('daqGetEvent'):
+                return self.API.daqGetEvent()
         except RuntimeError:
             return
 
@@ -260,9 +302,10 @@ class CLIX(PxarStartUp):
             sleep(.01)
             self.daq_trigger(10000) if random_trig else do_nothing()
             try:
-                self.set_dac('wbc', wbc)  # resets the ROC ... lazy solution
+                self.set_dac('wbc', wbc, force=True)  # resets the ROC ... lazy solution
                 while self.update_time(t_start, t, len(data), n):
-                    data.append(self.API.daqGetEvent())
+                    with Tracer.span('daqGetEvent'):
+                        data.append(self.API.daqGetEvent())
             except RuntimeError:
                 pass
         self.PBar.finish()
@@ -289,7 +332,8 @@ class CLIX(PxarStartUp):
 
     def daq_get_raw_event(self, convert=True):
         try:
-            event = self.API.daqGetRawEvent()
+            with Tracer.span('daqGetRawEvent'):
+                event = self.API.daqGetRawEvent()
         except RuntimeError:
             return
         event = self.convert_raw_event(event) if convert else event
@@ -349,10 +393,11 @@ class CLIX(PxarStartUp):
     @update_pbar
     def set_clock(self, value, prnt=True):
         """sets all the delays to the right value if you want to change clk"""
-        self.set_tb_delay('clk', value, prnt=prnt)
-        self.set_tb_delay('ctr', value)
-        self.set_tb_delay('sda', value + (11 if self.IsAnalogue else 15))
-        self.set_tb_delay('tin', value + (2 if self.IsAnalogue else 5))
+        with self.transaction():
+            self.set_tb_delay('clk', value, prnt=prnt)
+            self.set_tb_delay('ctr', value)
+            self.set_tb_delay('sda', value + (11 if self.IsAnalogue else 15))
+            self.set_tb_delay('tin', value + (2 if self.IsAnalogue else 5))
 
     def set_external_clock(self, status=True):
         """setExternalClock [status]: enables the external DTB clock input, switches off the internal clock. Only switches if external clock is present."""
@@ -489,6 +534,7 @@ class CLIX(PxarStartUp):
         print('Efficiency: {:6.2f}% ({:5d}/{:5d})'.format(eff, int(read_back), total))
         return eff
 
+    @traced('plot')
     def plot_map(self, data, title, count=False, stats=True):
         is_module = self.NROCs > 1
         proc = 'proc' in self.API.getRocType()
@@ -514,15 +560,28 @@ class CLIX(PxarStartUp):
     # endregion PLOTTING
     # -----------------------------------------
 
-    def get_efficiency_map(self, flags=0, n_triggers=10):
-        data = self.API.getEfficiencyMap(flags, n_triggers)
+    def get_efficiency_map(self, flags=0, n_triggers=10, cache=False):
+        """ shows the efficiency of all enabled pixels. It is mostly used to check the hardware, so it is only loaded from the scan cache with [cache]=True """
+        data = self.cached_scan('getEfficiencyMap', flags, n_triggers, cache=cache)
         self.print_eff(data, n_triggers)
         self.plot_map(data, 'Efficiency Map', stats=False)
 
-    def clk_scan(self, exclude=None):
-        """ scanning digital clk and deser phases """
-        n = 10
+    def get_dac_dac(self, dac1='caldel', dac2='vthrcomp', step1=1, min1=0, max1=255, step2=1, min2=0, max2=255, flags=0, n_triggers=10, cache=True):
+        """ :returns: the efficiencies of all enabled pixels in the scan of [dac1] vs. [dac2] (n_dac1, n_dac2, n_rocs, 52, 80) """
+        data = self.cached_scan('getEfficiencyVsDACDAC', dac1, step1, min1, max1, dac2, step2, min2, max2, flags, n_triggers, cache=cache)
+        return scan_tensor(data, self.NROCs).reshape((len(range(min1, max1 + 1, step1)), -1, self.NROCs, NCols, NRows)) / n_triggers
+
+    def good_headers(self, n):
+        """ :returns: number of the [n] triggered raw events with the right number of valid ROC headers """
         n_rocs = self.API.getNRocs()
+        self.daq_trigger(n)
+        evts = [self.daq_get_raw_event() for _ in range(n)]
+        return sum(event is not None and len(event) == n_rocs and all(header in range(2040, 2044) for header in event) for event in evts)
+
+    def clk_scan(self, exclude=None, full=False, n=10):
+        """ scanning digital clk and deser phases: searches the centre of the window of good timings with [n] triggers per point or tests all points if [full] """
+        if not full:
+            return self.clk_search(exclude, n)
         self.set_pg(cal=False, res=True)
         self.daq_start()
         print('\nCLK', end=' ')
@@ -533,14 +592,12 @@ class CLIX(PxarStartUp):
         for clk in range(20):
             if clk == exclude:
                 continue
-            self.set_clock(clk)
             print('{:2d}:'.format(clk), end=' ')
             for phase in range(8):
-                self.set_tb_delay('deser160phase', phase)
-                # self.api.setTestboardDelays({'clk': clk})
-                self.daq_trigger(n)
-                evts = [self.daq_get_raw_event() for _ in range(n)]
-                eff = mean([1 if event is not None and len(event) == n_rocs and all(header in range(2040, 2044) for header in event) else 0 for event in evts])
+                with self.transaction():  # a single testboard call per point
+                    self.set_clock(clk, prnt=False)
+                    self.set_tb_delay('deser160phase', phase)
+                eff = self.good_headers(n) / n
                 if eff == 1:
                     good.append((clk, phase))
                     print('{c}{eff:1.1f}{e}'.format(eff=eff, c=GREEN, e=ENDC), end=' ')
@@ -558,8 +615,33 @@ class CLIX(PxarStartUp):
             return
         clk, phase = good[(len(good) // 2)]
         print('Set CLK/DESER160PHASE to: {}/{}'.format(clk, phase))
-        self.set_clock(clk)
-        self.set_tb_delay('deser160phase', phase)
+        with self.transaction():
+            self.set_clock(clk)
+            self.set_tb_delay('deser160phase', phase)
+
+    def clk_search(self, exclude=None, n=10):
+        """ searches the centre of the contiguous window of good clk and deser160phase values. :returns: the margins to the edges of the window """
+        def check(clk, phase, n_trig):
+            with self.transaction():  # a single testboard call per point
+                self.set_clock(int(clk), prnt=False)
+                self.set_tb_delay('deser160phase', int(phase))
+            return self.good_headers(n_trig)
+
+        self.set_pg(cal=False, res=True)
+        self.daq_start()
+        search = WindowSearch(check, 20, 8, start=(self.TBParameters.get('clk', 10), self.TBParameters.get('deser160phase', 4)), n=n, exclude=[exclude])
+        centre, margins = search.run()
+        search.print_map()
+        self.daq_stop()
+        self.set_pg(cal=True, res=True)
+        if centre is None:
+            print('Did not find any good timing...')
+            return
+        print('Set CLK/DESER160PHASE to: {}/{} (margins: clk -{}/+{}, phase -{}/+{})'.format(*centre, *margins['x'], *margins['y']))
+        with self.transaction():
+            self.set_clock(centre[0])
+            self.set_tb_delay('deser160phase', centre[1])
+        return margins
 
     def scan_clk(self):
         self.daq_start()
@@ -570,16 +652,17 @@ class CLIX(PxarStartUp):
         self.daq_stop()
 
     def draw_adc_disto(self, vcal=50, col=14, row=14, high=False, n_trig=10000):
-        self.API.setDAC('ctrlreg', 4 if high else 0)
-        self.API.setDAC('vcal', vcal)
+        self.Shadow.set_dac(b'ctrlreg', 4 if high else 0)
+        self.Shadow.set_dac(b'vcal', vcal)
         self.enable_single_pixel(col, row)
         x = [px.value for evt in self.get_data(n_trig) for px in evt.pixels]
         self.Draw.distribution(x, make_bins(-256, 256), 'ACD Distribution for vcal {} in {} Range'.format(vcal, 'high' if high else 'low'), x_tit='ADC', x_range=ax_range(x, 0, .2, .7))
 
-    def wbc_scan(self, min_wbc=97, max_triggers=50, max_wbc=130, plot=False):
+    def wbc_scan(self, min_wbc=97, max_triggers=50, max_wbc=130, plot=False, precision=10):
         """do_wbcScan [minimal WBC] [number of events] [maximal WBC]: \n
-        sets wbc from minWBC until it finds the wbc which has more than 90% filled events or it reaches maxWBC \n
-        (default [90] [100] [130])"""
+        scans wbc from minWBC until all ROCs passed their yield peak, refines the wbc of every ROC independently around its peak until the yield is known to [precision]%
+        (at most [number of events] per wbc) and sets the wbc with the highest yield \n
+        (default [97] [50] [130])"""
 
         # preparations
         info('Turning on HV!')
@@ -590,24 +673,24 @@ class CLIX(PxarStartUp):
         self.API.daqStart()
 
         trigger_phases = zeros(10)
-        yields = {wbc: zeros(self.get_n_rocs()) for wbc in range(min_wbc, max_wbc)}
-        print('\nROC EVENT YIELDS:\n  wbc\t{r}'.format(r='\t'.join(('roc{}'.format(i)).rjust(6) for i in range(self.get_n_rocs()))))
 
-        for wbc in range(min_wbc, max_wbc):  # loop over wbc
+        def set_wbcs(values):
+            with self.transaction():
+                for roc, value in enumerate(values):
+                    self.Shadow.set_dac(b'wbc', int(value), roc)
             self.clear_buffer()
-            self.API.setDAC('wbc', wbc)
-            for event in self.get_event_data(max_triggers):
+
+        def read_hits(n):
+            k = zeros(self.get_n_rocs(), 'i')
+            for event in self.get_event_data(n):
                 if len(event.triggerPhases):
                     trigger_phases[event.triggerPhases[0]] += 1
-                    for roc in set([pix.roc for pix in event.pixels]):
-                        yields[wbc][roc] += 100. / max_triggers
-            print('  {:03d}\t{}'.format(wbc, '\t'.join(['{:5.1f}%'.format(v) for v in yields[wbc]])))
+                    k[list(set([pix.roc for pix in event.pixels]))] += 1
+            return k
 
-            # stopping criterion
-            if wbc > min_wbc + 3 and any(yld > 10 for yld in yields[wbc - 2]):
-                break
-        for roc in range(self.get_n_rocs()):
-            self.API.setDAC('wbc', max(yields, key=lambda x: yields[x][roc]), roc)
+        scan = AdaptiveScan(set_wbcs, read_hits, self.get_n_rocs(), min_wbc, max_wbc, batch=min(10, max_triggers), precision=precision, n_max=max_triggers)
+        set_wbcs(scan.run())
+        yields = scan.yields()
         self.API.daqStop()
 
         # trigger_phase
@@ -681,7 +764,7 @@ class CLIX(PxarStartUp):
 
     def save_time(self, t=2, n=10000):
         self.API.HVon()
-        w = HDF5Writer('main')
+        w = HDF5Writer('main', self.Dir)
         info('taking data ...')
         t_start = time()
         w.PBar.start(t * 60 * 10)
@@ -699,7 +782,7 @@ class CLIX(PxarStartUp):
 
     def save_random(self, n=10000, n_pixel=10):
         self.API.HVon()
-        w = HDF5Writer('main')
+        w = HDF5Writer('main', self.Dir)
         info('taking data ...')
         w.PBar.start(n_pixel)
         for i in range(n_pixel):
@@ -714,48 +797,77 @@ class CLIX(PxarStartUp):
         self.API.HVoff()
 
     def save_hdf5(self, t=1, n=None, random=False):
-        w = HDF5Writer('main')
+        w = HDF5Writer('main', self.Dir)
         self.enable_all()
         w.add_data(self.take_data(w.WBC, t, n, random))
         w.convert()
 
     def save_data(self, n=240000):
         global BREAK
-        t = TreeWriterLjubljana()
+        config = load_config(join(get_base_dir(), 'config', 'ljutel'))
+        t = WriterService(TreeWriterLjubljana, size=config.getint('MAIN', 'writer buffer', fallback=32) * 2 ** 20)
         info('START DATA ACQUISITION FOR RUN {}'.format(t.RunNumber))
         self.API.HVon()
         self.trigger_source('extern')
-        self.set_dac('wbc', t.Config.getint('MAIN', 'wbc'))
+        self.set_dac('wbc', config.getint('MAIN', 'wbc'))
         self.signal_probe('a1', 'sdata2')
         self.daq_start()
         i = 0
         while True:
             try:
-                t.write(self.API.daqGetEvent())
-                print('\r{}'.format(i), end=' ')
+                with Tracer.span('daqGetEventBuffer'):
+                    events = self.API.daqGetEventBuffer()
+                t.write(events)
+                print('\r{} (write lag: {} events)'.format(i + len(events), t.lag[0]), end=' ')
                 stdout.flush()
-                i += 1
-                if i == n:
+                if i < n <= i + len(events):
                     call('ssh -tY f9pc DISPLAY=:0 /home/f9pc001/miniconda2/bin/python /home/f9pc001/Downloads/run/say.py'.split() + ['"finished run {}"'.format(t.RunNumber)])
+                i += len(events)
+                sleep(.01) if not events else do_nothing()
             except RuntimeError:
                 pass
             if BREAK:
                 break
         self.daq_stop()
+        t.print_lag()
+        t.close()
+        BREAK = False
+
+    def save_raw_stream(self, filename=None):
+        """ records the raw DTB stream (daqGetBuffer) until interrupted, such that the run can be decoded offline with src.raw_stream.RawStreamReplay """
+        global BREAK
+        filename = choose(filename, join(get_base_dir(), 'data', 'raw_{}.bin'.format(strftime('%Y%m%d_%H%M%S'))))
+        ensure_dir(dirname(filename))
+        recorder = EventRecorder(filename, RAW, index_interval=100)
+        info('START RAW DATA ACQUISITION: {}'.format(filename))
+        self.daq_start()
+        n = 0
+        while not BREAK:
+            try:
+                words = self.API.daqGetBuffer()
+                recorder.write([words]) if len(words) else sleep(.01)
+                n += len(words)
+                print('\r{:.1f} MB'.format(2 * n / 2 ** 20), end=' ')
+                stdout.flush()
+            except RuntimeError:
+                pass
+        self.daq_stop()
+        recorder.close()
         BREAK = False
 
     def setup_analogue(self, target_ia=24):
-        info('checking if ROCs are programmable ...')
-        self.check_programmable()
-        info('adjusting vana to target {} mA ...'.format(target_ia))
-        self.find_vana(target_ia)
-        info('adjusting clock delays ...')
-        self.find_clk_delay()
-        info('adjusting sampling delays ...')
-        self.find_tb_delays()
-        # todo add caldel scan
-        info('adjusting decoding offsets ...')
-        self.find_offsets()
+        with self.persistence():  # write every configuration file only once at the end
+            info('checking if ROCs are programmable ...')
+            self.check_programmable()
+            info('adjusting vana to target {} mA per ROC (total {} mA) ...'.format(target_ia, target_ia * self.NROCs))
+            self.find_vana(target_ia)
+            info('adjusting clock delays ...')
+            self.find_clk_delay()
+            info('adjusting sampling delays ...')
+            self.find_tb_delays()
+            # todo add caldel scan
+            info('adjusting decoding offsets ...')
+            self.find_offsets()
 
     def find_tb_delays(self):
         """findAnalogueTBDelays: configures tindelay and toutdelay"""
@@ -800,8 +912,8 @@ class CLIX(PxarStartUp):
         self.API.setDecodingL1Offsets(l1_off)
         self.API.setBlackOffsets(b_off)
         self.API.setDecodingAlphas(alpha)
-        self.Config.save('l1Offset', '[{}]'.format(','.join('{:1.1f}'.format(v) for v in l1_off)))
-        self.Config.save('blackOffset',  '[{}]'.format(','.join('{:1.1f}'.format(v) for v in b_off)))
+        self.Config.set('l1Offset', '[{}]'.format(','.join('{:1.1f}'.format(v) for v in l1_off)))
+        self.Config.set('blackOffset',  '[{}]'.format(','.join('{:1.1f}'.format(v) for v in b_off)))
         self.Config.save('alphas',  '[{}]'.format(','.join('{:1.2f}'.format(v) for v in alpha)))
         self.enable_all()
 
@@ -824,13 +936,33 @@ class CLIX(PxarStartUp):
         self.set_tb_delays(old)
         self.TBParameters.save()
 
-    def find_vana(self, target=24, xmin=60, xmax=180):
+    def find_vana(self, target=24, xmin=60, xmax=180, model=True):
+        """ tunes vana of all ROCs to the analogue current [target] per ROC [mA]. The two methods define the target differently:
+            - [model] (default): the linear response of every ROC is measured alone (two points with the others at vana 0) and all ROCs are set at once. The current of
+              a ROC is its own current above vana 0 plus an equal share of the idle current of all ROCs, so the total current is n_rocs * [target].
+            - otherwise every ROC is bisected separately to a total current of [target] with the others at vana 0. This includes the full idle current of the other
+              ROCs, so the ROCs draw less and the total current is below n_rocs * [target]. """
+        if model:
+            return self.fit_vana(target, xmin, xmax)
         values = []
-        for roc in range(self.NROCs):
-            self.set_dac('vana', 0)  # set vana of all ROCs to 0
-            values.append(self._find_vana(target, vana=int(mean([xmin, xmax])), step=(xmax - xmin) // 2, roc=roc))
-        for i in range(self.NROCs):
-            self.set_dac('vana', values[i], i)
+        with self.persistence():  # the dac files are written once after all ROCs converged
+            for roc in range(self.NROCs):
+                self.set_dac('vana', 0)  # set vana of all ROCs to 0
+                values.append(self._find_vana(target, vana=int(mean([xmin, xmax])), step=(xmax - xmin) // 2, roc=roc))
+            for i in range(self.NROCs):
+                self.set_dac('vana', values[i], i)
+
+    def fit_vana(self, target=24, xmin=60, xmax=180):
+        def set_vanas(values):
+            with self.transaction():  # a single call per changed ROC
+                for roc, value in enumerate(values):
+                    self.set_dac('vana', int(value), roc)
+
+        with self.persistence():
+            tuner = LinearTuner(set_vanas, lambda: self.get_ia(prnt=False), self.NROCs, target, (xmin + xmax) // 2, (xmax - xmin) // 4, xmin, xmax)
+            values = tuner.run()
+            self.save_dac_parameters(None)
+        return values
 
     def _find_vana(self, target=24, vana=120, step=60, count=0, roc=0):
         self.set_dac('vana', vana, roc)
@@ -849,10 +981,47 @@ class CLIX(PxarStartUp):
         """ checkADCTimeConstant [vcal=200] [ntrig=10]: sends an amount of triggers for a fixed vcal in high/low region and prints adc values"""
         self.enable_single_pixel(row, col)
         efficiencies = [0 if not px else px[0].value / ntrig for px in self.API.getEfficiencyVsDAC('vcal', 1, 0, 255, nTriggers=ntrig)]
+        thr, noise, _, _ = fit_scurves(arange(256), array(efficiencies)[:, None], prnt=False)
+        info(f'threshold: {thr[0]:.1f} vcal, noise: {noise[0]:.2f} vcal')
         g = self.Draw.make_tgrapherrors('gsc', 'S-Curve for Pixel {} {}'.format(col, row), x=arange(256), y=efficiencies)
         format_histo(g, x_tit='VCAL', y_tit='Efficiency [%]', y_off=1.3)
         self.Draw.histo(g, draw_opt='ap', lm=.12)
 
+    def get_s_curves(self, ntrig=20, vcal_min=0, vcal_max=255, step=1, cache=True):
+        """ :returns: the vcal values and the efficiencies of all pixels (n_vcal, n_rocs, 52, 80) """
+        self.enable_all()
+        data = self.cached_scan('getEfficiencyVsDAC', 'vcal', step, vcal_min, vcal_max, nTriggers=ntrig, cache=cache)
+        return arange(vcal_min, vcal_max + 1, step), scan_tensor(data, self.NROCs) / ntrig
+
+    def s_curves(self, ntrig=20, vcal_min=0, vcal_max=255, step=1, show=True, cache=True):
+        """ measures the S-curves of all pixels and fits their threshold and noise. :returns: threshold and noise maps (n_rocs, 52, 80) [vcal] """
+        thr, noise, _, _ = fit_scurves(*self.get_s_curves(ntrig, vcal_min, vcal_max, step, cache))
+        for roc in range(self.NROCs):
+            info(f'ROC {roc}: threshold = {nanmean(thr[roc]):.1f} +- {nanstd(thr[roc]):.1f} vcal, noise = {nanmean(noise[roc]):.2f} +- {nanstd(noise[roc]):.2f} vcal')
+        if show:
+            self.plot_map([Pixel(roc, col, row, thr[roc, col, row]) for roc, col, row in argwhere(isfinite(thr))], 'Threshold Map', stats=False)
+        return thr, noise
+
+    def get_ph_scan(self, ntrig=10, low=(10, 255, 10), high=(30, 255, 15), cache=True):
+        """ :returns: the vcal values (high range multiplied by 7) and the pulse heights of all pixels (n_vcal, n_rocs, 52, 80), nan without hits """
+        self.enable_all()
+        old, data, x = self.get_dac('ctrlreg'), [], []
+        for ctrlreg, (vmin, vmax, step), f in [(0, low, 1), (4, high, 7)]:
+            self.Shadow.set_dac(b'ctrlreg', ctrlreg)
+            data += self.cached_scan('getPulseheightVsDAC', 'vcal', step, vmin, vmax, nTriggers=ntrig, cache=cache)
+            x.append(arange(vmin, vmax + 1, step) * f)
+        with self.transaction():
+            for roc, value in enumerate(old):
+                self.Shadow.set_dac(b'ctrlreg', value, roc)
+        return concatenate(x), scan_tensor(data, self.NROCs, fill=nan)
+
+    def ph_calibration(self, ntrig=10, low=(10, 255, 10), high=(30, 255, 15), save=True, cache=True):
+        """ measures the pulse height vs. vcal of all pixels in the low and high range, fits them and writes the phCalibrationFitErr files of all ROCs to the config
+            directory. :returns: the fit parameters (n_rocs, 52, 80, 4) """
+        pars, chi2 = fit_rocs(*self.get_ph_scan(ntrig, low, high, cache))
+        write_fitpars(pars, self.Dir, self.Trim, self.I2Cs) if save else do_nothing()
+        return pars
+
 
 if __name__ == '__main__':
 
@@ -864,10 +1033,21 @@ if __name__ == '__main__':
     parser.add_argument('--verbosity', '-v', metavar="LEVEL", default="INFO", help="The output verbosity set in the pxar API.")
     parser.add_argument('--trim', '-T', nargs='?', default='', help="The output verbosity set in the pxar API. [default = '']")
     parser.add_argument('-wbc', action='store_true')
+    parser.add_argument('--mock', '-m', action='store_true', help='use the pure python mock of the pxar API with synthetic data instead of a DTB')
+    parser.add_argument('--latency', '-l', action='store_true', help='record the latency of every API call, print it with z.print_latency()')
+    parser.add_argument('--trace', nargs='?', default=None, const='', help='record a chrome trace of the DAQ and save it at the exit [default = data/trace_<time>.json]')
+    parser.add_argument('--profile', '-p', nargs='?', default=None, const='time', choices=['time', 'cprofile', 'memory', 'all'], help='log the timing of the script commands')
     args = parser.parse_args()
 
     print_banner('# STARTING ipython pXar Command Line Interface')
-    z = CLIX(args.dir, args.verbosity, args.trim)
+    z = CLIX(args.dir, args.verbosity, args.trim, args.mock)
+    if args.latency:
+        z.monitor_api()
+    if args.trace is not None:
+        z.start_trace()
+        atexit.register(z.save_trace, args.trace if args.trace else None)
+    if args.profile is not None:
+        z.enable_profiling(args.profile in ['cprofile', 'all'], args.profile in ['memory', 'all'])
 
     if args.wbc:
         z.run_wbc()
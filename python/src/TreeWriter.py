@@ -4,14 +4,49 @@
 # created on February 20th 2017 by M. Reichmann (remichae@phys.ethz.ch)
 # --------------------------------------------------------
 
-from ROOT import TTree, TFile
 from helpers.utils import *
 from os.path import join, dirname, realpath, basename
 from time import sleep
+from collections import OrderedDict
+from numpy import zeros
+
+
+class ArrayBranches(OrderedDict):
+    """ numpy buffers attached to variable length array branches "key[counter]" of a tree, which grow on demand. """
+
+    def __init__(self, tree, counter, dtypes, size=64, fields=None):
+        super().__init__()
+        self.Tree = tree
+        self.Fields = {key: choose(fields, {}).get(key, key) for key, _ in dtypes}
+        self.Counter = counter
+        self.N = zeros(1, 'i4')
+        self.Size = size
+        self.Tree.Branch(counter, self.N, f'{counter}/I')
+        for key, typ in dtypes:
+            self[key] = zeros(size, typ)
+            self.Tree.Branch(key, self[key], f'{key}[{counter}]/{type_dict[self[key].dtype.name]}')
+
+    def resize(self, n):
+        """ reallocates all buffers with at least [n] entries and points the branches to the new addresses. """
+        self.Size = max(n, 2 * self.Size)
+        for key, buf in self.items():
+            self[key] = zeros(self.Size, buf.dtype)
+            self.Tree.SetBranchAddress(key, self[key])
+
+    def fill(self, columns):
+        """ copies the fields of the structured array [columns] into the buffers. """
+        n = len(columns)
+        if n > self.Size:
+            self.resize(n)
+        self.N[0] = n
+        for key, buf in self.items():
+            buf[:n] = columns[self.Fields[key]]
 
 
 class TreeWriter:
 
+    IsOpen = False  # nothing to close if the initialisation failed
+
     def __init__(self, config_name):
 
         self.Dir = dirname(dirname(realpath(__file__)))
@@ -30,15 +65,29 @@ class TreeWriter:
         self.ScalarBranches = self.init_scalar_branches()
 
         self.NEvents = 0
+        self.IsOpen = True
 
     def __del__(self):
-        self.File.cd()
-        self.File.Write()
-        self.File.Close()
-        self.save_run_number()
-        info('Successfully saved the tree: {}'.format(basename(self.File.GetName())))
-        sleep(.1)
-        self.copy_file()
+        self.close()
+
+    def close(self):
+        if self.IsOpen:
+            self.IsOpen = False
+            self.File.cd()
+            self.File.Write()
+            self.File.Close()
+            self.save_run_number()
+            info('Successfully saved the tree: {}'.format(basename(self.File.GetName())))
+            sleep(.1)
+            self.copy_file()
+
+    def flush(self):
+        """ writes the baskets and the tree headers to the file such that everything written so far can be recovered. """
+        for tree in self.get_trees():
+            tree.AutoSave('SaveSelf')
+
+    def get_trees(self):
+        return self.Trees
 
     def load_run_number(self):
         if isfile(self.RunFileName):
@@ -59,10 +108,10 @@ class TreeWriter:
 
     def init_file(self):
         ensure_dir(self.DataDir)
-        return TFile(join(self.DataDir, '{}_{}.root'.format(self.FileName, str(self.RunNumber).zfill(3))), 'RECREATE')
+        return ROOT.TFile(join(self.DataDir, '{}_{}.root'.format(self.FileName, str(self.RunNumber).zfill(3))), 'RECREATE')
 
     def init_tree(self):
-        return TTree(*[self.Config.get('TREE', 'name')] * 2)
+        return ROOT.TTree(*[self.Config.get('TREE', 'name')] * 2)
 
     @staticmethod
     def init_scalar_branches():
@@ -87,6 +136,11 @@ class TreeWriter:
     def write(self, event):
         pass
 
+    def write_batch(self, events, t=None):
+        """ writes a batch of events, [t] is the readout time of their buffer """
+        for event in events:
+            self.write(event)
+
     def copy_file(self):
         pass
 
@@ -4,20 +4,30 @@
 # created on February 20th 2017 by M. Reichmann (remichae@phys.ethz.ch)
 # --------------------------------------------------------
 
-from ROOT import TTree, TFile, vector
 from progressbar import Bar, ETA, FileTransferSpeed, Percentage, ProgressBar
 from collections import OrderedDict
 from os.path import isfile
+from time import time
+from helpers.utils import ROOT, info, add_to_info, do_nothing, traced
+from src.TreeWriter import ArrayBranches
+from src.event_arrays import EventArrays, Dtypes
 
 
 class TreeWriter:
+    """ Writes the error tree. Since October 2026 (FormatVersion 2) the branches are variable length C arrays instead of std::vectors: every group has a counter
+        branch (NHits, NHeaders, NRocs, NMismatch, NNoData) and the branches of the group (e.g. plane, col, row, adc for NHits) have this length. The branch names and
+        element types did not change, so TTree::Draw works as before, but readers which bind std::vector addresses have to bind arrays sized by the counter instead.
+        The version is stored as TNamed 'FormatVersion' in the UserInfo of the tree, files without it have the std::vector layout (version 1). """
+
+    FormatVersion = 2
 
     def __init__(self, data):
 
         self.Data = data
         self.File = None
         self.Tree = None
-        self.VectorBranches = self.init_vector_branches()
+        self.BranchFields = self.init_branch_fields()
+        self.Branches = None
 
         self.RunFileName = 'runNumber.txt'
         self.RunNumber = self.load_run_number()
@@ -28,6 +38,16 @@ class TreeWriter:
         self.ProgressBar = ProgressBar(widgets=['Progress: ', Percentage(), ' ', Bar(marker='>'), ' ', ETA(), ' ', FileTransferSpeed()], maxval=n)
         self.ProgressBar.start()
 
+    @staticmethod
+    def init_branch_fields():
+        """ :returns: the name of the counter and the map of the branch names to the EventArrays fields for each group. """
+        flags = ['invalid_address', 'invalid_pulse_height', 'buffer_corruption']
+        return OrderedDict([('hits', ('NHits', OrderedDict([('plane', 'roc'), ('col', 'column'), ('row', 'row'), ('adc', 'value')] + [(key, key) for key in flags]))),
+                            ('headers', ('NHeaders', OrderedDict([(key, key) for key in Dtypes['headers'].names]))),
+                            ('rocs', ('NRocs', OrderedDict([(key, key) for key in Dtypes['rocs'].names]))),
+                            ('eventid_mismatch', ('NMismatch', OrderedDict([('eventid_mismatch', 'value')]))),
+                            ('no_data', ('NNoData', OrderedDict([('no_data', 'value')])))])
+
     def load_run_number(self):
         if isfile(self.RunFileName):
             f = open(self.RunFileName)
@@ -45,85 +65,42 @@ class TreeWriter:
         f.write('{n}'.format(n=self.RunNumber + 1))
         f.close()
 
-    @staticmethod
-    def init_vector_branches():
-        dic = OrderedDict([('plane', vector('unsigned short')()),
-                           ('col', vector('unsigned short')()),
-                           ('row', vector('unsigned short')()),
-                           ('adc', vector('short')()),
-                           ('header', vector('unsigned int')()),
-                           ('trailer', vector('unsigned int')()),
-                           ('pkam', vector('unsigned short')()),
-                           ('token_pass', vector('unsigned short')()),
-                           ('reset_tbm', vector('unsigned short')()),
-                           ('reset_roc', vector('unsigned short')()),
-                           ('auto_reset', vector('unsigned short')()),
-                           ('cal_trigger', vector('unsigned short')()),
-                           ('trigger_count', vector('unsigned short')()),
-                           ('trigger_phase', vector('unsigned short')()),
-                           ('stack_count', vector('unsigned short')()),
-                           ('invalid_address', vector('bool')()),
-                           ('invalid_pulse_height', vector('bool')()),
-                           ('buffer_corruption', vector('bool')()),
-                           ('incomplete_data', vector('bool')()),
-                           ('missing_roc_headers', vector('bool')()),
-                           ('roc_readback', vector('bool')()),
-                           ('no_data', vector('bool')()),
-                           ('eventid_mismatch', vector('bool')())])
-        return dic
-
-    def clear_vectors(self):
-        for key in self.VectorBranches.keys():
-            self.VectorBranches[key].clear()
-
     def set_branches(self):
-        for key, vec in self.VectorBranches.items():
-            self.Tree.Branch(key, vec)
+        """ one counter and a set of array branches for each group of the event arrays. """
+        return OrderedDict([(grp, ArrayBranches(self.Tree, counter, [(key, Dtypes[grp][field]) for key, field in fields.items()], fields=fields))
+                            for grp, (counter, fields) in self.BranchFields.items()])
 
     def write_tree(self, hv, cur):
+        """ converts the list of events into columns and writes them with the bulk writer. """
+        t = info('converting events to arrays ... ', endl=False)
+        arrays = EventArrays.from_events(self.Data)
+        add_to_info(t)
+        self.write_arrays(arrays, hv, cur)
+
+    @traced('write')
+    def write_arrays(self, arrays, hv=None, cur=None, basket_size=None, auto_flush=None):
+        """ fills the error tree from the columnar [arrays] (EventArrays). The buffers only get copied once per event and group. """
         hv_str = '-{v}'.format(v=hv) if hv is not None else ''
         cur_str = '-{c}'.format(c=cur) if cur is not None else ''
-        self.File = TFile('run{n}{v}{c}.root'.format(n=str(self.RunNumber).zfill(3), v=hv_str, c=cur_str), 'RECREATE')
-        self.Tree = TTree('tree', 'The error tree')
-        self.set_branches()
-        self.start_pbar(len(self.Data))
-        for i, ev in enumerate(self.Data):
-            self.ProgressBar.update(i + 1)
-            self.clear_vectors()
-            for pix in ev.pixels:
-                self.VectorBranches['plane'].push_back(int(pix.roc))
-                self.VectorBranches['col'].push_back(int(pix.column))
-                self.VectorBranches['row'].push_back(int(pix.row))
-                self.VectorBranches['adc'].push_back(int(pix.value))
-                self.VectorBranches['invalid_address'].push_back(bool(pix.invalid_address))
-                self.VectorBranches['invalid_pulse_height'].push_back(bool(pix.invalid_pulse_height))
-                self.VectorBranches['buffer_corruption'].push_back(bool(pix.buffer_corruption))
-            for k in range(len(ev.roc_readback)):
-                self.VectorBranches['roc_readback'].push_back(ev.roc_readback[k])
-                self.VectorBranches['incomplete_data'].push_back(ev.incomplete_data[k])
-                self.VectorBranches['missing_roc_headers'].push_back(ev.missing_roc_headers[k])
-            for err in ev.eventid_mismatch:
-                self.VectorBranches['eventid_mismatch'].push_back(err)
-            for err in ev.no_data:
-                self.VectorBranches['no_data'].push_back(err)
-            for j in range(len(ev.header)):
-                self.VectorBranches['header'].push_back(ev.header[j])
-                self.VectorBranches['trailer'].push_back(ev.trailer[j])
-                self.VectorBranches['pkam'].push_back(ev.havePkamReset[j])
-                self.VectorBranches['cal_trigger'].push_back(ev.haveCalTrigger[j])
-                self.VectorBranches['token_pass'].push_back(ev.haveTokenPass[j])
-                self.VectorBranches['reset_tbm'].push_back(ev.haveResetTBM[j])
-                self.VectorBranches['reset_roc'].push_back(ev.haveResetROC[j])
-                self.VectorBranches['auto_reset'].push_back(ev.haveAutoReset[j])
-                self.VectorBranches['trigger_count'].push_back(ev.triggerCounts[j])
-                self.VectorBranches['trigger_phase'].push_back(ev.triggerPhases[j])
-                self.VectorBranches['stack_count'].push_back(ev.stackCounts[j])
+        self.File = ROOT.TFile('run{n}{v}{c}.root'.format(n=str(self.RunNumber).zfill(3), v=hv_str, c=cur_str), 'RECREATE')
+        self.Tree = ROOT.TTree('tree', 'The error tree')
+        self.Tree.GetUserInfo().Add(ROOT.TNamed('FormatVersion', str(self.FormatVersion)))
+        self.Tree.SetAutoFlush(auto_flush) if auto_flush is not None else do_nothing()
+        self.Branches = self.set_branches()
+        self.Tree.SetBasketSize('*', basket_size) if basket_size is not None else do_nothing()
+        t = time()
+        self.start_pbar(arrays.NEvents)
+        for i in range(arrays.NEvents):
+            for grp, branches in self.Branches.items():
+                branches.fill(arrays.get(grp, i))
             self.Tree.Fill()
+            self.ProgressBar.update(i + 1) if not i % 1000 else do_nothing()
         self.ProgressBar.finish()
         self.File.cd()
         self.File.Write()
         self.File.Close()
         self.save_run_number()
+        info('wrote {} events to {} ({:.0f} events/s)'.format(arrays.NEvents, self.File.GetName(), arrays.NEvents / max(time() - t, 1e-6)))
 
 
 if __name__ == '__main__':
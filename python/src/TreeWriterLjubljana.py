@@ -6,8 +6,9 @@
 
 from collections import OrderedDict
 from src.TreeWriter import *
+from src.event_arrays import EventArrays
 from time import time
-from numpy import array, zeros
+from numpy import array, zeros, arange, repeat, argsort, bincount, cumsum, append, minimum, where
 from glob import glob
 from shutil import copy
 
@@ -19,34 +20,33 @@ class TreeWriterLjubljana(TreeWriter):
         TreeWriter.__init__(self, config_name)
 
         self.File.cd()
-        self.EventTree = TTree('Event', 'Event Information')
+        self.EventTree = ROOT.TTree('Event', 'Event Information')
         self.EventBranches = self.init_event_branches()
+        self.ReadoutTime = None
+        self.NBuffers = 0
 
         self.HitDirs = []
         self.Trees = []
+        self.HitBranches = []
         self.init_trees()
 
         self.set_event_branches()
         self.set_branches()
+        self.set_buffer_sizes()
 
     @staticmethod
     def init_event_branches():
-        return OrderedDict([('TimeStamp', array([0], 'f8'))])
+        return OrderedDict([('TimeStamp', array([0], 'f8')), ('TriggerCount', array([0], 'i4')), ('Buffer', array([0], 'i4'))])
+
+    @staticmethod
+    def init_hit_dtype():
+        return [('Value', 'f8'), ('PixX', 'i4'), ('PixY', 'i4'), ('HitInCluster', 'i4')]
 
     def init_scalar_branches(self):
-        return [OrderedDict([('NHits', array([0], 'i'))]) for _ in range(self.NPlanes)]
+        return [OrderedDict() for _ in range(self.NPlanes)]  # NHits is the counter of the hit branches
 
     def init_vector_branches(self):
-        n = 5000
-        branches = []
-        for i in range(self.NPlanes):
-            branches.append(OrderedDict([('Value', zeros(n, 'f8')),
-                                         ('Timing', zeros(n, 'f8')),
-                                         ('PixX', zeros(n, 'i4')),
-                                         ('PixY', zeros(n, 'i4')),
-                                         ('HitInCluster', zeros(n, 'i4')),
-                                         ('TriggerCount', zeros(n, 'i4'))]))
-        return branches
+        return [OrderedDict([('Timing', zeros(1, 'f8')), ('TriggerCount', zeros(1, 'i4'))]) for _ in range(self.NPlanes)]
 
     def set_event_branches(self):
         for key, value in self.EventBranches.items():
@@ -61,11 +61,19 @@ class TreeWriterLjubljana(TreeWriter):
 
     def set_branches(self):
         for itree in range(self.NPlanes):
-            for key, value in self.ScalarBranches[itree].iteritems():
-                self.Trees[itree].Branch(key, value, '{}/{}'.format(key, type_dict[value[0].dtype.name]))
-            for key, vec in self.VectorBranches[itree].iteritems():
-                array_size = '1' if key in ['Timing', 'TriggerCount'] else 'NHits'
-                self.Trees[itree].Branch(key, vec, '{key}[{n}]/{type}'.format(key=key, n=array_size, type=type_dict[vec[0].dtype.name]))
+            self.HitBranches.append(ArrayBranches(self.Trees[itree], 'NHits', self.init_hit_dtype(), size=self.Config.getint('TREE', 'buffer size', fallback=256)))
+            for key, vec in self.VectorBranches[itree].items():
+                self.Trees[itree].Branch(key, vec, '{key}[1]/{type}'.format(key=key, type=type_dict[vec[0].dtype.name]))
+
+    def set_buffer_sizes(self):
+        """ sets the basket size [bytes] of all branches and the number of entries after which the baskets are flushed to the file. """
+        basket_size, auto_flush = [self.Config.getint('TREE', opt, fallback=None) for opt in ['basket size', 'auto flush']]
+        for tree in self.get_trees():
+            tree.SetBasketSize('*', basket_size) if basket_size is not None else do_nothing()
+            tree.SetAutoFlush(auto_flush) if auto_flush is not None else do_nothing()
+
+    def get_trees(self):
+        return self.Trees + [self.EventTree]
 
     def copy_file(self):
         nrs = [name.strip('.root').split('_')[-1] for name in glob(join(self.DataDir, 'run*'))]
@@ -74,27 +82,50 @@ class TreeWriterLjubljana(TreeWriter):
         info('copied {} to {}'.format(self.File.GetName(), join(self.DataDir, 'run_{}.root'.format(last_nr + 1))))
 
     def write(self, ev):
-        self.EventBranches['TimeStamp'][0] = time() * 1000
-        n_hits = zeros(self.NPlanes, 'i')
-        x, y, adc = [[[] for _ in range(self.NPlanes)] for _ in range(3)]
-        for pix in ev.pixels:
-            n_hits[pix.roc] += 1
-            x[pix.roc].append(pix.column)
-            y[pix.roc].append(pix.row)
-            adc[pix.roc].append(pix.value)
-        for i in range(self.NPlanes):
-            self.ScalarBranches[i]['NHits'][0] = n_hits[i]
-            for j in range(len(ev.header)):
-                self.VectorBranches[i]['Timing'][j] = ev.triggerPhases[j]
-                self.VectorBranches[i]['TriggerCount'][j] = ev.triggerCounts[j]
-            for j in range(n_hits[i]):
-                self.VectorBranches[i]['PixX'][j] = x[i][j]
-                self.VectorBranches[i]['PixY'][j] = y[i][j]
-                self.VectorBranches[i]['Value'][j] = adc[i][j]
-            self.Trees[i].Fill()
-        self.EventTree.Fill()
-        self.NEvents += 1
+        self.write_batch([ev])
+
+    @traced('write')
+    def write_batch(self, events, t=None):
+        """ writes a batch of events (list of PxEvents or EventArrays). The hits get sorted by plane and event with numpy and every entry is a slice of the sorted array.
+            The events carry no time information: all events of the batch get the readout time [t] of their buffer (default: now) in ms as TimeStamp, the index of the
+            buffer and the trigger count of their TBM header. """
+        arrays = events if isinstance(events, EventArrays) else EventArrays.from_events(events)
+        n = arrays.NEvents
+        if not n:
+            return
+        hits = arrays.hits
+        cut = hits['roc'] < self.NPlanes
+        keys = (hits['roc'].astype('i8') * n + repeat(arange(n), arrays.n_hits))[cut]  # plane major ordering
+        order = argsort(keys, kind='stable')
+        offsets = append(0, cumsum(bincount(keys, minlength=self.NPlanes * n)))
+        data = zeros(order.size, self.init_hit_dtype())
+        for key, field in [('PixX', 'column'), ('PixY', 'row'), ('Value', 'value')]:
+            data[key] = hits[field][cut][order]
+        phases, counts = self.get_trigger_info(arrays)
+        t = time() if t is None else t
+        if t != self.ReadoutTime:  # the writer service splits large buffers into several batches with the same readout time
+            self.ReadoutTime, self.NBuffers = t, self.NBuffers + 1
+        self.EventBranches['TimeStamp'][0] = t * 1000
+        self.EventBranches['Buffer'][0] = self.NBuffers - 1
+        for i in range(n):
+            for plane in range(self.NPlanes):
+                j = plane * n + i
+                self.HitBranches[plane].fill(data[offsets[j]:offsets[j + 1]])
+                self.VectorBranches[plane]['Timing'][0] = phases[i]
+                self.VectorBranches[plane]['TriggerCount'][0] = counts[i]
+                self.Trees[plane].Fill()
+            self.EventBranches['TriggerCount'][0] = counts[i]
+            self.EventTree.Fill()
+        self.NEvents += n
 
+    @staticmethod
+    def get_trigger_info(arrays):
+        """ :returns: trigger phase and trigger count of the first TBM header of every event (0 if there is no header). """
+        headers = arrays.Data['headers']
+        if not headers.size:
+            return zeros((2, arrays.NEvents), 'i4')
+        first = minimum(arrays.Offsets['headers'][:-1], headers.size - 1)
+        return [where(arrays.Counts['headers'] > 0, headers[key][first], 0) for key in ['trigger_phase', 'trigger_count']]
 
 if __name__ == '__main__':
     z = TreeWriter('ljutel')
@@ -4,26 +4,37 @@
 # created on April 18th 2017 by M. Reichmann (remichae@phys.ethz.ch)
 # --------------------------------------------------------
 
-from ROOT import TTree, TFile, vector
 from progressbar import Bar, ETA, FileTransferSpeed, Percentage, ProgressBar
 from collections import OrderedDict
 from os.path import isfile
+from src.TreeWriter import ArrayBranches
+from src.event_arrays import EventArrays, HitDtype
+from helpers.utils import ROOT, info, traced
 
 
 class TreeWriter:
+    """ Streams events into the source tree: open(), append(batch) as often as required and close(). The tree gets auto-saved every [auto_save] events, such that a crash
+        loses at most one interval. """
 
-    def __init__(self, data):
+    File = None  # nothing to close if the initialisation failed
+
+    def __init__(self, data=None, auto_save=10000):
 
         self.Data = data
         self.File = None
         self.Tree = None
-        self.VectorBranches = self.init_vector_branches()
+        self.Branches = None
+        self.AutoSave = auto_save
+        self.NEvents = 0
 
         self.RunFileName = 'runNumber.txt'
         self.RunNumber = self.load_run_number()
 
         self.ProgressBar = None
 
+    def __del__(self):
+        self.close()
+
     def start_pbar(self, n):
         self.ProgressBar = ProgressBar(widgets=['Progress: ', Percentage(), ' ', Bar(marker='>'), ' ', ETA(), ' ', FileTransferSpeed()], maxval=n)
         self.ProgressBar.start()
@@ -46,38 +57,47 @@ class TreeWriter:
         f.close()
 
     @staticmethod
-    def init_vector_branches():
-        dic = OrderedDict([('col', vector('unsigned short')()),
-                           ('row', vector('unsigned short')()),
-                           ('adc', vector('short')())])
-        return dic
-
-    def clear_vectors(self):
-        for key in self.VectorBranches.keys():
-            self.VectorBranches[key].clear()
+    def init_branch_fields():
+        return OrderedDict([('col', 'column'), ('row', 'row'), ('adc', 'value')])
 
     def set_branches(self):
-        for key, vec in self.VectorBranches.items():
-            self.Tree.Branch(key, vec)
-
-    def write_tree(self):
-        self.File = TFile('run{n}.root'.format(n=str(self.RunNumber).zfill(3)), 'RECREATE')
-        self.Tree = TTree('tree', 'The source tree')
-        self.set_branches()
-        self.start_pbar(len(self.Data))
-        for i, ev in enumerate(self.Data):
-            self.ProgressBar.update(i + 1)
-            self.clear_vectors()
-            for pix in ev.pixels:
-                self.VectorBranches['col'].push_back(int(pix.column))
-                self.VectorBranches['row'].push_back(int(pix.row))
-                self.VectorBranches['adc'].push_back(int(pix.value))
+        fields = self.init_branch_fields()
+        return ArrayBranches(self.Tree, 'NHits', [(key, HitDtype[field]) for key, field in fields.items()], fields=fields)
+
+    def open(self):
+        self.File = ROOT.TFile('run{n}.root'.format(n=str(self.RunNumber).zfill(3)), 'RECREATE')
+        self.Tree = ROOT.TTree('tree', 'The source tree')
+        self.Branches = self.set_branches()
+        self.NEvents = 0
+
+    @traced('write')
+    def append(self, events):
+        """ writes a batch of events (list of PxEvents or EventArrays) and auto-saves the tree after every [AutoSave] events. """
+        arrays = events if isinstance(events, EventArrays) else EventArrays.from_pixels(events)
+        for i in range(arrays.NEvents):
+            self.Branches.fill(arrays.get('hits', i))
             self.Tree.Fill()
+        if self.AutoSave and (self.NEvents + arrays.NEvents) // self.AutoSave > self.NEvents // self.AutoSave:
+            self.Tree.AutoSave('SaveSelf')
+        self.NEvents += arrays.NEvents
+
+    def close(self):
+        if self.File is not None:
+            self.File.cd()
+            self.File.Write()
+            self.File.Close()
+            self.save_run_number()
+            info('saved {} events in {}'.format(self.NEvents, self.File.GetName()))
+            self.File = None
+
+    def write_tree(self, batch_size=1000):
+        self.open()
+        self.start_pbar(len(self.Data))
+        for i in range(0, len(self.Data), batch_size):
+            self.append(self.Data[i:i + batch_size])
+            self.ProgressBar.update(min(i + batch_size, len(self.Data)))
         self.ProgressBar.finish()
-        self.File.cd()
-        self.File.Write()
-        self.File.Close()
-        self.save_run_number()
+        self.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# --------------------------------------------------------
+#       Converts runs between the ROOT layout of the TreeWriterLjubljana and the hdf5 layout of the HDF5Writer
+# created on October 19th 2026 by agent (agent@local)
+# --------------------------------------------------------
+
+from multiprocessing import Pool
+from os import remove
+from os.path import join, dirname, realpath, splitext
+from numpy import zeros, append, cumsum, frombuffer
+from helpers.utils import info, critical, warning, load_config, choose, get_elapsed_time, ROOT, LazyModule
+from src.TreeWriter import ArrayBranches
+from src.TreeWriterLjubljana import TreeWriterLjubljana
+from src.hdf5_writer import HitDtype, ClusterDtype, CountDtype, cluster_hits
+from time import time
+
+h5py = LazyModule('h5py')
+
+
+class Converter:
+    """ Converts a run from ROOT to hdf5 or vice versa depending on the file extension. The data is read and written in batches of [batch_size] events as whole columns
+        and every ROC plane is converted in its own process. The numbers of events and hits are compared after the conversion. """
+
+    def __init__(self, filename, out=None, batch_size=100000, n_proc=None, use_vcal=False, config_name='ljutel'):
+
+        self.Dir = dirname(dirname(realpath(__file__)))
+        self.Config = load_config(join(self.Dir, 'config', config_name))
+        self.TreeName = self.Config.get('TREE', 'name')
+        self.PlaneOffset = self.Config.getint('TREE', 'plane number')
+
+        self.FileName = filename
+        self.ToROOT = splitext(filename)[1] in ['.hdf5', '.h5']
+        self.OutName = choose(out, splitext(filename)[0] + ('.root' if self.ToROOT else '.hdf5'))
+        self.BatchSize = batch_size
+        self.NProc = n_proc
+        self.UseVcal = use_vcal
+
+    def run(self):
+        t = time()
+        info(f'converting {self.FileName} to {self.OutName} ...')
+        n_in = self.hdf5_to_root() if self.ToROOT else self.root_to_hdf5()
+        n_out = get_hdf5_counts(self.OutName) if not self.ToROOT else get_root_counts(self.OutName, self.TreeName)
+        self.verify(n_in, n_out)
+        info(f'converted {max(n for n, _ in n_in)} events of {len(n_in)} planes in {get_elapsed_time(t)}')
+
+    @staticmethod
+    def verify(n_in, n_out):
+        """ compares the number of events and hits of every plane in the input and output file. """
+        if n_in != n_out:
+            critical(f'the conversion lost data! (events, hits) per plane: in {n_in}, out {n_out}')
+        if len(set(n for n, _ in n_out)) > 1:
+            warning(f'the planes have different numbers of events: {[n for n, _ in n_out]}')
+
+    def hdf5_to_root(self):
+        with h5py.File(self.FileName, 'r') as f:
+            rocs = sorted(int(key.strip('ROC')) for key in f if key.startswith('ROC'))
+        tmp_names = [f'{self.OutName}.{roc}.tmp' for roc in rocs]
+        with Pool(choose(self.NProc, len(rocs))) as pool:
+            n = pool.map(hdf5_plane_to_root, [(self.FileName, name, roc, self.PlaneOffset + roc, self.TreeName, self.BatchSize, self.UseVcal) for roc, name in zip(rocs, tmp_names)])
+        merge_root_planes(self.OutName, tmp_names, [self.PlaneOffset + roc for roc in rocs], self.TreeName)
+        warning(f'the hdf5 file has no time stamps, {self.OutName} has no Event tree')
+        return n
+
+    def root_to_hdf5(self):
+        f = ROOT.TFile(self.FileName)
+        planes = sorted(int(key.GetName().strip('Plane')) for key in f.GetListOfKeys() if key.GetName().startswith('Plane'))
+        f.Close()
+        tmp_names = [f'{self.OutName}.{plane}.tmp' for plane in planes]
+        with Pool(choose(self.NProc, len(planes))) as pool:
+            n = pool.map(root_plane_to_hdf5, [(self.FileName, name, plane, self.TreeName, self.BatchSize) for plane, name in zip(planes, tmp_names)])
+        merge_hdf5_planes(self.OutName, tmp_names, [plane - self.PlaneOffset for plane in planes])
+        return n
+
+
+def hdf5_plane_to_root(args):
+    """ writes the hits of a single ROC of the hdf5 file [filename] to a hit tree in [out]. :returns: number of events and hits """
+    filename, out, roc, plane, tree_name, batch_size, use_vcal = args
+    f = ROOT.TFile(out, 'RECREATE')
+    f.mkdir(f'Plane{plane}').cd()
+    tree = ROOT.TTree(tree_name, tree_name)
+    branches = ArrayBranches(tree, 'NHits', TreeWriterLjubljana.init_hit_dtype())
+    timing, trigger_count = zeros(1, 'f8'), zeros(1, 'i4')
+    tree.Branch('Timing', timing, 'Timing[1]/D')
+    tree.Branch('TriggerCount', trigger_count, 'TriggerCount[1]/I')
+    with h5py.File(filename, 'r') as h5:
+        grp = h5[f'ROC{roc}']
+        n_hits = grp['n_hits'][()]
+        phases = h5['trigger_phase'][()] if 'trigger_phase' in h5 and h5['trigger_phase'].size == n_hits.size else zeros(n_hits.size, 'u1')
+        offsets = append(0, cumsum(n_hits, dtype='i8'))
+        for i0 in range(0, n_hits.size, batch_size):
+            i1 = min(i0 + batch_size, n_hits.size)
+            hits = grp['hits'][offsets[i0]:offsets[i1]]  # one bulk read per batch
+            data = zeros(hits.size, TreeWriterLjubljana.init_hit_dtype())
+            data['PixX'], data['PixY'], data['Value'] = hits['column'], hits['row'], hits['vcal' if use_vcal else 'adc']
+            o = offsets[i0:i1 + 1] - offsets[i0]
+            for i in range(i1 - i0):
+                branches.fill(data[o[i]:o[i + 1]])
+                timing[0] = phases[i0 + i]
+                tree.Fill()
+    f.Write()
+    f.Close()
+    return n_hits.size, int(offsets[-1])
+
+
+def merge_root_planes(filename, tmp_names, planes, tree_name):
+    """ copies the baskets of the plane trees into a single file without recompression. The hdf5 files do not store the time stamps, so there is no event tree. """
+    f = ROOT.TFile(filename, 'RECREATE')
+    for plane, name in zip(planes, tmp_names):
+        tmp = ROOT.TFile(name)
+        f.mkdir(f'Plane{plane}').cd()
+        tmp.Get(f'Plane{plane}/{tree_name}').CloneTree(-1, 'fast')
+        tmp.Close()
+        remove(name)
+    f.Write()
+    f.Close()
+
+
+def draw_columns(tree, expressions, first, n, n_values):
+    """ reads [n_values] values of each expression for the entries [first, first + n) with a single TTree::Draw. """
+    tree.SetEstimate(n_values + 1)
+    n_rows = tree.Draw(':'.join(expressions), '', 'goff', n, first)
+    if n_rows != n_values:
+        critical(f'expected {n_values} values of {expressions} in the entries {first}-{first + n} of {tree.GetName()}, but read {n_rows}')
+    return [frombuffer(tree.GetVal(i), count=n_values).copy() if n_values else zeros(0) for i in range(len(expressions))]
+
+
+def root_plane_to_hdf5(args):
+    """ writes the hit tree of a single plane of the ROOT file [filename] to a ROC group in [out] and clusters the hits. :returns: number of events and hits """
+    filename, out, plane, tree_name, batch_size = args
+    f = ROOT.TFile(filename)
+    tree = f.Get(f'Plane{plane}/{tree_name}')
+    n_events, n_total = tree.GetEntries(), 0
+    with h5py.File(out, 'w') as h5:
+        datasets = {key: h5.create_dataset(key, (0,), dt, maxshape=(None,), chunks=True) for key, dt in [('hits', HitDtype), ('n_hits', CountDtype), ('clusters', ClusterDtype),
+                                                                                                         ('n_clusters', CountDtype), ('trigger_phase', 'u1')]}
+        for i0 in range(0, n_events, batch_size):
+            n = min(batch_size, n_events - i0)
+            n_hits, phases = draw_columns(tree, ['NHits', 'Timing[0]'], i0, n, n)
+            col, row, value = draw_columns(tree, ['PixX', 'PixY', 'Value'], i0, n, int(n_hits.sum()))
+            hits = zeros(col.size, HitDtype)
+            hits['column'], hits['row'], hits['adc'], hits['vcal'] = col, row, value, value
+            n_hits = n_hits.astype(CountDtype)
+            n_total += int(n_hits.sum())  # hits in the source tree, compared to the written datasets in verify()
+            clusters, n_clusters = cluster_hits(hits, n_hits)
+            for key, data in [('hits', hits), ('n_hits', n_hits), ('clusters', clusters), ('n_clusters', n_clusters), ('trigger_phase', phases)]:
+                append_dataset(datasets[key], data)
+    f.Close()
+    return n_events, n_total
+
+
+def append_dataset(ds, data):
+    if data.size:
+        ds.resize((ds.shape[0] + data.size,))
+        ds[-data.size:] = data
+
+
+def merge_hdf5_planes(filename, tmp_names, rocs):
+    with h5py.File(filename, 'w') as f:
+        for i, (roc, name) in enumerate(zip(rocs, tmp_names)):
+            with h5py.File(name, 'r') as tmp:
+                if not i:
+                    tmp.copy(tmp['trigger_phase'], f, 'trigger_phase')
+                grp = f.create_group(f'ROC{roc}')
+                for key in ['hits', 'n_hits', 'clusters', 'n_clusters']:
+                    tmp.copy(tmp[key], grp, key)
+            remove(name)
+
+
+def get_hdf5_counts(filename):
+    """ :returns: number of events and hits of every ROC """
+    with h5py.File(filename, 'r') as f:
+        return [(f[key]['n_hits'].size, f[key]['hits'].size) for key in sorted([key for key in f if key.startswith('ROC')], key=lambda k: int(k.strip('ROC')))]
+
+
+def get_root_counts(filename, tree_name, batch_size=1000000):
+    """ :returns: number of entries and hits of every plane """
+    f = ROOT.TFile(filename)
+    counts = []
+    for key in sorted([key.GetName() for key in f.GetListOfKeys() if key.GetName().startswith('Plane')], key=lambda k: int(k.strip('Plane'))):
+        tree = f.Get(f'{key}/{tree_name}')
+        n = tree.GetEntries()
+        counts.append((n, int(sum(draw_columns(tree, ['NHits'], i, min(batch_size, n - i), min(batch_size, n - i))[0].sum() for i in range(0, n, batch_size)))))
+    f.Close()
+    return counts
+
+
+if __name__ == '__main__':
+
+    from argparse import ArgumentParser
+    aparser = ArgumentParser(description='converts runs between the ROOT (.root) and hdf5 (.hdf5) format')
+    aparser.add_argument('filename', help='file to convert, the direction is chosen by the extension')
+    aparser.add_argument('-o', '--out', nargs='?', default=None, help='name of the output file [default = input file with the other extension]')
+    aparser.add_argument('-b', '--batch_size', type=int, default=100000, help='number of events read and written at once [default = 100000]')
+    aparser.add_argument('-j', '--processes', type=int, default=None, help='number of processes [default = one per plane]')
+    aparser.add_argument('--vcal', action='store_true', help='store the vcal instead of the adc values in the ROOT trees')
+    aparser.add_argument('-c', '--config', nargs='?', default='ljutel', help='name of the ini config file of the trees (without .ini) [default = ljutel]')
+    pargs = aparser.parse_args()
+
+    z = Converter(pargs.filename, pargs.out, pargs.batch_size, pargs.processes, pargs.vcal, pargs.config)
+    z.run()
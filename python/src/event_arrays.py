@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# --------------------------------------------------------
+#       Columnar representation of a list of pXar events
+# created on October 19th 2026 by agent (agent@local)
+# --------------------------------------------------------
+
+from numpy import array, zeros, cumsum, append, concatenate, dtype
+
+
+HitDtype = dtype([('roc', 'u2'), ('column', 'u2'), ('row', 'u2'), ('value', 'i2'), ('invalid_address', '?'), ('invalid_pulse_height', '?'), ('buffer_corruption', '?')])
+HeaderDtype = dtype([('header', 'u4'), ('trailer', 'u4'), ('pkam', 'u2'), ('cal_trigger', 'u2'), ('token_pass', 'u2'), ('reset_tbm', 'u2'), ('reset_roc', 'u2'), ('auto_reset', 'u2'),
+                     ('trigger_count', 'u2'), ('trigger_phase', 'u2'), ('stack_count', 'u2')])
+RocDtype = dtype([('roc_readback', '?'), ('incomplete_data', '?'), ('missing_roc_headers', '?')])
+FlagDtype = dtype([('value', '?')])
+
+Dtypes = {'hits': HitDtype, 'headers': HeaderDtype, 'rocs': RocDtype, 'eventid_mismatch': FlagDtype, 'no_data': FlagDtype}
+
+
+class EventArrays:
+    """ Holds events as flat per-hit, per-header and per-ROC columns together with the number of entries of each group per event. """
+
+    Groups = list(Dtypes)
+
+    def __init__(self, counts, data):
+
+        self.NEvents = next(iter(counts.values())).size if counts else 0
+        self.Counts = {grp: counts.get(grp, zeros(self.NEvents, 'u2')) for grp in self.Groups}
+        self.Data = {grp: data.get(grp, zeros(0, Dtypes[grp])) for grp in self.Groups}
+        self.Offsets = {grp: append(0, cumsum(n, dtype='i8')) for grp, n in self.Counts.items()}
+
+    def __len__(self):
+        return self.NEvents
+
+    def __getitem__(self, item):
+        """ :returns: a new EventArrays object with the events in the slice [item]. """
+        start, stop, _ = item.indices(self.NEvents)
+        return EventArrays({grp: n[start:stop] for grp, n in self.Counts.items()}, {grp: self.Data[grp][self.Offsets[grp][start]:self.Offsets[grp][stop]] for grp in self.Groups})
+
+    @property
+    def n_hits(self):
+        return self.Counts['hits']
+
+    @property
+    def hits(self):
+        return self.Data['hits']
+
+    def get(self, group, i):
+        """ :returns: the entries of [group] for event [i]. """
+        return self.Data[group][self.Offsets[group][i]:self.Offsets[group][i + 1]]
+
+    def batches(self, size=10000):
+        for i in range(0, self.NEvents, size):
+            yield self[i:i + size]
+
+    @classmethod
+    def from_hits(cls, n_hits, hits):
+        return cls({'hits': array(n_hits, 'u2')}, {'hits': array(hits, HitDtype)})
+
+    @classmethod
+    def from_pixels(cls, events):
+        """ Converts only the hits of a list of PxEvents. """
+        n_hits, hits = zeros(len(events), 'u2'), []
+        for i, ev in enumerate(events):
+            pixels = ev.pixels
+            n_hits[i] = len(pixels)
+            hits += [(px.roc, px.column, px.row, px.value, px.invalid_address, px.invalid_pulse_height, px.buffer_corruption) for px in pixels]
+        return cls.from_hits(n_hits, hits)
+
+    @classmethod
+    def from_events(cls, events):
+        """ Converts a list of PxEvents with a single pass over the events. """
+        counts = zeros((len(Dtypes), len(events)), 'u2')
+        data = [[] for _ in Dtypes]
+        for i, ev in enumerate(events):
+            lst = [[(px.roc, px.column, px.row, px.value, px.invalid_address, px.invalid_pulse_height, px.buffer_corruption) for px in ev.pixels],
+                   list(zip(ev.header, ev.trailer, ev.havePkamReset, ev.haveCalTrigger, ev.haveTokenPass, ev.haveResetTBM, ev.haveResetROC, ev.haveAutoReset,
+                            ev.triggerCounts, ev.triggerPhases, ev.stackCounts)),
+                   list(zip(ev.roc_readback, ev.incomplete_data, ev.missing_roc_headers)),
+                   [(v,) for v in ev.eventid_mismatch],
+                   [(v,) for v in ev.no_data]]
+            for j, values in enumerate(lst):
+                counts[j][i] = len(values)
+                data[j] += values
+        return cls(dict(zip(Dtypes, counts)), {grp: array(values, Dtypes[grp]) for grp, values in zip(Dtypes, data)})
+
+    @classmethod
+    def concatenate(cls, lst):
+        lst = [arr for arr in lst if len(arr)]
+        if not lst:
+            return cls({}, {})
+        return cls({grp: concatenate([arr.Counts[grp] for arr in lst]) for grp in cls.Groups}, {grp: concatenate([arr.Data[grp] for arr in lst]) for grp in cls.Groups})
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# --------------------------------------------------------
+#       Append-only binary files of raw DTB words or decoded hits
+# created on October 19th 2026 by agent (agent@local)
+# --------------------------------------------------------
+
+from numpy import dtype, array, zeros, concatenate, memmap, ndarray, searchsorted, append, cumsum
+from time import time
+from helpers.utils import info, critical
+from src.event_arrays import EventArrays, HitDtype
+
+
+HITS, RAW = range(2)
+ItemDtypes = {HITS: HitDtype, RAW: dtype('u2')}
+
+Magic = b'PXRC'
+FileHeader = dtype([('magic', 'S4'), ('version', 'u2'), ('kind', 'u2'), ('index_interval', 'u4'), ('time', 'f8'), ('reserved', 'u8')])
+BlockHeader = dtype([('magic', 'S4'), ('n_events', 'u4'), ('first_event', 'u8'), ('n_items', 'u8')])
+IndexDtype = dtype([('first_event', 'u8'), ('n_events', 'u8'), ('offset', 'u8')])
+Trailer = dtype([('n_blocks', 'u8'), ('n_events', 'u8'), ('magic', 'S4')])
+
+# file layout: FileHeader | Block ... Block | Index | Trailer
+# block layout: BlockHeader | number of items per event (u4) | items (hits or raw words)
+# Every block contains [index_interval] events (except the last one) and the index holds the position of every block.
+# If the file was not closed properly, the index is rebuilt from the block headers.
+
+
+class EventRecorder:
+    """ Appends events to a binary file. The events are buffered in memory and every [index_interval] events get written as one block. """
+
+    def __init__(self, filename, kind=HITS, index_interval=10000):
+
+        self.FileName = filename
+        self.Kind = kind
+        self.Interval = index_interval
+        self.File = open(filename, 'wb')
+        self.File.write(array([(Magic, 1, kind, index_interval, time(), 0)], FileHeader).tobytes())
+
+        self.Counts, self.Items = [], []
+        self.NPending = 0
+        self.NEvents = 0
+        self.Index = []
+
+    def __del__(self):
+        self.close()
+
+    def write(self, events):
+        """ adds a batch of events: list of PxEvents or EventArrays for HITS and a list of raw events (lists of words) for RAW. """
+        if self.Kind == HITS:
+            arrays = events if isinstance(events, EventArrays) else EventArrays.from_pixels(events)
+            self.Counts.append(arrays.n_hits.astype('u4'))
+            self.Items.append(arrays.hits)
+        else:
+            self.Counts.append(array([len(words) for words in events], 'u4'))
+            self.Items.append(concatenate([array(words, 'u2') for words in events]) if len(events) else zeros(0, 'u2'))
+        self.NPending += self.Counts[-1].size
+        if self.NPending >= self.Interval:
+            self.write_blocks(self.NPending // self.Interval * self.Interval)
+
+    def write_blocks(self, n):
+        """ writes the first [n] buffered events in blocks of [Interval] events. """
+        counts, items = concatenate(self.Counts), concatenate(self.Items)
+        offsets = append(0, cumsum(counts, dtype='i8'))
+        for i in range(0, n, self.Interval):
+            j = min(i + self.Interval, n)
+            self.Index.append((self.NEvents, j - i, self.File.tell()))
+            self.File.write(array([(Magic, j - i, self.NEvents, offsets[j] - offsets[i])], BlockHeader).tobytes())
+            self.File.write(counts[i:j].tobytes())
+            self.File.write(items[offsets[i]:offsets[j]].astype(ItemDtypes[self.Kind]).tobytes())
+            self.NEvents += j - i
+        self.Counts, self.Items = [counts[n:]], [items[offsets[n]:]]
+        self.NPending -= n
+
+    def flush(self):
+        """ writes all buffered events (as a shorter block) and flushes the file. """
+        if self.NPending:
+            self.write_blocks(self.NPending)
+        self.File.flush()
+
+    def close(self):
+        if self.File is not None:
+            self.flush()
+            self.File.write(array(self.Index, IndexDtype).tobytes())
+            self.File.write(array([(len(self.Index), self.NEvents, Magic)], Trailer).tobytes())
+            self.File.close()
+            self.File = None
+            info(f'saved {self.NEvents} events in {self.FileName}')
+
+
+class EventReader:
+    """ Memory maps a file of the EventRecorder and reads it in batches of events. """
+
+    def __init__(self, filename):
+
+        self.FileName = filename
+        self.Data = memmap(filename, 'u1', 'r')
+        self.Header = self.Data[:FileHeader.itemsize].view(FileHeader)[0]
+        if self.Header['magic'] != Magic:
+            critical(f'{filename} is not an event recorder file')
+        self.Kind = int(self.Header['kind'])
+        self.Index = self.load_index()
+        self.NEvents = int(self.Index['n_events'].sum())
+        self.Starts = append(self.Index['first_event'], self.NEvents)
+
+    def __len__(self):
+        return self.NEvents
+
+    def __getitem__(self, item):
+        """ :returns: the events in the slice [item] """
+        start, stop, _ = item.indices(self.NEvents)
+        if start >= stop:
+            return self.make_batch(zeros(0, 'u4'), zeros(0, ItemDtypes[self.Kind]))
+        i0, i1 = searchsorted(self.Starts, start, 'right') - 1, searchsorted(self.Starts, stop, 'left')
+        counts, items = [concatenate(lst) for lst in zip(*[self.read_block(i) for i in range(i0, i1)])]
+        first = int(self.Starts[i0])
+        offsets = append(0, cumsum(counts, dtype='i8'))
+        return self.make_batch(counts[start - first:stop - first], items[offsets[start - first]:offsets[stop - first]])
+
+    def load_index(self):
+        trailer = self.Data[-Trailer.itemsize:].view(Trailer)[0] if self.Data.size >= FileHeader.itemsize + Trailer.itemsize else None
+        if trailer is not None and trailer['magic'] == Magic:
+            n = int(trailer['n_blocks'])
+            return self.Data[-Trailer.itemsize - n * IndexDtype.itemsize:-Trailer.itemsize].view(IndexDtype)
+        return self.scan_blocks()
+
+    def scan_blocks(self):
+        """ rebuilds the index from the block headers, the last incomplete block is dropped. """
+        index, pos, item_size = [], FileHeader.itemsize, ItemDtypes[self.Kind].itemsize
+        while pos + BlockHeader.itemsize <= self.Data.size:
+            head = self.Data[pos:pos + BlockHeader.itemsize].view(BlockHeader)[0]
+            end = pos + BlockHeader.itemsize + 4 * int(head['n_events']) + item_size * int(head['n_items'])
+            if head['magic'] != Magic or end > self.Data.size:
+                break
+            index.append((head['first_event'], head['n_events'], pos))
+            pos = end
+        info(f'rebuilt the index of {self.FileName} ({len(index)} blocks)')
+        return array(index, IndexDtype)
+
+    def read_block(self, i):
+        """ :returns: the number of items per event and the items of block [i] as views into the file """
+        pos = int(self.Index[i]['offset'])
+        head = self.Data[pos:pos + BlockHeader.itemsize].view(BlockHeader)[0]
+        n, m = int(head['n_events']), int(head['n_items'])
+        counts = ndarray(n, 'u4', self.Data, pos + BlockHeader.itemsize)
+        return counts, ndarray(m, ItemDtypes[self.Kind], self.Data, pos + BlockHeader.itemsize + 4 * n)
+
+    def make_batch(self, counts, items):
+        """ :returns: EventArrays for HITS and a tuple (number of words per event, words) for RAW """
+        return EventArrays({'hits': counts.astype('u2')}, {'hits': items}) if self.Kind == HITS else (counts, items)
+
+    def batches(self, size=None):
+        """ yields the blocks of the file or batches of [size] events. """
+        if size is None:
+            for i in range(self.Index.size):
+                yield self.make_batch(*self.read_block(i))
+        else:
+            for i in range(0, self.NEvents, size):
+                yield self[i:i + size]
+
+
+if __name__ == '__main__':
+
+    from argparse import ArgumentParser
+    aparser = ArgumentParser()
+    aparser.add_argument('filename', help='file of the event recorder')
+    pargs = aparser.parse_args()
+
+    z = EventReader(pargs.filename)
+    info(f'{z.NEvents} {["hit", "raw"][z.Kind]} events in {z.Index.size} blocks')
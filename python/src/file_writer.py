@@ -7,15 +7,16 @@
 from helpers.utils import *
 from os.path import join, dirname, realpath
 from glob import glob
-from ROOT import TF1
 from numpy import arange, split, genfromtxt, array
+from helpers.snapshot import Snapshot
 
 
 class FileWriter:
 
-    def __init__(self, config_name, file_type):
+    def __init__(self, config_name, file_type, conf_dir='.'):
 
         self.Dir = dirname(dirname(realpath(__file__)))
+        self.ConfDir = conf_dir  # pxar configuration directory with the calibration files
         self.Config = load_config(join(self.Dir, 'config', config_name))
         self.DataDir = self.Config.get('MAIN', 'data directory')
         self.RunNumber = self.load_run_number()
@@ -29,7 +30,7 @@ class FileWriter:
         self.NEvents = 0
 
         # Pulse Height Calibrations
-        self.Fit = TF1('ErFit', '[3] * (TMath::Erf((x - [0]) / [1]) + [2])', -500, 255 * 7)
+        self.Fit = ROOT.TF1('ErFit', '[3] * (TMath::Erf((x - [0]) / [1]) + [2])', -500, 255 * 7)
         self.Parameters = self.load_calibration_fitpars()
 
         self.PBar = PBar()
@@ -42,13 +43,18 @@ class FileWriter:
         return 0 if not f_names else max(int(remove_letters(f_name.split('.')[0])) for f_name in f_names) + 1
 
     def load_calibration_fitpars(self):
-        split_at = arange(self.NRows, self.NCols * self.NRows, self.NRows)  # split at every new column (after n_rows)
-        lst = array([split(genfromtxt(filename, skip_header=3, usecols=arange(4)), split_at) for filename in glob('phCalibrationFitErr{}*'.format(self.Trim))])
+        """ loads the fit parameters from the snapshot of the config directory, which is shared with PxarStartUp, or from the calibration files if they changed """
+        filenames = glob(join(self.ConfDir, 'phCalibrationFitErr{}*'.format(self.Trim)))
+        lst = Snapshot(self.ConfDir).load(f'calibration{self.Trim}', lambda: (self.read_calibration_fitpars(filenames), filenames), key=filenames) if filenames else array([])
         if not lst.size or not lst[0].size:
             warning('Did not find calibration file for trim {}! '.format(self.Trim))
             return
         return lst
 
+    def read_calibration_fitpars(self, filenames):
+        split_at = arange(self.NRows, self.NCols * self.NRows, self.NRows)  # split at every new column (after n_rows)
+        return array([split(genfromtxt(filename, skip_header=3, usecols=arange(4)), split_at) for filename in filenames])
+
     def get_vcal(self, roc, col, row, adc):
         if self.Parameters is None:
             return adc
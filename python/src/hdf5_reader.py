@@ -4,12 +4,12 @@
 # created on November 13th 2019 by M. Reichmann (remichae@phys.ethz.ch)
 # --------------------------------------------------------
 
-import h5py
 from src.file_reader import *
 from numpy import full, arange, where
-from ROOT import TH2I, TH1F, TProfile2D, TProfile
 from json import loads
 
+h5py = LazyModule('h5py')
+
 
 class HDF5Reader(FileReader):
 
@@ -49,7 +49,7 @@ class HDF5Reader(FileReader):
         return self.Data[key]['row'] if not use_fid or not self.Fid else self.Data[key]['row'][self.load_fid_cut(cluster)]
 
     def draw_hitmap(self, cluster=False, vcal=None, fid=False):
-        h = TH2I('hhm{}'.format(cluster), '{} Map'.format('Cluster' if cluster else 'Hit'), *self.Bins)
+        h = ROOT.TH2I('hhm{}'.format(cluster), '{} Map'.format('Cluster' if cluster else 'Hit'), *self.Bins)
         x = self.get_x(fid, cluster) if vcal is None else self.get_x(fid, cluster)[where(self.get_vcal_values(fid) < vcal)]
         y = self.get_y(fid, cluster) if vcal is None else self.get_y(fid, cluster)[where(self.get_vcal_values(fid) < vcal)]
         h.FillN(x.size, x.astype('d'), y.astype('d'), full(x.size, 1, 'd'))
@@ -61,7 +61,7 @@ class HDF5Reader(FileReader):
         self.draw_hitmap(cluster=True, vcal=vcal, fid=fid)
 
     def draw_signal_map(self):
-        h = TProfile2D('psm', 'Signal Map', *self.Bins)
+        h = ROOT.TProfile2D('psm', 'Signal Map', *self.Bins)
         for x, y, v in zip(self.Data['clusters']['column'], self.Data['clusters']['row'], self.Data['clusters']['vcal']):
             h.Fill(x, y, v)
         format_histo(h, x_tit='column', y_tit='row', y_off=1.2, z_tit='VCAL', z_off=1.6, stats=0)
@@ -77,7 +77,7 @@ class HDF5Reader(FileReader):
         return [bins.size - 1, bins]
 
     def draw_vcal(self, bin_width=5, use_fid=True):
-        h = TH1F('hv', 'VCAL Distribution', *self.get_vcal_bins(bin_width))
+        h = ROOT.TH1F('hv', 'VCAL Distribution', *self.get_vcal_bins(bin_width))
         vcals = self.get_vcal_values(use_fid)
         h.FillN(vcals.size, vcals.astype('d'), full(vcals.size, 1, 'd'))
         v_max = h.GetMaximum()
@@ -88,14 +88,14 @@ class HDF5Reader(FileReader):
 
     def draw_vcal_time(self, bin_width=1000):
         vcals = self.get_vcal_values()
-        h = TProfile('hvt', 'VCAL vs. Time', *self.get_event_bins(bin_width))
+        h = ROOT.TProfile('hvt', 'VCAL vs. Time', *self.get_event_bins(bin_width))
         h.FillN(vcals.size, arange(vcals.size, dtype='d'), vcals.astype('d'), full(vcals.size, 1, 'd'))
         format_histo(h, x_tit='Cluster Number', y_tit='VCAL', y_off=1.5)
         self.Plotter.format_statbox(entries=1, x=.9)
         self.Plotter.draw_histo(h, lm=.12, rm=.08)
 
     def draw_trigger_phase(self):
-        h = TH1F('htp', 'Trigger Phase Distribution', 10, 0, 10)
+        h = ROOT.TH1F('htp', 'Trigger Phase Distribution', 10, 0, 10)
         h.FillN(self.NEvents, array(self.File['trigger_phase'], 'd'), full(self.NEvents, 1, 'd'))
         format_histo(h, x_tit='Trigger Phase', y_tit='Number of Entries', y_off=1.2, fill_color=self.Plotter.FillColor)
         self.Plotter.format_statbox(entries=True)
@@ -4,15 +4,20 @@
 # created on November 12th 2019 by M. Reichmann (remichae@phys.ethz.ch)
 # --------------------------------------------------------
 
-import h5py
-from numpy import cumsum, mean, sum, empty
+from numpy import empty, repeat, arange, argsort, searchsorted, concatenate, minimum, unique, bincount
 from src.file_writer import *
 
+h5py = LazyModule('h5py')
+
+HitDtype = [('column', 'u2'), ('row', 'u2'), ('adc', 'i2'), ('vcal', 'f4')]
+ClusterDtype = [('column', 'f2'), ('row', 'f2'), ('vcal', 'f4')]
+CountDtype = 'u2'  # a plane has up to 4160 hits per event
+
 
 class HDF5Writer(FileWriter):
 
-    def __init__(self, config_name):
-        FileWriter.__init__(self, config_name, 'hdf5')
+    def __init__(self, config_name, conf_dir='.'):
+        FileWriter.__init__(self, config_name, 'hdf5', conf_dir)
 
         # Data
         self.NHits = []
@@ -31,6 +36,7 @@ class HDF5Writer(FileWriter):
         self.make_arrays()
         self.clusterise()
 
+    @traced('write')
     def save_file(self):
         if len(self.NHits):
             ensure_dir(self.DataDir)
@@ -44,6 +50,7 @@ class HDF5Writer(FileWriter):
                     grp.create_dataset('clusters', data=self.Clusters[roc])
                     grp.create_dataset('n_clusters', data=self.NClusters[roc])
 
+    @traced('calibrate')
     def add_data(self, data):
         info('adding data ... ')
         self.PBar.start(len(data))
@@ -63,35 +70,49 @@ class HDF5Writer(FileWriter):
 
     def make_arrays(self):
         for roc in range(self.NPlanes):
-            self.Hits[roc] = array(self.Hits[roc], dtype=[('column', 'u2'), ('row', 'u2'), ('adc', 'i2'), ('vcal', 'f4')])
-        self.NHits = array(self.NHits, 'u1').T
+            self.Hits[roc] = array(self.Hits[roc], dtype=HitDtype)
+        self.NHits = array(self.NHits, CountDtype).T
         self.NEvents = self.NHits[0].size
 
-    # TODO revise this since algorithm is faulty!
+    @traced('clusterise')
     def clusterise(self):
-        self.PBar.start(self.NEvents * self.NPlanes)
         info('clusterise ...')
         for roc in range(self.NPlanes):
-            for i, event in enumerate(split(self.Hits[roc], cumsum(self.NHits[roc])[:-1])):
-                cluster_hits = [[event[0]]]
-                for hit in event[1:]:
-                    belongs_to_existing_cluster = False
-                    for clusters in cluster_hits:
-                        # check if any hit is close to a cluster hit
-                        if any((abs(array(clusters)['column'].astype('i2') - hit['column']) <= 1) & (abs(array(clusters)['row'].astype('i2') - hit['row']) <= 1)):
-                            clusters.append(hit)
-                            belongs_to_existing_cluster = True
-                            break
-                    # make new cluster
-                    if not belongs_to_existing_cluster:
-                        cluster_hits.append([hit])
-                for cluster in cluster_hits:
-                    cluster = array(cluster)
-                    self.Clusters[roc].append((mean(cluster['column']), mean(cluster['row']), sum(cluster['vcal'])))
-                self.NClusters[roc].append(len(cluster_hits))
-                self.PBar.update(i + self.NEvents * roc)
-            self.Clusters[roc] = array(self.Clusters[roc], dtype=[('column', 'f2'), ('row', 'f2'), ('vcal', 'f4')])
-            self.NClusters[roc] = array(self.NClusters[roc], 'u1')
+            self.Clusters[roc], self.NClusters[roc] = cluster_hits(self.Hits[roc], self.NHits[roc])
+
+
+def cluster_hits(hits, n_hits):
+    """ groups the hits of every event into clusters of adjacent pixels (including diagonals and duplicates) by connected component labelling of all events at once.
+        :returns: clusters in the order of their first hit and the number of clusters per event """
+    n = hits.size
+    event = repeat(arange(n_hits.size), n_hits)
+    col, row = hits['column'].astype('i8'), hits['row'].astype('i8')
+    keys = (event << 16) | (col << 8) | row
+    order = argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    pairs = []
+    for dc, dr in [(0, 0), (0, 1), (1, -1), (1, 0), (1, 1)]:  # half of the neighbourhood, the pairs are symmetric
+        valid = (row + dr >= 0) & (row + dr < 256) & (col + dc < 256)
+        i = arange(n)[valid]
+        j = searchsorted(sorted_keys, ((event[i] << 16) | ((col[i] + dc) << 8) | (row[i] + dr)))
+        found = (j < n) & (sorted_keys[minimum(j, n - 1)] == keys[i] + (dc << 8) + dr)
+        pairs.append((i[found], order[j[found]]))
+    a, b = (concatenate(v) for v in zip(*pairs)) if n else (arange(0), arange(0))
+    labels = arange(n)
+    while True:  # every hit gets the smallest index of its cluster
+        new, m = labels.copy(), minimum(labels[a], labels[b])
+        minimum.at(new, a, m)
+        minimum.at(new, b, m)
+        new = new[new]
+        if (new == labels).all():
+            break
+        labels = new
+    first, inv = unique(labels, return_inverse=True)
+    size = bincount(inv, minlength=first.size)
+    clusters = empty(first.size, ClusterDtype)
+    clusters['column'], clusters['row'] = bincount(inv, col, first.size) / size, bincount(inv, row, first.size) / size
+    clusters['vcal'] = bincount(inv, hits['vcal'], first.size)
+    return clusters, bincount(event[first], minlength=n_hits.size).astype(CountDtype)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,574 @@
+#!/usr/bin/env python
+# --------------------------------------------------------
+#       Pure python stand-in for PyPxarCore with a deterministic hit generator
+# created on October 19th 2026 by agent (agent@local)
+# --------------------------------------------------------
+
+from numpy import zeros, ones, arange, repeat, clip, sqrt, concatenate, where, unique, cumsum, bincount, append
+from numpy.random import default_rng
+from src.event_arrays import EventArrays, HitDtype, HeaderDtype
+from src.raw_stream import decode_stream, split_events, make_events, Pixel
+from helpers.utils import info, erf
+
+NCols, NRows = 52, 80
+
+RocDACs = [b'vdig', b'vana', b'vsh', b'vcomp', b'vwllpr', b'vwllsh', b'vhlddel', b'vtrim', b'vthrcomp', b'vibias_bus', b'phoffset', b'vcomp_adc', b'phscale', b'vicolor',
+           b'vcal', b'caldel', b'ctrlreg', b'wbc', b'readback']
+DTBNames = [b'clk', b'ctr', b'sda', b'tin', b'level', b'triggerdelay', b'trimdelay', b'deser160phase', b'deser400rate', b'deser400phase0', b'deser400phase1',
+            b'deser400phase2', b'deser400phase3', b'triggerlatency', b'triggertimeout', b'tindelay', b'toutdelay', b'adctimeout', b'tout', b'rda']
+TBMNames = [b'base0', b'base2', b'base4', b'base8', b'basea', b'basec', b'basee', b'nrocs1', b'nrocs2']
+AnalogProbes = [b'tin', b'ctr', b'clk', b'sda', b'tout', b'off', b'sdata1', b'sdata2']
+DigitalProbes = [b'tin', b'ctr', b'clk', b'sda', b'tout', b'off', b'sdasend', b'pgtok', b'pgtrg', b'pgcal', b'pgresroc', b'pgrestbm', b'pgsync', b'clkp', b'clkg',
+                 b'daq0wr', b'crc', b'adcrunning', b'adcrun', b'adcpgate', b'adcstart', b'adcsgate', b'adcs', b'ds_gate', b'deser_frameerror', b'deser_codeerror']
+
+
+def encode_hits(hits, inverted=False):
+    """ inverse of [decode_hits]. :returns: the two 12 bit words of every hit """
+    col, value = hits['column'].astype('i8'), hits['value'].astype('i8')
+    r = 2 * (NRows - hits['row'].astype('i8')) + (col & 1)
+    r2, r1, r0 = [v ^ (7 if inverted else 0) for v in [r // 36, r % 36 // 6, r % 6]]
+    c = col // 2
+    raw = ((c // 6) << 21) + ((c % 6) << 18) + (r2 << 15) + (r1 << 12) + (r0 << 9) + (value & 0x0f) + ((value & 0xf0) << 1)
+    return (raw >> 12) & 0x0fff, raw & 0x0fff
+
+
+def encode_stream(arrays, n_rocs=1, tbm=False, inverted=False, corrupt=None):
+    """ inverse of [decode_stream]: creates the raw DTB stream of EventArrays with hits sorted by event and ROC (and exactly one header per event for tbm).
+        The ROC headers of the (event, ROC) segments in the mask [corrupt] get destroyed. """
+    n, hits = arrays.NEvents, arrays.hits
+    seg = repeat(arange(n), arrays.n_hits) * n_rocs + hits['roc']
+    seg_hits = bincount(seg, minlength=n * n_rocs)
+    seg_len, extra = 1 + 2 * seg_hits, 4 if tbm else 0
+    seg_pos = append(0, cumsum(seg_len))[:-1] + extra * (arange(n * n_rocs) // n_rocs) + extra // 2
+    event_len = seg_len.reshape(n, n_rocs).sum(1) + extra
+    event_pos = append(0, cumsum(event_len))[:-1]
+    words = zeros(int(event_len.sum()), 'u2')
+    words[seg_pos] = 0x07f8 | (0x4000 if tbm else 0)
+    pos = seg_pos[seg] + 1 + 2 * (arange(hits.size) - append(0, cumsum(seg_hits))[:-1][seg])
+    words[pos], words[pos + 1] = encode_hits(hits, inverted)
+    if tbm:
+        h, last = arrays.Data['headers'], event_pos + event_len - 1
+        trailer = ((h['token_pass'] == 0) << 15) + (h['reset_tbm'] > 0) * 0x4000 + (h['reset_roc'] > 0) * 0x2000 + (h['cal_trigger'] > 0) * 0x0200 + \
+                  (h['auto_reset'] > 0) * 0x0080 + (h['pkam'] > 0) * 0x0040 + (h['stack_count'] & 0x3f)
+        words[pos + 1] |= 0x2000
+        words[event_pos], words[event_pos + 1] = 0xa000 | (h['trigger_count'] & 0xff), 0x8000 | (h['trigger_phase'] & 0x3f)
+        words[last - 1], words[last] = 0xe000 | (trailer >> 8), 0xc000 | (trailer & 0xff)
+    else:
+        words[event_pos] |= 0x8000
+        words[event_pos + event_len - 1] |= 0x4000
+    if corrupt is not None:
+        words[seg_pos[corrupt.ravel()]] ^= 0x4000 if tbm else 0x0004
+    return words
+
+
+class PixelConfig:
+    """ python version of the PixelConfig of PyPxarCore """
+
+    def __init__(self, column=None, row=None, trim=None):
+        self.column, self.row, self.trim = column, row, trim
+        self.roc = 0
+        self.mask = False
+        self.enable = False
+
+    def __eq__(self, other):
+        return self.roc == other.roc and self.column == other.column and self.row == other.row
+
+    def __str__(self):
+        return 'Pixel ({}, {}) trim={}, mask={}'.format(self.column, self.row, self.trim, self.mask)
+
+
+class PyRegisterDictionary:
+
+    @staticmethod
+    def getAllROCNames():
+        return RocDACs
+
+    @staticmethod
+    def getAllDTBNames():
+        return DTBNames
+
+    @staticmethod
+    def getAllTBMNames():
+        return TBMNames
+
+
+class PyProbeDictionary:
+
+    @staticmethod
+    def getAllAnalogNames():
+        return AnalogProbes
+
+    @staticmethod
+    def getAllDigitalNames():
+        return DigitalProbes
+
+    def getAllNames(self):
+        return self.getAllDigitalNames()
+
+
+class Statistics:
+    """ python version of the Statistics of PyPxarCore. All counters which are not filled by the mock are 0. """
+
+    def __init__(self):
+        self.Counters = {key: 0 for key in ['info_words_read', 'empty_events', 'valid_events', 'valid_pixels', 'errors_roc_missing', 'errors_tbm_eventid_mismatch']}
+
+    def __getattr__(self, item):
+        if item.startswith('errors') or item.startswith('info') or item.endswith('events') or item.endswith('pixels'):
+            return self.__dict__['Counters'].get(item, 0)
+        raise AttributeError(item)
+
+    @property
+    def total_events(self):
+        return self.valid_events + self.empty_events
+
+    @property
+    def errors(self):
+        return sum(v for key, v in self.Counters.items() if key.startswith('errors'))
+
+    def add(self, arrays):
+        self.Counters['valid_events'] += int((arrays.n_hits > 0).sum())
+        self.Counters['empty_events'] += int((arrays.n_hits == 0).sum())
+        self.Counters['valid_pixels'] += int(arrays.hits.size)
+        self.Counters['errors_roc_missing'] += int(arrays.Data['rocs']['missing_roc_headers'].sum())
+        self.Counters['errors_tbm_eventid_mismatch'] += int(arrays.Data['eventid_mismatch']['value'].sum())
+
+    def __str__(self):
+        return '\n'.join('{}: {}'.format(key, value) for key, value in self.Counters.items())
+
+
+class MockPxarCore:
+    """ Implements the methods of PyPxarCore the python tools use without a DTB. All random numbers come from a single seeded generator, such that the same sequence of
+        calls always produces the same data. The events are encoded to a raw DTB stream and decoded again by src.raw_stream like real data.
+        :param hit_rate: mean number of clusters per event and ROC for external triggers
+        :param cluster_size: mean number of pixels per cluster
+        :param error_rate: fraction of events with a corrupt ROC header
+        :param latency: wbc at which the triggered hits are read out (None: for all wbc values)
+        :param clk_window: good clk delays (None: all) """
+
+    def __init__(self, usbId=b'*', logLevel=b'INFO', hit_rate=.5, cluster_size=2., error_rate=0., latency=None, clk_window=None, events_per_read=1000, seed=1):
+
+        self.Seed = seed
+        self.RNG = default_rng(seed)
+        self.HitRate, self.ClusterSize, self.ErrorRate = hit_rate, cluster_size, error_rate
+        self.Latency, self.ClkWindow = latency, clk_window
+        self.EventsPerRead = events_per_read
+        self.LogLevel = logLevel
+
+        self.Delays = {}
+        self.PowerSettings = {}
+        self.PGSetup = []
+        self.TBMDACs, self.DACs = [], []
+        self.ROCType, self.TBMType = b'psi46digv21respin', b'notbm'
+        self.NRocs = 0
+        self.Enabled = zeros((0, NCols, NRows), '?')
+        self.Masked = zeros((0, NCols, NRows), '?')
+        self.Trim = zeros((0, NCols, NRows), 'u1')
+        self.Threshold = zeros((0, NCols, NRows))
+        self.Gain = zeros((0, NCols, NRows))
+
+        self.IsRunning = False
+        self.TriggerSource = b'pg_dir'
+        self.TriggerCount = 0
+        self.Buffer = []
+        self.Events = []
+        self.RawEvents = []
+        self.Stats = Statistics()
+        self.HV = False
+
+    # -----------------------------------------
+    # region INIT
+    @staticmethod
+    def getVersion():
+        return 'mock'
+
+    def initTestboard(self, sig_delays, power_settings, pg_setup):
+        self.Delays = dict(sig_delays)
+        self.PowerSettings = dict(power_settings)
+        self.PGSetup = list(pg_setup)
+        return True
+
+    def initDUT(self, hubids, tbmtype, tbmDACs, roctype, rocDACs, rocPixels, rocI2C=None):
+        self.TBMType, self.ROCType = tbmtype, roctype
+        self.TBMDACs = [dict(dacs) for dacs in tbmDACs]
+        self.DACs = [dict(dacs) for dacs in rocDACs]
+        self.NRocs = len(rocDACs)
+        shape = (self.NRocs, NCols, NRows)
+        self.Enabled, self.Masked, self.Trim = zeros(shape, '?'), zeros(shape, '?'), zeros(shape, 'u1')
+        for roc, pixels in enumerate(rocPixels):
+            if isinstance(pixels, tuple):  # trim and mask arrays
+                self.Trim[roc], self.Masked[roc] = pixels
+                continue
+            for px in pixels:
+                self.Trim[roc, px.column, px.row], self.Masked[roc, px.column, px.row] = px.trim, px.mask
+        rng = default_rng(self.Seed + 1000)  # the chip properties must not depend on the call sequence
+        self.Threshold, self.Gain = rng.normal(0, 3, shape), rng.normal(1, .1, shape)
+        info('initialised mock DUT with {} ROCs ({}, {})'.format(self.NRocs, roctype, tbmtype))
+        return True
+
+    def programDUT(self):
+        return True
+
+    def setTestboardPower(self, power_settings):
+        self.PowerSettings = dict(power_settings)
+        return True
+
+    def status(self):
+        return True
+
+    @property
+    def has_tbm(self):
+        return len(self.TBMDACs) > 0
+
+    @property
+    def inverted(self):
+        return self.ROCType == b'psi46dig'
+    # endregion INIT
+    # -----------------------------------------
+
+    # -----------------------------------------
+    # region DUT
+    def get_rocs(self, rocid):
+        return range(self.NRocs) if rocid is None else [rocid]
+
+    def testAllPixels(self, enable, rocid=None):
+        self.Enabled[list(self.get_rocs(rocid))] = enable
+
+    def maskAllPixels(self, enable, rocid=None):
+        self.Masked[list(self.get_rocs(rocid))] = enable
+
+    def testPixel(self, col, row, enable, rocid=None):
+        self.Enabled[list(self.get_rocs(rocid)), col, row] = enable
+
+    def maskPixel(self, col, row, enable, rocid=None):
+        self.Masked[list(self.get_rocs(rocid)), col, row] = enable
+
+    def getNMaskedPixels(self, rocid=None):
+        return int(self.Masked[list(self.get_rocs(rocid))].sum())
+
+    def getNEnabledPixels(self, rocid=None):
+        return int(self.Enabled[list(self.get_rocs(rocid))].sum())
+
+    def updateTrimBits(self, trimming, rocid):  # the trim bits are stored, but do not change the thresholds
+        if isinstance(trimming, list):
+            for px in trimming:
+                self.Trim[rocid, px.column, px.row] = px.trim
+        else:
+            self.Trim[rocid] = where(trimming < 0, self.Trim[rocid], trimming)
+        return True
+
+    def pixel_configs(self, sel, rocid=None):
+        configs = []
+        for roc in self.get_rocs(rocid):
+            for col, row in zip(*where(sel[roc])):
+                configs.append(PixelConfig(int(col), int(row), int(self.Trim[roc, col, row])))
+                configs[-1].roc, configs[-1].mask, configs[-1].enable = roc, bool(self.Masked[roc, col, row]), bool(self.Enabled[roc, col, row])
+        return configs
+
+    def getEnabledPixels(self, rocid=None):
+        return self.pixel_configs(self.Enabled, rocid)
+
+    def getMaskedPixels(self, rocid=None):
+        return self.pixel_configs(self.Masked, rocid)
+
+    def getNRocs(self):
+        return self.NRocs
+
+    def getNEnabledRocs(self):
+        return self.NRocs
+
+    def getEnabledRocIDs(self):
+        return list(range(self.NRocs))
+
+    def getNTbms(self):
+        return len(self.TBMDACs)
+
+    def getNEnabledTbms(self):
+        return len(self.TBMDACs)
+
+    def getRocType(self):
+        return self.ROCType
+
+    def getTbmType(self):
+        return self.TBMType
+
+    def getRocDACs(self, rocid):
+        return dict(self.DACs[rocid])
+
+    def getDACs(self, rocid):
+        return self.getRocDACs(rocid)
+
+    def getTbmDACs(self, tbmid):
+        return dict(self.TBMDACs[tbmid])
+
+    def setDAC(self, dacName, dacValue, rocid=None):
+        for roc in self.get_rocs(rocid):
+            self.DACs[roc][dacName] = int(dacValue)
+        return True
+
+    @staticmethod
+    def getDACRange(dacName):
+        return 15 if dacName in [b'vdig', b'vcomp', b'readback'] else 255
+
+    def setTbmReg(self, regName, regValue, tbmid=None):
+        for tbm in range(len(self.TBMDACs)) if tbmid is None else [tbmid]:
+            self.TBMDACs[tbm][regName] = int(regValue)
+        return True
+
+    def dac(self, name, roc=0):
+        return self.DACs[roc].get(name, 0) if self.DACs else 0
+    # endregion DUT
+    # -----------------------------------------
+
+    # -----------------------------------------
+    # region TESTBOARD
+    def getTestboardDelays(self):
+        return dict(self.Delays)
+
+    def setTestboardDelays(self, sig_delays):
+        self.Delays.update(sig_delays)
+
+    def setPatternGenerator(self, pg_setup):
+        self.PGSetup = list(pg_setup)
+
+    def getTBia(self):
+        """ :returns: analogue current [A], linear in vana """
+        return sum(3 + .3 * self.dac(b'vana', roc) for roc in range(self.NRocs)) / 1000.
+
+    def getTBva(self):
+        return float(self.PowerSettings.get(b'va', 1.9))
+
+    def getTBid(self):
+        return .03 * max(self.NRocs, 1)
+
+    def getTBvd(self):
+        return float(self.PowerSettings.get(b'vd', 2.6))
+
+    def HVon(self):
+        self.HV = True
+
+    def HVoff(self):
+        self.HV = False
+
+    def Pon(self):
+        pass
+
+    def Poff(self):
+        pass
+
+    def SignalProbe(self, probe, name, channel=0):
+        return True
+
+    def setExternalClock(self, enable):
+        return True
+
+    def setDecodingOffset(self, *args):
+        pass
+
+    def setBlackOffsets(self, *args):
+        pass
+
+    def setDecodingL1Offsets(self, *args):
+        pass
+
+    def setDecodingAlphas(self, *args):
+        pass
+
+    def setReportingLevel(self, logLevel):
+        self.LogLevel = logLevel
+
+    def getReportingLevel(self):
+        return self.LogLevel
+
+    def flashTB(self, filename):
+        return True
+    # endregion TESTBOARD
+    # -----------------------------------------
+
+    # -----------------------------------------
+    # region PIXEL RESPONSE
+    def get_vcal(self, roc):
+        return self.dac(b'vcal', roc) * (7 if self.dac(b'ctrlreg', roc) & 4 else 1)
+
+    def get_efficiency(self, roc):
+        """ :returns: probability of every pixel of ROC [roc] to respond to a calibrate signal """
+        threshold = 100 - .6 * self.dac(b'vthrcomp', roc) + self.Threshold[roc]
+        eff = .5 * (1 + erf((self.get_vcal(roc) - threshold) / (sqrt(2) * 2.)))
+        return eff * (abs(self.dac(b'caldel', roc) - 120) < 60) * self.get_timing_efficiency(roc)
+
+    def get_pulse_height(self, roc):
+        ph = self.dac(b'phoffset', roc) / 2 + self.Gain[roc] * self.dac(b'phscale', roc) / 2 * (1 + erf((self.get_vcal(roc) - 150) / 300.))
+        return clip(ph, 0, 255)
+
+    def get_timing_efficiency(self, roc=0):
+        """ :returns: fraction of triggers with hits for the current wbc and clk """
+        eff = 1.
+        if self.Latency is not None:
+            eff *= {0: 1, 1: .1}.get(abs(self.dac(b'wbc', roc) - self.Latency), 0)
+        if self.ClkWindow is not None:
+            eff *= self.Delays.get(b'clk', 0) in self.ClkWindow
+        return eff
+
+    def response_map(self, n_triggers, pulse_height=False):
+        pixels = []
+        for roc in range(self.NRocs):
+            sel = self.Enabled[roc] & ~self.Masked[roc]
+            counts = self.RNG.binomial(n_triggers, clip(self.get_efficiency(roc), 0, 1)) * sel
+            values = self.get_pulse_height(roc) if pulse_height else counts
+            pixels += [Pixel(roc, col, row, round(values[col, row])) for col, row in zip(*where(counts > 0))]
+        return pixels
+
+    def getEfficiencyMap(self, flags, nTriggers):
+        return self.response_map(nTriggers)
+
+    def getPulseheightMap(self, flags, nTriggers):
+        return self.response_map(nTriggers, pulse_height=True)
+
+    def scan_dac(self, name, step, low, high, f):
+        old = [self.dac(name, roc) for roc in range(self.NRocs)]
+        data = []
+        for value in range(low, high + 1, step):
+            self.setDAC(name, value)
+            data.append(f())
+        for roc, value in enumerate(old):
+            self.setDAC(name, value, roc)
+        return data
+
+    def getEfficiencyVsDAC(self, dacName, dacStep, dacMin, dacMax, flags=0, nTriggers=16):
+        return self.scan_dac(dacName, dacStep, dacMin, dacMax, lambda: self.response_map(nTriggers))
+
+    def getPulseheightVsDAC(self, dacName, dacStep, dacMin, dacMax, flags=0, nTriggers=16):
+        return self.scan_dac(dacName, dacStep, dacMin, dacMax, lambda: self.response_map(nTriggers, pulse_height=True))
+
+    def getEfficiencyVsDACDAC(self, dac1name, dac1step, dac1min, dac1max, dac2name, dac2step, dac2min, dac2max, flags=0, nTriggers=16):
+        return sum(self.scan_dac(dac1name, dac1step, dac1min, dac1max, lambda: self.getEfficiencyVsDAC(dac2name, dac2step, dac2min, dac2max, flags, nTriggers)), [])
+
+    def getPulseheightVsDACDAC(self, dac1name, dac1step, dac1min, dac1max, dac2name, dac2step, dac2min, dac2max, flags=0, nTriggers=16):
+        return sum(self.scan_dac(dac1name, dac1step, dac1min, dac1max, lambda: self.getPulseheightVsDAC(dac2name, dac2step, dac2min, dac2max, flags, nTriggers)), [])
+
+    def getThresholdMap(self, dacName, dacStep, dacMin, dacMax, threshold, flags, nTriggers):
+        first = {}
+        for value, pixels in zip(range(dacMin, dacMax + 1, dacStep), self.getEfficiencyVsDAC(dacName, dacStep, dacMin, dacMax, flags, nTriggers)):
+            for px in pixels:
+                if px.value >= threshold / 100 * nTriggers and (px.roc, px.column, px.row) not in first:
+                    first[(px.roc, px.column, px.row)] = value
+        return [Pixel(*key, value) for key, value in first.items()]
+    # endregion PIXEL RESPONSE
+    # -----------------------------------------
+
+    # -----------------------------------------
+    # region DAQ
+    def daqStart(self, flags=None):
+        self.IsRunning = True
+        return True
+
+    def daqStop(self):
+        self.IsRunning = False
+        return True
+
+    def daqStatus(self):
+        return self.IsRunning
+
+    def daqClear(self):
+        self.Buffer, self.Events, self.RawEvents = [], [], []
+
+    def daqTriggerSource(self, source, period=0):
+        self.TriggerSource = source
+        return True
+
+    def daqSingleSignal(self, signal):
+        return True
+
+    def daqTrigger(self, nTrig, period=0):
+        if self.IsRunning:
+            self.Buffer.append(self.generate(nTrig))
+
+    def daqTriggerLoop(self, period):
+        pass
+
+    def daqTriggerLoopHalt(self):
+        pass
+
+    def generate(self, n):
+        """ :returns: the raw stream of [n] events with random clusters (external triggers) or the calibrate hits of the enabled pixels (other trigger sources) """
+        n_rocs, rng = max(self.NRocs, 1), self.RNG
+        if b'ext' in self.TriggerSource:
+            seg = repeat(arange(n * n_rocs), rng.poisson(self.HitRate * self.get_timing_efficiency(), n * n_rocs))  # (event, ROC) of every cluster
+            size = clip(1 + rng.poisson(max(self.ClusterSize - 1, 0), seg.size), 1, 4)
+            member = repeat(arange(seg.size), size)
+            k = arange(member.size) - repeat(cumsum(size) - size, size)  # index of the pixel in the cluster
+            seg = seg[member]
+            cols = clip(rng.integers(0, NCols, size.size)[member] + k % 2, 0, NCols - 1)
+            rows = clip(rng.integers(0, NRows, size.size)[member] + k // 2, 0, NRows - 1)
+        else:
+            seg, cols, rows = [zeros(0, 'i8')] * 3
+            for roc in range(self.NRocs):
+                c, r = where(self.Enabled[roc] & ~self.Masked[roc])
+                ev, i = where(rng.random((n, c.size)) < self.get_efficiency(roc)[c, r])
+                seg, cols, rows = concatenate([seg, ev * n_rocs + roc]), concatenate([cols, c[i]]), concatenate([rows, r[i]])
+        pixel_id, i = unique((seg * NCols + cols) * NRows + rows, return_index=True)  # sorted by event and ROC without duplicates
+        seg = pixel_id // (NCols * NRows)
+        hits = zeros(seg.size, HitDtype)
+        hits['roc'], hits['column'], hits['row'] = seg % n_rocs, cols[i], rows[i]
+        hits['value'] = clip(rng.normal(100, 20, seg.size), 0, 255)
+        if self.NRocs:
+            keep = ~self.Masked[hits['roc'], hits['column'], hits['row']]
+            hits, seg = hits[keep], seg[keep]
+        headers = zeros(n, HeaderDtype)
+        headers['token_pass'] = 1
+        headers['trigger_count'] = (self.TriggerCount + arange(n)) % 256
+        headers['trigger_phase'] = rng.integers(0, 8, n)
+        self.TriggerCount += n
+        arrays = EventArrays({'hits': bincount(seg // n_rocs, minlength=n).astype('u2'), 'headers': ones(n, 'u2')}, {'hits': hits, 'headers': headers})
+        return encode_stream(arrays, n_rocs, self.has_tbm, self.inverted, rng.random((n, n_rocs)) < self.ErrorRate)
+
+    def get_buffer(self):
+        if self.IsRunning and b'ext' in self.TriggerSource:
+            self.Buffer.append(self.generate(self.EventsPerRead))
+        buffers, self.Buffer, self.RawEvents = self.RawEvents + self.Buffer, [], []  # events split by daqGetRawEvent come first
+        return concatenate(buffers) if buffers else zeros(0, 'u2')
+
+    def get_arrays(self):
+        """ :returns: EventArrays of all buffered events """
+        arrays = decode_stream(self.get_buffer(), max(self.NRocs, 1), self.has_tbm, self.inverted)[0]
+        self.Stats.add(arrays)
+        return arrays
+
+    def daqGetBuffer(self):
+        return self.get_buffer().tolist()
+
+    def daqGetRawEventBuffer(self):
+        return self.daqGetBuffer()
+
+    def daqGetEventBuffer(self):
+        events, self.Events = self.Events + make_events(self.get_arrays()), []
+        if not events:
+            raise RuntimeError('no data in the DAQ buffer')
+        return events
+
+    def daqGetEvent(self):
+        if not self.Events:
+            self.Events = make_events(self.get_arrays())
+        if not self.Events:
+            raise RuntimeError('no data in the DAQ buffer')
+        return self.Events.pop(0)
+
+    def daqGetRawEvent(self):
+        if not self.RawEvents:  # only read new data after all split events were returned
+            words = self.get_buffer()
+            starts = where(split_events(words, self.has_tbm)[1])[0]
+            self.RawEvents = [words[i:j] for i, j in zip(starts, append(starts[1:], words.size))]
+        if not self.RawEvents:
+            raise RuntimeError('no data in the DAQ buffer')
+        return self.RawEvents.pop(0).tolist()
+
+    def daqGetReadback(self):
+        return [[0] for _ in range(self.NRocs)]
+
+    def daqGetXORsum(self, channel):
+        return []
+
+    def getStatistics(self):
+        stats, self.Stats = self.Stats, Statistics()
+        return stats
+    # endregion DAQ
+    # -----------------------------------------
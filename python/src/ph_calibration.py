@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# --------------------------------------------------------
+#       Pulse height calibration: batched fits of the pulse height vs. vcal of all pixels
+# created on October 19th 2026 by agent (agent@local)
+# --------------------------------------------------------
+
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count
+from os.path import join
+from time import time
+from numpy import array, full, sqrt, exp, pi, nan, inf, stack, isfinite, argmax, nanmax, nan_to_num
+from helpers.utils import erf, info, write_atomic
+from src.scurves import levenberg_marquardt, NCols
+
+FileName = 'phCalibrationFitErr'
+Header = ['Parameters of the vcal vs. pulse height fits\n', 'par[3]*(TMath::Erf((x[0]-par[0])/par[1])+par[2])\n', '\n']
+Limits = array([-inf, 50, -inf, -inf]), array([inf, 1000, inf, inf])  # same slope limits as pXar
+
+
+def ph_model(x, p):
+    """ :returns: values and jacobian of [3] * (Erf((x - [0]) / [1]) + [2]) """
+    z = (x - p[:, 0]) / p[:, 1]
+    e, g = erf(z), 2 / sqrt(pi) * exp(-z ** 2)
+    return p[:, 3] * (e + p[:, 2]), stack([-p[:, 3] * g / p[:, 1], -p[:, 3] * g * z / p[:, 1], full(z.shape, 1.) * p[:, 3], e + p[:, 2]]).transpose(2, 0, 1)
+
+
+def start_parameters(x, y):
+    """ :returns: the start parameters of pXar (PixInitFunc::gpErr) for every pixel: half point, slope of 250, floor of 1 and the half plateau """
+    y_max = nanmax(y, axis=0)
+    i_half = argmax(nan_to_num(y) > .5 * y_max, axis=0)
+    return stack([x[i_half], full(y_max.shape, 250.), full(y_max.shape, 1.), .5 * y_max], axis=-1)
+
+
+def fit_ph(x, ph, n_iter=20, min_points=4):
+    """ fits the pulse height vs. vcal of all pixels at once.
+        :param x: vcal values (high range already multiplied by 7)
+        :param ph: pulse heights with the vcal values as first axis, e.g. (n_vcal, 52, 80), nan for missing values
+        :returns: parameters (pixel shape, 4) and chi2 (pixel shape), nan for pixels with less than [min_points] values """
+    shape, y = ph.shape[1:], ph.reshape(x.size, -1).astype('d')
+    w = isfinite(y)
+    pars, chi2 = full((y.shape[1], 4), nan), full(y.shape[1], nan)
+    sel = w.sum(axis=0) >= min_points
+    if sel.any():
+        ys, ws = nan_to_num(y[:, sel]), w[:, sel].astype('d')
+        pars[sel], chi2[sel] = levenberg_marquardt(ph_model, array(x, 'd'), ys, start_parameters(x, y[:, sel]), n_iter, weights=ws, limits=Limits)
+    return pars.reshape(shape + (4,)), chi2.reshape(shape)
+
+
+def fit_rocs(x, ph, n_iter=20, processes=None):
+    """ fits the pulse height scans (n_vcal, n_rocs, 52, 80) of every ROC in a separate process. :returns: parameters (n_rocs, 52, 80, 4) and chi2 (n_rocs, 52, 80) """
+    t, n_rocs = time(), ph.shape[1]
+    processes = min(n_rocs, cpu_count() or 1) if processes is None else processes
+    if processes > 1:
+        with ProcessPoolExecutor(processes) as pool:
+            res = list(pool.map(fit_ph, [x] * n_rocs, [ph[:, roc] for roc in range(n_rocs)], [n_iter] * n_rocs))
+    else:
+        res = [fit_ph(x, ph[:, roc], n_iter) for roc in range(n_rocs)]
+    pars, chi2 = array([r[0] for r in res]), array([r[1] for r in res])
+    info(f'fitted the pulse heights of {isfinite(chi2).sum()} pixels of {n_rocs} ROCs in {time() - t:.2f} s ({processes} processes)')
+    return pars, chi2
+
+
+def write_fitpars(pars, directory='.', trim='', i2cs=None):
+    """ writes the fit parameters of every ROC to [directory]/phCalibrationFitErr[trim]_C[i2c].dat in the format of pXar. :returns: the file names """
+    filenames = []
+    i2cs = range(len(pars)) if i2cs is None else i2cs
+    for i2c, roc_pars in zip(i2cs, nan_to_num(pars)):  # pixels without fit get 0, like in pXar
+        lines = [f'{p0:e} {p1:e} {p2:e} {p3:e}     Pix {col:2d} {row:2d}\n' for col in range(NCols) for row, (p0, p1, p2, p3) in enumerate(roc_pars[col])]
+        filenames.append(join(directory, f'{FileName}{trim}_C{i2c}.dat'))
+        write_atomic(filenames[-1], Header + lines)
+    info(f'wrote the pulse height calibrations of {len(filenames)} ROCs to {directory}')
+    return filenames
+
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# --------------------------------------------------------
+#       Decodes and replays recorded raw DTB streams (daqGetBuffer) without a testboard
+# created on October 19th 2026 by agent (agent@local)
+# --------------------------------------------------------
+
+from numpy import array, zeros, ones, full, where, cumsum, maximum, append, concatenate, bincount, diff
+from src.event_arrays import EventArrays, HitDtype, HeaderDtype, RocDtype, FlagDtype
+from src.event_recorder import EventReader, RAW
+from helpers.utils import critical, traced
+
+NRows, NCols = 80, 52
+
+
+def decode_hits(raw, inverted=False):
+    """ vectorised version of pixel::decodeRaw. :returns: structured array of hits (roc is not set) """
+    raw, hits = raw.astype('i8'), zeros(raw.size, HitDtype)
+    hits['value'] = (raw & 0x0f) + ((raw >> 1) & 0xf0)
+    hits['invalid_pulse_height'] = (raw & 0x10) > 0
+    r2, r1, r0 = [((raw >> shift) & 7) ^ (7 if inverted else 0) for shift in [15, 12, 9]]
+    r = r2 * 36 + r1 * 6 + r0
+    row, col = 80 - r // 2, 2 * (((raw >> 21) & 7) * 6 + ((raw >> 18) & 7)) + (r & 1)
+    hits['row'], hits['column'] = row & 0xff, col  # row is an uint8 in pxar
+    hits['buffer_corruption'] = row == NRows
+    hits['invalid_address'] = (((row & 0xff) >= NRows) | (col >= NCols)) & (row != NRows)  # row 80 is a buffer corruption
+    return hits
+
+
+def split_events(words, tbm=False):
+    """ splits the stream at the event start markers like the dtbEventSplitter.
+        :returns: event number of every word (-1 for words outside of complete events), mask of the first words of the events and the index of the first word of the
+                  incomplete last event """
+    start = (words & 0xe000) == 0xa000 if tbm else (words & 0x8000) > 0
+    end = (words & 0xe000) == 0xc000 if tbm else (words & 0x4000) > 0
+    starts = where(start)[0]
+    if not starts.size:
+        return full(words.size, -1), start, words.size
+    complete = end[starts[-1]:].any()
+    event = cumsum(start) - 1
+    n_end = cumsum(end)
+    after_end = n_end - end - maximum.accumulate(where(start, n_end - end, 0)) > 0  # words between the end marker and the next start marker
+    event[(event >= starts.size - (0 if complete else 1)) | after_end] = -1
+    return event, start, words.size if complete else starts[-1]
+
+
+@traced('decode')
+def decode_stream(words, n_rocs=1, tbm=False, inverted=False, roc_offset=0):
+    """ decodes digital ROC data like the dtbEventDecoder: events with a wrong number of ROC headers get cleared and invalid pixels are dropped.
+        :returns: EventArrays of the complete events and the remaining words of the incomplete last event """
+    words = array(words, 'u2')
+    event, start, rest = split_events(words, tbm)
+    n = int(event.max()) + 1 if event.size else 0
+    if n <= 0:
+        return EventArrays({'hits': zeros(0, 'u2')}, {}), words[rest:]
+    valid = event >= 0
+    roc_header = valid & (((words & 0xe000) == 0x4000) if tbm else ((words & 0x0ffc) == 0x07f8))
+    n_headers = cumsum(roc_header)
+    roc = n_headers - maximum.accumulate(where(start, n_headers - roc_header, 0)) - 1  # ROC number inside the event
+    data = valid & ~roc_header & (roc >= 0) & (((words & 0xe000) <= 0x2000) if tbm else True)
+    seg_start = roc_header | start
+    n_data = cumsum(data)
+    k = n_data - maximum.accumulate(where(seg_start, n_data - data, 0)) - 1  # index of the data word inside the ROC segment
+    first = data & (k % 2 == 0) & append(data[1:] & ~seg_start[1:], False)  # single words at the end of a segment are incomplete
+    i = where(first)[0]
+    raw = ((words[i].astype('u4') & 0x0fff) << 12) + (words[i + 1] & 0x0fff)
+    keep = raw != 0xffffff  # fill bits of TBM09 data streams
+    hits, hit_event = decode_hits(raw[keep], inverted), event[i][keep]
+    hits['roc'] = roc[i][keep] + roc_offset
+
+    n_found = bincount(event[roc_header], minlength=n)
+    headers = decode_tbm(words, event, start, n) if tbm else zeros(0, HeaderDtype)
+    cleared = n_found != n_rocs
+    if tbm:
+        no_token = headers['token_pass'] == 0
+        cleared = where(no_token, (headers['pkam'] > 0) | (n_found > 0), cleared)
+    good = ~cleared[hit_event] & ~(hits['invalid_address'] | hits['invalid_pulse_height'] | hits['buffer_corruption'])
+    hits, hit_event = hits[good], hit_event[good]
+
+    rocs = zeros(n, RocDtype)
+    rocs['missing_roc_headers'] = n_found != n_rocs
+    no_data, mismatch = zeros(n, FlagDtype), zeros(n, FlagDtype)
+    no_data['value'] = n_found == 0
+    if tbm:
+        mismatch['value'][1:] = diff(headers['trigger_count'].astype('i4')) % 256 != 1
+    counts = {'hits': bincount(hit_event, minlength=n).astype('u2'), 'headers': full(n, int(tbm), 'u2'), 'rocs': ones(n, 'u2'), 'eventid_mismatch': ones(n, 'u2'),
+              'no_data': ones(n, 'u2')}
+    return EventArrays(counts, {'hits': hits, 'headers': headers, 'rocs': rocs, 'eventid_mismatch': mismatch, 'no_data': no_data}), words[rest:]
+
+
+def decode_tbm(words, event, start, n):
+    """ :returns: the TBM header (first two words) and trailer (last two words) information of every event """
+    i = where(start & (event >= 0))[0]
+    last = where(append(event[1:], -1) != event)[0]
+    j = last[event[last] >= 0]
+    w = words.astype('u4')
+    headers = zeros(n, HeaderDtype)
+    headers['header'] = ((w[i] & 0xff) << 8) + (w[i + 1] & 0xff)
+    headers['trailer'] = ((w[j - 1] & 0xff) << 8) + (w[j] & 0xff)
+    h, t = headers['header'], headers['trailer']
+    headers['trigger_count'], headers['trigger_phase'] = (h >> 8) & 0xff, h & 0x3f
+    headers['token_pass'], headers['reset_tbm'], headers['reset_roc'] = (t & 0x8000) == 0, (t & 0x4000) > 0, (t & 0x2000) > 0
+    headers['cal_trigger'], headers['auto_reset'], headers['pkam'], headers['stack_count'] = (t & 0x0200) > 0, (t & 0x0080) > 0, (t & 0x0040) > 0, t & 0x3f
+    return headers
+
+
+class Pixel:
+    """ python version of the Pixel of PyPxarCore """
+
+    __slots__ = ['roc', 'column', 'row', 'value', 'invalid_address', 'invalid_pulse_height', 'buffer_corruption']
+
+    def __init__(self, roc, column, row, value, invalid_address=False, invalid_pulse_height=False, buffer_corruption=False):
+        self.roc, self.column, self.row, self.value = int(roc), int(column), int(row), int(value)
+        self.invalid_address, self.invalid_pulse_height, self.buffer_corruption = bool(invalid_address), bool(invalid_pulse_height), bool(buffer_corruption)
+
+    def __str__(self):
+        return 'ROC {} [{}, {}, {}]'.format(self.roc, self.column, self.row, self.value)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class Event:
+    """ python version of the PxEvent of PyPxarCore with the properties the python tools use. """
+
+    def __init__(self, arrays, i):
+        self.pixels = [Pixel(*hit) for hit in arrays.get('hits', i).tolist()]
+        h = arrays.get('headers', i)
+        self.header, self.trailer = h['header'].tolist(), h['trailer'].tolist()
+        self.triggerCounts, self.triggerPhases, self.stackCounts = h['trigger_count'].tolist(), h['trigger_phase'].tolist(), h['stack_count'].tolist()
+        self.dataValues, self.dataIDs = self.triggerPhases, [(v & 0x00c0) >> 6 for v in self.header]
+        self.havePkamReset, self.haveCalTrigger, self.haveAutoReset = [h[key].astype('?').tolist() for key in ['pkam', 'cal_trigger', 'auto_reset']]
+        self.haveTokenPass, self.haveResetTBM, self.haveResetROC = [h[key].astype('?').tolist() for key in ['token_pass', 'reset_tbm', 'reset_roc']]
+        self.haveNoTokenPass = [not v for v in self.haveTokenPass]
+        r = arrays.get('rocs', i)
+        self.roc_readback, self.incomplete_data, self.missing_roc_headers = [r[key].tolist() for key in ['roc_readback', 'incomplete_data', 'missing_roc_headers']]
+        self.eventid_mismatch, self.no_data = [arrays.get(key, i)['value'].tolist() for key in ['eventid_mismatch', 'no_data']]
+
+    def __str__(self):
+        return '====== {} ====== {}'.format(' '.join(hex(v) for v in self.header), ' '.join(str(px) for px in self.pixels))
+
+    def __repr__(self):
+        return self.__str__()
+
+
+@traced('make events')
+def make_events(arrays):
+    return [Event(arrays, i) for i in range(arrays.NEvents)]
+
+
+class RawStreamReplay:
+    """ Replays a raw stream recorded with the EventRecorder (kind RAW, one record per daqGetBuffer call) with the DAQ interface of PyPxarCore. The words get decoded
+        with [decode_stream], such that the decoding settings can be changed offline. Use get_arrays() to skip the creation of the python events. """
+
+    def __init__(self, filename, n_rocs=1, tbm=False, inverted=False, roc_offset=0):
+
+        self.Reader = EventReader(filename)
+        if self.Reader.Kind != RAW:
+            critical(f'{filename} does not contain a raw stream')
+        self.DecoderArgs = n_rocs, tbm, inverted, roc_offset
+        self.Buffers = self.Reader.batches(1)
+        self.Rest = zeros(0, 'u2')
+        self.Events = []
+        self.IsRunning = False
+
+    def __len__(self):
+        """ :returns: the number of recorded buffers """
+        return len(self.Reader)
+
+    def daqStart(self, flags=None):
+        self.IsRunning = True
+
+    def daqStop(self):
+        self.IsRunning = False
+
+    def daqStatus(self):
+        return self.IsRunning
+
+    def daqClear(self):
+        self.Events = []
+
+    def daqGetBuffer(self):
+        """ :returns: the next recorded buffer, raises a RuntimeError at the end of the file like an empty DTB buffer """
+        try:
+            return next(self.Buffers)[1]
+        except StopIteration:
+            raise RuntimeError('end of the recorded raw stream')
+
+    def daqGetRawEventBuffer(self):
+        return self.daqGetBuffer()
+
+    def get_arrays(self):
+        """ :returns: EventArrays of the next recorded buffer. Events which are split between two buffers are completed with the next buffer. """
+        arrays, self.Rest = decode_stream(concatenate([self.Rest, self.daqGetBuffer()]), *self.DecoderArgs)
+        return arrays
+
+    def daqGetEventBuffer(self):
+        events, self.Events = self.Events + make_events(self.get_arrays()), []
+        return events
+
+    def daqGetEvent(self):
+        while not self.Events:
+            self.Events = make_events(self.get_arrays())
+        return self.Events.pop(0)
+
+    def replay(self, writer, batch_size=None):
+        """ passes all decoded events to [writer].write_batch. :returns: the number of events """
+        n = 0
+        while True:
+            try:
+                arrays = self.get_arrays()
+            except RuntimeError:
+                return n
+            for batch in arrays.batches(batch_size) if batch_size else [arrays]:
+                writer.write_batch(batch)
+            n += len(arrays)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# --------------------------------------------------------
+#       Vectorised fits of the S-curves of all pixels of a vcal scan
+# created on October 19th 2026 by agent (agent@local)
+# --------------------------------------------------------
+
+from numpy import full, ones, array, sqrt, exp, pi, nan, inf, diff, clip, stack, arange, isfinite, eye, nanmedian, rint
+from numpy.linalg import solve, LinAlgError
+from helpers.utils import erf, info
+from time import time
+
+NCols, NRows = 52, 80
+
+
+def scan_tensor(data, n_rocs, dtype='f4', fill=0):
+    """ :returns: (n_values, n_rocs, 52, 80) array of the pixel values of a DAC scan of the pxar API (list of pixel lists for every DAC value), [fill] for missing pixels """
+    t = full((len(data), n_rocs, NCols, NRows), fill, dtype)
+    for i, pixels in enumerate(data):
+        for px in pixels:
+            t[i, px.roc, px.column, px.row] = px.value
+    return t
+
+
+def scurve(x, threshold, noise, plateau=1):
+    return plateau / 2 * (1 + erf((x - threshold) / (sqrt(2) * noise)))
+
+
+def moments(x, eff):
+    """ :returns: threshold and noise of every pixel from the mean and the width of the derivative of the S-curves [eff] (first axis = [x]) """
+    d = clip(diff(eff, axis=0), 0, None).reshape(x.size - 1, -1)
+    xm = (x[1:] + x[:-1]) / 2
+    n = d.sum(axis=0)
+    n[n == 0] = nan
+    thr = xm @ d / n
+    noise = sqrt(clip((xm ** 2) @ d / n - thr ** 2, 0, None))
+    return thr.reshape(eff.shape[1:]), noise.reshape(eff.shape[1:])
+
+
+def levenberg_marquardt(model, x, y, p, n_iter=10, damping=1e-3, weights=None, limits=None):
+    """ fits [model](x, p) -> (values, jacobian (n_pix, n_par, n_x)) to the data [y] (n_x, n_pix) at [x] (same shape or n_x) of all pixels at once, starting from the
+        parameters [p] (n_pix, n_par). The normal equations of all pixels are solved together in every iteration.
+        :param weights: weight of every data point (n_x, n_pix), e.g. 0 for missing data
+        :param limits: lower and upper limits of the parameters (n_par) each
+        :returns: the fitted parameters and the chi2 of every pixel """
+    x = x if x.ndim == 2 else x[:, None]
+    w = ones(y.shape) if weights is None else weights
+    eye_ = eye(p.shape[1])
+    for _ in range(n_iter):
+        f, jac = model(x, p)
+        jw = jac * w.T[:, None, :]
+        jtj = jw @ jac.transpose(0, 2, 1)
+        jtj += damping * jtj.diagonal(axis1=1, axis2=2)[:, :, None] * eye_ + 1e-12 * eye_
+        try:
+            p = p + solve(jtj, jw @ (y - f).T[..., None])[..., 0]
+        except LinAlgError:
+            break
+        p = p if limits is None else clip(p, *limits)
+    return p, (w * (y - model(x, p)[0]) ** 2).sum(axis=0)
+
+
+def scurve_model(x, p):
+    """ :returns: values and jacobian of S-curves with the parameters [p] = (threshold, noise, plateau) """
+    z = (x - p[:, 0]) / (sqrt(2) * p[:, 1])
+    g = exp(-z ** 2) / sqrt(pi)  # d/dz (1 + erf(z)) / 2
+    f = (1 + erf(z)) / 2
+    return p[:, 2] * f, stack([-p[:, 2] * g / (sqrt(2) * p[:, 1]), -p[:, 2] * g * z / p[:, 1], f]).transpose(2, 0, 1)
+
+
+def fit_scurves(x, eff, n_iter=10, n_sigma=6, chunk=2 ** 14, prnt=True):
+    """ fits an erf to the S-curves of all pixels at once. Every pixel is only fitted in a window of +-[n_sigma] noise around the moment estimate of its threshold.
+        :param x: equidistant DAC values (e.g. vcal) of the scan
+        :param eff: efficiencies with the scan values as first axis, e.g. (n_vcal, n_rocs, 52, 80)
+        :returns: threshold, noise, plateau and chi2 maps with the shape of the pixel axes of [eff] (nan for pixels without a rising edge) """
+    t = time()
+    x, shape = array(x, 'd'), eff.shape[1:]
+    y = eff.reshape(x.size, -1)
+    thr, noise = (v.ravel() for v in moments(x, eff))
+    res = full((y.shape[1], 4), nan)
+    valid = isfinite(thr) & (y[-1] > 0)
+    sel = arange(y.shape[1])[valid]
+    dx = x[1] - x[0]
+    w = min(x.size, max(int(2 * n_sigma * nanmedian(noise[sel]) / dx) + 1, 8)) if sel.size else x.size
+    for i in range(0, sel.size, chunk):
+        s = sel[i:i + chunk]
+        ix = clip(rint((thr[s] - x[0]) / dx).astype('i') - w // 2, 0, x.size - w) + arange(w)[:, None]  # (w, n_pix) window around the threshold
+        p0 = stack([thr[s], clip(noise[s], .5 * dx, None), y[-3:, s].mean(axis=0)], axis=-1)
+        limits = array([-inf, 1e-2 * dx, -inf]), array([inf, x.size * dx, inf])  # keep the noise positive and finite
+        p, chi2 = levenberg_marquardt(scurve_model, x[ix], y[ix, s].astype('d'), p0, n_iter, limits=limits)
+        res[s] = stack([p[:, 0], p[:, 1], p[:, 2], chi2], axis=-1)
+    info(f'fitted {sel.size} S-curves in {time() - t:.2f} s', prnt=prnt)
+    return tuple(res[:, i].reshape(shape) for i in range(4))
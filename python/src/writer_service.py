@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+# --------------------------------------------------------
+#       Runs the ROOT writers in a separate process fed by a shared memory ring buffer
+# created on October 19th 2026 by agent (agent@local)
+# --------------------------------------------------------
+
+from multiprocessing import Process, Queue
+from multiprocessing.shared_memory import SharedMemory
+from collections import deque
+from queue import Empty
+from time import time, sleep
+from traceback import format_exc
+from numpy import ndarray, frombuffer, array, concatenate, ascontiguousarray
+from helpers.utils import info, warning, do_nothing, choose, Tracer, traced
+from src.event_arrays import EventArrays, Dtypes
+
+
+DATA, FLUSH, CLOSE = range(3)
+
+
+class WriterError(Exception):
+    """ the writer process failed or does not respond. Not a RuntimeError, which the DAQ loops catch for empty buffers. """
+
+
+class RingBuffer:
+    """ single producer / single consumer byte ring buffer in shared memory. Messages are prefixed with their length. """
+
+    HeaderSize = 64
+
+    def __init__(self, size=None, name=None):
+
+        self.Memory = SharedMemory(name=name, create=name is None, size=0 if size is None else size + self.HeaderSize)
+        self.Capacity = self.Memory.size - self.HeaderSize
+        self.Pos = ndarray(4, 'u8', self.Memory.buf, 0)  # write position, read position, events produced, events written
+        self.Times = ndarray(2, 'f8', self.Memory.buf, 32)  # creation time of the last written message, time of the last write
+        self.Data = ndarray(self.Capacity, 'u1', self.Memory.buf, self.HeaderSize)
+        if name is None:
+            self.Pos[:] = 0
+            self.Times[:] = 0
+
+    def __reduce__(self):
+        return self.__class__, (None, self.Memory.name)
+
+    @property
+    def used(self):
+        return int(self.Pos[0] - self.Pos[1])
+
+    @property
+    def free(self):
+        return self.Capacity - self.used
+
+    def _put(self, pos, data):
+        i = pos % self.Capacity
+        n = min(data.size, self.Capacity - i)
+        self.Data[i:i + n] = data[:n]
+        self.Data[:data.size - n] = data[n:]
+
+    def _get(self, pos, size):
+        i = pos % self.Capacity
+        n = min(size, self.Capacity - i)
+        return concatenate([self.Data[i:i + n], self.Data[:size - n]]) if n < size else self.Data[i:i + n].copy()
+
+    def write(self, data):
+        """ :returns: False if the message does not fit into the free space, without blocking. """
+        data = concatenate([array([data.size], 'u8').view('u1'), data])
+        if data.size > self.free:
+            return False
+        self._put(int(self.Pos[0]), data)
+        self.Pos[0] += data.size  # only publish the message after it is completely written
+        return True
+
+    def read(self):
+        if self.used < 8:
+            return
+        pos = int(self.Pos[1])
+        size = int(self._get(pos, 8).view('u8')[0])
+        data = self._get(pos + 8, size)
+        self.Pos[1] += size + 8
+        return data
+
+    def close(self, unlink=False):
+        del self.Pos, self.Times, self.Data
+        self.Memory.close()
+        self.Memory.unlink() if unlink else do_nothing()
+
+
+def pack(arrays, kind=DATA, t=None):
+    """ serialises EventArrays into a flat byte array: [kind, creation time, n events, n entries per group] + counts + data of each group. """
+    n = [arrays.Data[grp].size for grp in arrays.Groups]
+    head = concatenate([array([kind], 'u8'), array([time() if t is None else t], 'f8').view('u8'), array([arrays.NEvents] + n, 'u8')])
+    return concatenate([head.view('u1')] + [arrays.Counts[grp].astype('u2').view('u1') for grp in arrays.Groups] + [ascontiguousarray(arrays.Data[grp]).view('u1') for grp in arrays.Groups])
+
+
+def unpack(data):
+    """ :returns: kind, creation time and EventArrays of a message created with pack. """
+    ng = len(Dtypes)
+    head = data[:(3 + ng) * 8].view('u8')
+    kind, t, n_events, n = int(head[0]), float(head[1:2].view('f8')[0]), int(head[2]), head[3:].astype('i8')
+    i = (3 + ng) * 8
+    counts = {}
+    for grp in Dtypes:
+        counts[grp] = frombuffer(data[i:i + 2 * n_events].tobytes(), 'u2')
+        i += 2 * n_events
+    arrays = {}
+    for grp, dt, m in zip(Dtypes, Dtypes.values(), n):
+        arrays[grp] = frombuffer(data[i:i + m * dt.itemsize].tobytes(), dt)
+        i += m * dt.itemsize
+    return kind, t, EventArrays(counts, arrays)
+
+
+def serve(ring, replies, writer_cls, args, kwargs, trace=False):
+    """ main loop of the writer process: creates the writer and writes the messages of the ring buffer until it receives CLOSE.
+        The reply to CLOSE are the trace events of the writer process (empty without tracing). An exception stops the process and is replied as WriterError. """
+    if trace:
+        Tracer.start()
+        Tracer.name_thread('writer process')
+    try:
+        writer = writer_cls(*args, **kwargs)
+        replies.put(writer.RunNumber)
+        while True:
+            data = ring.read()
+            if data is None:
+                sleep(.001)
+                continue
+            kind, t, arrays = unpack(data)
+            if kind == DATA:
+                writer.write_batch(arrays, t)
+                ring.Pos[3] += arrays.NEvents
+                ring.Times[:] = t, time()
+            elif kind == FLUSH:
+                writer.flush()
+                replies.put(FLUSH)
+            elif kind == CLOSE:
+                writer.close()
+                replies.put(Tracer.get_events() if trace else [])
+                return
+    except Exception:
+        replies.put(WriterError(f'the writer process failed:\n{format_exc()}'))
+    finally:
+        ring.close()
+
+
+class WriterService:
+    """ Runs a TreeWriter in a separate process, such that ROOT compression or disk stalls never block the DAQ. Events get copied through a shared memory ring buffer and
+        batches which do not fit into the buffer are kept in memory until there is space again. A failure of the writer process raises a WriterError. """
+
+    IsOpen = False  # nothing to close if the initialisation failed
+
+    def __init__(self, writer_cls, *args, size=32 * 2 ** 20, **kwargs):
+
+        self.Ring = RingBuffer(size)
+        self.Replies = Queue()
+        self.Process = Process(target=serve, args=(self.Ring, self.Replies, writer_cls, args, kwargs, Tracer.Enabled), daemon=True)
+        self.Process.start()
+        self.Pending = deque()
+        try:
+            self.RunNumber = self.get_reply(timeout=60)
+        except WriterError:
+            self.release(timeout=1)
+            raise
+        self.IsOpen = True
+
+    def __del__(self):
+        self.close()
+
+    def check(self):
+        """ raises a WriterError with the reason if the writer process is not running anymore """
+        if not self.Process.is_alive():
+            try:
+                reply = self.Replies.get(timeout=1)  # the error of the writer, if it could still send it
+            except Empty:
+                reply = None
+            raise reply if isinstance(reply, WriterError) else WriterError(f'the writer process died (exit code {self.Process.exitcode})')
+
+    def get_reply(self, timeout=None):
+        """ :returns: the next reply of the writer process. Raises a WriterError if the writer failed, died or did not reply within [timeout] s. """
+        t = time()
+        while timeout is None or time() - t < timeout:
+            try:
+                reply = self.Replies.get(timeout=.1)
+            except Empty:
+                self.check()
+                continue
+            if isinstance(reply, WriterError):
+                raise reply
+            return reply
+        raise WriterError(f'the writer process did not reply within {timeout}s')
+
+    @traced('send to writer')
+    def write(self, events):
+        """ hands over a batch of events (list of PxEvents or EventArrays) to the writer process without blocking. """
+        arrays = events if isinstance(events, EventArrays) else EventArrays.from_events(events)
+        if len(arrays):
+            self.Ring.Pos[2] += arrays.NEvents
+            self.Pending.extend(self.split(arrays))
+        self.send_pending()
+        if Tracer.Enabled:
+            Tracer.counter('write buffer', ring_mb=self.Ring.used / 2 ** 20, pending_mb=sum(data.size for data in self.Pending) / 2 ** 20)
+
+    def split(self, arrays, t=None):
+        t = time() if t is None else t
+        data = pack(arrays, t=t)
+        if data.size + 8 <= self.Ring.Capacity // 2 or len(arrays) == 1:
+            return [data]
+        n = len(arrays) // 2
+        return self.split(arrays[:n], t) + self.split(arrays[n:], t)
+
+    def send_pending(self):
+        self.check()
+        while self.Pending and self.Ring.write(self.Pending[0]):
+            self.Pending.popleft()
+        return not self.Pending
+
+    def send(self, kind, timeout=None):
+        """ sends the control message [kind] after all pending data and waits for the acknowledgement of the writer. """
+        t = time()
+        while not self.send_pending() or not self.Ring.write(pack(EventArrays({}, {}), kind)):
+            if timeout is not None and time() - t > timeout:
+                return warning(f'could not send {["", "flush", "close"][kind]} request within {timeout}s')
+            sleep(.01)
+        return self.get_reply(timeout)
+
+    def flush(self, timeout=None):
+        """ blocks until all events handed over so far are written and saved in the file. """
+        self.send(FLUSH, timeout)
+
+    def close(self, timeout=None):
+        if self.IsOpen:
+            self.IsOpen = False
+            try:
+                Tracer.add(choose(self.send(CLOSE, timeout), []))
+            finally:
+                self.release(timeout)
+            info(f'writer process finished (run {self.RunNumber})')
+
+    def release(self, timeout=None):
+        """ stops the writer process, if it did not finish within [timeout] s, and frees the shared memory """
+        self.Process.join(timeout)
+        self.Process.terminate() if self.Process.is_alive() else do_nothing()
+        self.Ring.close(unlink=True)
+
+    @property
+    def lag(self):
+        """ :returns: number of events not yet written, bytes waiting in the buffers and the age of the last written batch [s] """
+        n = int(self.Ring.Pos[2] - self.Ring.Pos[3])
+        return n, self.Ring.used + sum(data.size for data in self.Pending), time() - self.Ring.Times[0] if n and self.Ring.Times[0] else 0.
+
+    def print_lag(self):
+        n, size, t = self.lag
+        info(f'write lag: {n} events, {size / 2 ** 20:.1f} MB, {t:.2f} s')
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# --------------------------------------------------------
+#       Tuning of vana with the LinearTuner on a simulated 16 ROC module
+# created on October 19th 2026 by agent (agent@local)
+# --------------------------------------------------------
+
+from numpy import array, full, clip, arange
+from numpy.random import default_rng
+from helpers.scan import LinearTuner
+
+
+class Module:
+    """ analogue current [mA] of ROCs, which are linear in vana above an idle current, with noise on the measured total """
+
+    def __init__(self, n_rocs=16, seed=1, outlier=None):
+        rng = default_rng(seed)
+        self.Idle = rng.uniform(1, 3, n_rocs)
+        self.Slopes = rng.uniform(.2, .35, n_rocs)
+        if outlier is not None:
+            self.Slopes[outlier] = .13
+        self.Noise = rng.normal
+        self.Vana = full(n_rocs, 0)
+
+    def set_vana(self, values):
+        self.Vana = array(values)
+
+    def roc_currents(self):
+        return self.Idle + self.Slopes * self.Vana
+
+    def tuned_currents(self):
+        """ :returns: the current of every ROC as defined by the tuner: its current above vana 0 plus an equal share of the idle current """
+        return self.roc_currents() - self.Idle + self.Idle.mean()
+
+    def measure(self):
+        return self.roc_currents().sum() + self.Noise(0, .05)
+
+
+def tune(module, target=24, **kwargs):
+    tuner = LinearTuner(module.set_vana, module.measure, module.Vana.size, target, 120, 30, 60, 180, prnt=False, **kwargs)
+    return tuner, tuner.run()
+
+
+def test_total_current():
+    module = Module()
+    tuner, values = tune(module)
+    assert abs(module.roc_currents().sum() - 16 * 24) < .2 * 16
+    assert (values == clip(values, 60, 180)).all()
+
+
+def test_roc_currents():
+    module = Module()
+    tune(module)
+    assert abs(module.tuned_currents() - 24).max() < .5
+
+
+def test_outlier():
+    """ the slope of ROC 3 is far off the median, so it is predicted with the median slope and corrected until the total is within the tolerance """
+    module = Module(outlier=3)
+    tune(module)
+    currents = module.tuned_currents()
+    assert abs(module.roc_currents().sum() - 16 * 24) < .2 * 16
+    assert abs(currents[3] - 24) < 1.5  # the outlier takes the residual of the total
+    assert abs(currents[arange(16) != 3] - 24).max() < .5
+
+
+def test_measurements():
+    """ 2n + 1 measurements for the fit, one to verify and at most [max_iter] corrections """
+    module = Module()
+    tuner, _ = tune(module, max_iter=3)
+    assert tuner.NMeasurements <= 2 * 16 + 1 + 1 + 3
+
+
+if __name__ == '__main__':
+    for m in [Module(), Module(outlier=3)]:
+        t, v = tune(m)
+        print(t, v.tolist(), m.tuned_currents().round(2).tolist())